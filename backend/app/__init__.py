@@ -3,12 +3,21 @@
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, users, conversations, chat, config, mysql_metadata, gitlab_manage
+from app.api import auth, users, conversations, chat, config, mysql_metadata, gitlab_manage, metrics
 from app.models.database import init_db, apply_sqlite_migrations, safe_commit
 from app.utils.security import get_password_hash
 from app.models.user import User
 from app.models.config import Config
+from app.config.settings import settings
+from app.services.mcp_mysql import mysql_session_pool
+from app.services.mcp_gitlab import gitlab_session_pool
+from app.services.mcp_cache import mcp_result_cache
+from app.services.config_service import config_service
+from app.services.message_writer import message_writer
+from app.services.db_maintenance import run_maintenance
+from app.services.message_search import init_message_search
 from sqlalchemy import select
+import asyncio
 import logging
 
 # 配置日志
@@ -39,6 +48,7 @@ app.include_router(chat.router)
 app.include_router(config.router)
 app.include_router(mysql_metadata.router)
 app.include_router(gitlab_manage.router)
+app.include_router(metrics.router)
 
 
 @app.on_event("startup")
@@ -49,6 +59,7 @@ async def startup_event():
     # 初始化数据库
     await init_db()
     await apply_sqlite_migrations()
+    await init_message_search()
     logger.info("数据库初始化完成")
     
     # 创建默认管理员用户（如果不存在）
@@ -98,12 +109,51 @@ async def startup_event():
             logger.info("默认GitLab配置已创建")
         
         await safe_commit(db)
+        config_service.invalidate()
+
+    app.state.mcp_reaper = asyncio.create_task(_reap_idle_mcp_sessions())
+    if settings.DB_MAINTENANCE_INTERVAL > 0:
+        app.state.db_maintenance = asyncio.create_task(_maintain_database())
+
+
+async def _reap_idle_mcp_sessions():
+    """定期回收空闲的MCP会话进程与过期的MCP结果缓存"""
+    interval = max(5, settings.MYSQL_MCP_IDLE_TIMEOUT // 2)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await mysql_session_pool.evict_idle()
+            evicted += await gitlab_session_pool.evict_idle()
+            if evicted:
+                logger.info("回收空闲MCP会话: %s", evicted)
+            await mcp_result_cache.purge_expired()
+        except Exception as e:
+            logger.warning(f"回收空闲MCP会话失败: {str(e)}")
+
+
+async def _maintain_database():
+    """定期执行 SQLite 维护（统计信息、增量 VACUUM、WAL 检查点）"""
+    while True:
+        await asyncio.sleep(settings.DB_MAINTENANCE_INTERVAL)
+        try:
+            report = await run_maintenance()
+            logger.info("数据库维护完成: %s", report)
+        except Exception as e:
+            logger.warning(f"数据库维护失败: {str(e)}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
     logger.info("应用关闭中...")
+    for task_name in ("mcp_reaper", "db_maintenance"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+    # 写完排队中的对话消息
+    await message_writer.close()
+    await mysql_session_pool.close_all()
+    await gitlab_session_pool.close_all()
 
 
 @app.get("/")
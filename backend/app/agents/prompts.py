@@ -359,9 +359,31 @@ CODE_REVIEW_PROMPT = """
 5. 语气友好，鼓励改进
 
 ## 代码差异
-{{DIFF}}
+- 用户消息中的“代码差异”段落即待审查的 diff，直接基于其审查，无需再调用工具获取
+"""
+
+# 复用 SQL 方案时，由模型直接解读查询结果
+SQL_PLAN_NARRATE_PROMPT = """
+以下 SQL 已针对该问题在实时数据上执行完毕，请直接基于查询结果回答用户问题，不要再调用工具。
+
+用户问题：
+{question}
+
+查询与结果：
+{results}
+"""
+
+# 对话历史滚动摘要提示词
+HISTORY_SUMMARY_PROMPT = """
+请把下面的对话内容压缩成一段简洁的中文摘要，供后续对话参考。
+要求：保留用户的目标、已确认的事实与结论（数据库/表名、项目、提交、关键数字等）、未解决的问题；
+省略寒暄与重复内容；不超过 300 字；只输出摘要本身。
+
+已有摘要：
+{summary}
 
-{{DIFF_NOTICE}}
+新增对话：
+{transcript}
 """
 
 # 普通对话Agent提示词
@@ -1,22 +1,30 @@
 """
 对话交互API路由
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
 from typing import Optional
-from app.models.database import get_db, safe_commit
+from app.config.settings import settings
+from app.models.database import get_db, get_read_db, safe_commit
 from app.models.user import User
 from app.models.conversation import Conversation
-from app.models.message import Message
-from app.models.config import Config
 from app.models.mysql_database import MySQLDatabase
 from app.models.mysql_table import MySQLTable
 from app.models.gitlab_user import GitLabUser
 from app.middleware.auth import get_current_user
-from app.services.agent_service import AgentFactory
+from app.services.agent_service import AgentFactory, AgentService
+from app.services.agent_scheduler import SchedulerBusy, agent_scheduler
+from app.services.config_service import config_service
+from app.services.chat_stats import chat_stats_cache
+from app.services.conversation_memory import conversation_memory
+from app.services.message_writer import message_writer
+from app.services.response_cache import response_cache
 from app.agents.prompts import TEMPLATES_BY_MODE
+from app.utils.code_review_prompt import render_code_review_message
+import asyncio
 import re
 import json
 import logging
@@ -174,6 +182,39 @@ def get_chat_templates_by_mode(mode: str) -> list[dict]:
     return TEMPLATES_BY_MODE[mode]
 
 
+async def prepare_agent(
+    message: str,
+    mode: str,
+    db: AsyncSession,
+    review_diff: Optional[str] = None,
+    review_notice: Optional[str] = None,
+) -> tuple[Optional[AgentService], str]:
+    """
+    准备Agent与发送给Agent的消息
+    
+    返回:
+        (agent, message)；无法创建Agent时 agent 为 None，message 为提示信息
+    """
+    # 获取模型配置（进程内缓存，配置更新时刷新）
+    model_config = await config_service.get("model_config", db)
+    if not model_config:
+        return None, "请先配置模型API信息"
+
+    # 解析 @ 库/表，仅在数据分析模式生效
+    if mode == "data_analysis":
+        context, cleaned_message = await _resolve_db_table_mentions(db, message)
+        if context:
+            message = _build_db_table_prompt(context, cleaned_message)
+    elif mode == "code_review":
+        message = await _resolve_gitlab_mentions(db, message)
+        if review_diff is not None or review_notice is not None:
+            message = render_code_review_message(message, review_diff, review_notice)
+
+    # 获取（复用缓存的）Agent，本次请求的上下文都在 message 中
+    agent = await AgentFactory.create_agent(mode, model_config)
+    return agent, message
+
+
 async def process_message(
     message: str,
     mode: str,
@@ -193,33 +234,10 @@ async def process_message(
         str: AI响应内容
     """
     try:
-        # 获取模型配置
-        config_result = await db.execute(select(Config).where(Config.key == "model_config"))
-        config = config_result.scalar_one_or_none()
-        
-        if not config:
-            return "请先配置模型API信息"
-        
-        model_config = json.loads(config.value)
-        
-        system_prompt = None
-
-        # 解析 @ 库/表，仅在数据分析模式生效
-        if mode == "data_analysis":
-            context, cleaned_message = await _resolve_db_table_mentions(db, message)
-            if context:
-                message = _build_db_table_prompt(context, cleaned_message)
-        elif mode == "code_review":
-            message = await _resolve_gitlab_mentions(db, message)
-            if review_diff is not None or review_notice is not None:
-                from app.utils.code_review_prompt import render_code_review_prompt
-                system_prompt = render_code_review_prompt(review_diff or "", review_notice)
-
-        # 创建并使用Agent
-        agent = await AgentFactory.create_agent(mode, model_config, system_prompt=system_prompt)
-        response = await agent.query(message)
-        
-        return response
+        agent, message = await prepare_agent(message, mode, db, review_diff, review_notice)
+        if agent is None:
+            return message
+        return await agent.query(message)
             
     except Exception as e:
         logger.error(f"处理消息失败: {str(e)}")
@@ -253,7 +271,8 @@ def extract_sql_query(message: str) -> Optional[str]:
 async def chat_stream(
     chat_data: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    request: Request = None,
 ):
     """
     流式对话接口
@@ -262,6 +281,7 @@ async def chat_stream(
         chat_data: 对话数据
         current_user: 当前登录用户
         db: 数据库会话
+        request: HTTP 请求，用于检测客户端断开
     
     返回:
         StreamingResponse: 流式响应
@@ -273,7 +293,8 @@ async def chat_stream(
             detail="无效的对话模式"
         )
     
-    # 获取或创建对话
+    # 校验已有对话
+    conversation = None
     if chat_data.conversation_id:
         result = await db.execute(
             select(Conversation).where(
@@ -288,75 +309,217 @@ async def chat_stream(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="对话不存在"
             )
-    else:
-        # 创建新对话
-        conversation = Conversation(
-            user_id=current_user.id,
-            title=chat_data.message[:50],  # 使用消息前50字符作为标题
-            mode=chat_data.mode
-        )
-        db.add(conversation)
-        await safe_commit(db)
-        await db.refresh(conversation)
-    
-    # 保存用户消息
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=chat_data.message
+
+    # 准入控制：队列已满时在写入任何数据前直接返回 429
+    try:
+        ticket = agent_scheduler.submit(current_user.id)
+    except SchedulerBusy as busy:
+        raise _too_many_requests(busy)
+
+    try:
+        if conversation is None:
+            # 创建新对话
+            conversation = Conversation(
+                user_id=current_user.id,
+                title=chat_data.message[:50],  # 使用消息前50字符作为标题
+                mode=chat_data.mode
+            )
+            db.add(conversation)
+            # 新对话同步提交：首个 SSE 事件需要对话ID，消息随后交给写入队列
+            await safe_commit(db)
+            chat_stats_cache.invalidate(current_user.id)
+
+        conversation_id = conversation.id
+        history = []
+        if chat_data.conversation_id:
+            # 读己之写：先等该对话上一轮排队的消息落库，
+            # 再取历史消息（摘要 + 预算内的最近轮次），稳定状态下直接命中进程内缓存
+            await message_writer.wait_for(conversation_id)
+            history = await conversation_memory.history(conversation_id, db)
+
+        # 用户消息交给写入队列，与其他请求的消息合并到同一个事务提交
+        user_saved = message_writer.add_message(conversation_id, "user", chat_data.message)
+
+        # 准备Agent（配置与 @ 提及解析），模型调用在流式响应中进行
+        try:
+            agent, agent_message = await prepare_agent(
+                chat_data.message,
+                chat_data.mode,
+                db,
+                review_diff=chat_data.review_diff,
+                review_notice=chat_data.review_notice,
+            )
+        except Exception as e:
+            logger.error(f"处理对话失败: {str(e)}")
+            agent, agent_message = None, f"处理失败: {str(e)}"
+    except BaseException:
+        agent_scheduler.release(ticket)
+        raise
+
+    # 以上为短事务；Agent 运行期间（可能数十秒）不占用数据库连接，
+    # 请求级会话（与认证依赖共用）在此释放，AI响应在流结束后交给写入队列
+    await db.close()
+
+    user_id = current_user.id
+
+    # 快捷模板提问（无历史、无附带 diff）可直接复用缓存的回答
+    cache_key = None
+    if agent is not None and not history and chat_data.review_diff is None and chat_data.review_notice is None:
+        cache_key = response_cache.build_key(chat_data.mode, chat_data.message, agent_message, agent)
+
+    async def generate():
+        try:
+            async for event in _until_disconnected(request, events()):
+                yield event
+        finally:
+            agent_scheduler.release(ticket)
+
+    async def events():
+        yield _sse({"type": "conversation_id", "id": conversation_id})
+
+        parts = []
+        error = None
+        cached = response_cache.get(cache_key, chat_data.mode) if cache_key else None
+        if agent is not None and cached is None and not ticket.granted:
+            yield _sse({"type": "queued", "position": agent_scheduler.position(ticket)})
+            try:
+                await agent_scheduler.wait(ticket)
+            except SchedulerBusy as busy:
+                error = busy.message
+            except asyncio.CancelledError:
+                # 排队期间客户端断开：与运行中断开一样补上回复，保证本轮两条消息成对落库
+                await _save_turn(conversation_id, user_saved, chat_data.message, "（已取消）")
+                chat_stats_cache.invalidate(user_id)
+                raise
+        if cached is not None or agent is None or error:
+            # 无需运行 Agent 时立即归还名额
+            agent_scheduler.release(ticket)
+
+        if error:
+            yield _sse({"type": "error", "error": error})
+        elif agent is None:
+            parts.append(agent_message)
+            yield _sse({"type": "chunk", "content": agent_message})
+        elif cached is not None:
+            parts.append(cached)
+            yield _sse({"type": "chunk", "content": cached})
+        else:
+            try:
+                async for event in agent.stream(agent_message, history):
+                    if event["type"] == "chunk":
+                        parts.append(event["content"])
+                    yield _sse(event)
+            except asyncio.CancelledError:
+                # 客户端已断开：保存已生成的部分后停止
+                content = "".join(parts)
+                content = f"{content}\n\n（已取消）" if content else "（已取消）"
+                await _save_turn(conversation_id, user_saved, chat_data.message, content)
+                chat_stats_cache.invalidate(user_id)
+                raise
+            except Exception as e:
+                logger.error(f"处理对话失败: {str(e)}", exc_info=True)
+                error = f"处理失败: {str(e)}"
+                yield _sse({"type": "error", "error": error})
+
+        # 流结束后保存AI响应
+        content = "".join(parts)
+        if cache_key and cached is None and not error:
+            response_cache.set(cache_key, chat_data.mode, content)
+        if error:
+            content = f"{content}\n\n{error}" if content else error
+        content = content or "未获得响应"
+        await _save_turn(conversation_id, user_saved, chat_data.message, content)
+        chat_stats_cache.invalidate(user_id)
+        yield _sse({"type": "done", "cached": cached is not None})
+
+        # 响应已发送完毕，历史超出预算时再折叠进滚动摘要
+        if agent is not None:
+            try:
+                await conversation_memory.compact(conversation_id, agent.summarize)
+            except Exception as e:
+                logger.warning(f"压缩对话历史失败: {str(e)}")
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
     )
-    db.add(user_message)
-    
-    # 处理消息
+
+
+async def _until_disconnected(request: Optional[Request], events):
+    """
+    在独立任务中驱动事件流并定期检测客户端是否断开
+
+    断开后取消该任务：取消会传递到 Agent 与进行中的 MCP 调用
+    （mysql-mcp-server 收到 notifications/cancelled 后 KILL QUERY）
+    """
+    if request is None:
+        async for event in events:
+            yield event
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def produce():
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        finally:
+            queue.put_nowait(finished)
+
+    producer = asyncio.create_task(produce())
     try:
-        response_content = await process_message(
-            chat_data.message,
-            chat_data.mode,
-            db,
-            review_diff=chat_data.review_diff,
-            review_notice=chat_data.review_notice,
-        )
-        
-        # 保存AI响应
-        ai_message = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=response_content
-        )
-        db.add(ai_message)
-        await safe_commit(db)
-        
-        # 流式响应
-        async def generate():
-            # 发送对话ID
-            yield f"data: {json.dumps({'type': 'conversation_id', 'id': conversation.id})}\n\n"
-            
-            # 分块发送内容（模拟流式输出）
-            chunks = [response_content[i:i+100] for i in range(0, len(response_content), 100)]
-            for chunk in chunks:
-                yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
-            
-            # 发送完成信号
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
-        
-        from fastapi.responses import StreamingResponse
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            }
-        )
-        
-    except Exception as e:
-        await db.rollback()
-        logger.error(f"处理对话失败: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"处理对话失败: {str(e)}"
-        )
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.CHAT_DISCONNECT_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    logger.info("客户端已断开，取消Agent运行")
+                    return
+                continue
+            if event is finished:
+                break
+            yield event
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+def _too_many_requests(busy: SchedulerBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={"message": busy.message, "queue_depth": busy.queue_depth, "position": busy.position},
+        headers={"Retry-After": str(busy.retry_after)},
+    )
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def _save_turn(conversation_id: int, user_saved: asyncio.Future, user_content: str, content: str) -> None:
+    """排队写入AI响应，等本轮两条消息提交后再同步到对话记忆（保证 done 事件前已落库）"""
+    assistant_saved = message_writer.add_message(conversation_id, "assistant", content)
+    # 两条一起等待，避免其中一条失败时另一条的异常无人获取；
+    # shield：等待方被取消时不取消写入结果
+    user_message_id, assistant_message_id = await asyncio.shield(
+        asyncio.gather(user_saved, assistant_saved, return_exceptions=True)
+    )
+    errors = [item for item in (user_message_id, assistant_message_id) if isinstance(item, BaseException)]
+    if errors:
+        logger.error(f"保存对话消息失败: {'; '.join(str(item) for item in errors)}")
+        # 记忆缓存与数据库不一致，下次读取时从库重新加载
+        conversation_memory.forget(conversation_id)
+        return
+    conversation_memory.append(conversation_id, user_message_id, "user", user_content)
+    conversation_memory.append(conversation_id, assistant_message_id, "assistant", content)
 
 
 @router.get("/templates")
@@ -379,7 +542,7 @@ async def get_chat_templates(mode: str = "normal"):
 @router.get("/gitlab/users")
 async def get_gitlab_users(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取GitLab用户列表（用于@符号选择）
@@ -421,7 +584,7 @@ async def get_gitlab_users(
 @router.get("/stats")
 async def get_chat_stats(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取聊天统计信息
@@ -434,29 +597,8 @@ async def get_chat_stats(
         dict: 统计信息
     """
     try:
-        # 统计对话数量
-        conv_result = await db.execute(
-            select(Conversation).where(Conversation.user_id == current_user.id)
-        )
-        conversations = conv_result.scalars().all()
-        
-        # 统计消息数量
-        msg_result = await db.execute(
-            select(Message)
-            .join(Conversation)
-            .where(Conversation.user_id == current_user.id)
-        )
-        messages = msg_result.scalars().all()
-        
-        return {
-            "total_conversations": len(conversations),
-            "total_messages": len(messages),
-            "conversations_by_mode": {
-                "normal": len([c for c in conversations if c.mode == "normal"]),
-                "data_analysis": len([c for c in conversations if c.mode == "data_analysis"]),
-                "code_review": len([c for c in conversations if c.mode == "code_review"]),
-            }
-        }
+        # SQL 聚合计算，按用户缓存，写入消息或增删对话时失效
+        return await chat_stats_cache.get(db, current_user.id)
     except Exception as e:
         logger.error(f"获取统计信息失败: {str(e)}")
         raise HTTPException(
@@ -15,6 +15,7 @@ from app.services.gitlab_sync import (
     sync_all_gitlab_branches,
 )
 from app.services.mysql_sync import sync_mysql_metadata
+from app.services.config_service import config_service
 from app.services.gitlab_validation import validate_gitlab_token, validate_gitlab_groups
 import json
 import logging
@@ -65,32 +66,12 @@ async def get_config(
     """
     try:
         config = {}
+        for key in ("model_config", "gitlab_config", "mcp_config"):
+            value = await config_service.get(key, db)
+            if value is not None:
+                config[key] = value
         
-        # 获取模型配置
-        model_config_result = await db.execute(
-            select(Config).where(Config.key == "model_config")
-        )
-        model_config = model_config_result.scalar_one_or_none()
-        if model_config:
-            config["model_config"] = json.loads(model_config.value)
-        
-        # 获取GitLab配置
-        gitlab_config_result = await db.execute(
-            select(Config).where(Config.key == "gitlab_config")
-        )
-        gitlab_config = gitlab_config_result.scalar_one_or_none()
-        if gitlab_config:
-            config["gitlab_config"] = json.loads(gitlab_config.value)
-        
-        # 获取MCP配置
-        mcp_config_result = await db.execute(
-            select(Config).where(Config.key == "mcp_config")
-        )
-        mcp_config = mcp_config_result.scalar_one_or_none()
-        if mcp_config:
-            config["mcp_config"] = json.loads(mcp_config.value)
-        
-        return {"code": 0, "data": config}
+        return {"code": 0, "data": config, "version": config_service.version}
         
     except Exception as e:
         logger.error(f"获取配置失败: {str(e)}")
@@ -150,6 +131,7 @@ async def update_model_config(
         
         await safe_commit(db)
         await db.refresh(config)
+        config_service.update("model_config", config_value)
         
         return {"code": 0, "message": "模型配置更新成功"}
         
@@ -213,6 +195,7 @@ async def update_gitlab_config(
         
         await safe_commit(db)
         await db.refresh(config)
+        config_service.update("gitlab_config", config_value)
 
         sync_result = {"success": True, "message": "同步成功"}
         try:
@@ -310,6 +293,7 @@ async def update_mysql_config(
         
         await safe_commit(db)
         await db.refresh(config)
+        config_service.update("mysql_config", config_value)
         
         sync_result = {"success": True, "message": "同步成功"}
         mysql_config = {
@@ -323,7 +307,8 @@ async def update_mysql_config(
             logger.info("开始同步MySQL元数据(MCP)...")
             result = await sync_mysql_metadata(db, mysql_config)
             sync_result["message"] = (
-                f"同步成功: {result['database_count']} 个数据库, {result['table_count']} 个表"
+                f"同步成功: {result['database_count']} 个数据库, {result['table_count']} 个表, "
+                f"{result.get('column_count', 0)} 个字段"
             )
             logger.info(sync_result["message"])
         except Exception as sync_error:
@@ -356,15 +341,12 @@ async def sync_gitlab_data(
             detail="只有管理员可以同步配置"
         )
 
-    result = await db.execute(select(Config).where(Config.key == "gitlab_config"))
-    config = result.scalar_one_or_none()
-    if not config:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置GitLab连接信息")
-
     try:
-        config_value = json.loads(config.value)
+        config_value = await config_service.get("gitlab_config", db)
     except json.JSONDecodeError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="GitLab配置解析失败")
+    if not config_value:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置GitLab连接信息")
 
     normalized_groups = validate_gitlab_groups(config_value.get("groups") or "")
     gitlab_config = {
@@ -407,15 +389,12 @@ async def sync_mysql_data(
             detail="只有管理员可以同步配置"
         )
 
-    result = await db.execute(select(Config).where(Config.key == "mysql_config"))
-    config = result.scalar_one_or_none()
-    if not config:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置MySQL连接信息")
-
     try:
-        config_value = json.loads(config.value)
+        config_value = await config_service.get("mysql_config", db)
     except json.JSONDecodeError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="MySQL配置解析失败")
+    if not config_value:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置MySQL连接信息")
 
     if not config_value.get("enabled"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="MySQL未启用")
@@ -424,7 +403,8 @@ async def sync_mysql_data(
     try:
         result = await sync_mysql_metadata(db, config_value)
         sync_result["message"] = (
-            f"同步成功: {result['database_count']} 个数据库, {result['table_count']} 个表"
+            f"同步成功: {result['database_count']} 个数据库, {result['table_count']} 个表, "
+            f"{result.get('column_count', 0)} 个字段"
         )
     except Exception as sync_error:
         logger.error(f"同步MySQL元数据失败: {str(sync_error)}", exc_info=True)
@@ -581,30 +561,18 @@ async def test_mysql_config(
         
         logger.info(f"开始测试MySQL配置: {config_data.host}:{config_data.port}")
         
-        # 尝试连接并查询数据库列表
+        # 单次聚合查询获取各库表数量，同时验证连接可用
         client = MCPMySQLClient()
-        databases = await client.list_databases(mysql_config)
-        
-        logger.info(f"MySQL连接成功，找到 {len(databases)} 个数据库")
-
-        table_count = 0
-        for db_info in databases:
-            db_name = db_info.get("database") or db_info.get("Database")
-            if not db_name:
-                continue
-            logger.info(f"数据库: {db_name}")
-            tables = await client.list_tables(db_name, mysql_config)
-            table_count += len(tables)
-            logger.info(f"数据库 {db_name}: {len(tables)} 个表")
-        
-        logger.info(f"共 {table_count} 个表")
-        
-        
+        summary = await client.get_schema_summary(mysql_config)
+        table_count = sum(int(item.get("table_count") or 0) for item in summary)
+
+        logger.info(f"MySQL连接成功，找到 {len(summary)} 个数据库，共 {table_count} 个表")
+
         return {
             "code": 0,
             "message": "MySQL连接测试成功",
             "data": {
-                "database_count": len(databases),
+                "database_count": len(summary),
                 "table_count": table_count
             }
         }
@@ -3,14 +3,20 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from pydantic import BaseModel
-from typing import List
-from app.models.database import get_db, safe_commit
+from typing import List, Optional
+from datetime import datetime
+from app.models.database import get_db, get_read_db, safe_commit
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.user import User
 from app.middleware.auth import get_current_user
+from app.services.chat_stats import chat_stats_cache
+from app.services.conversation_memory import conversation_memory
+from app.services.message_search import search_messages
+from app.services.message_writer import message_writer
+from app.utils.pagination import decode_cursor, encode_cursor
 
 
 router = APIRouter(prefix="/api/v1/conversations", tags=["对话历史"])
@@ -32,6 +38,27 @@ class MessageResponse(BaseModel):
     role: str
     content: str
     created_at: str
+    # 完整内容长度；预览模式下 truncated 表示 content 只是前若干字符
+    content_length: int
+    truncated: bool = False
+
+
+class MessagePageResponse(BaseModel):
+    """消息分页响应"""
+    items: List[MessageResponse]
+    next_cursor: Optional[str] = None
+
+
+class SearchHitResponse(BaseModel):
+    """检索命中"""
+    message_id: int
+    conversation_id: int
+    conversation_title: str
+    mode: str
+    role: str
+    # 命中片段，检索词以 **…** 高亮
+    snippet: str
+    created_at: str
 
 
 class CreateConversationRequest(BaseModel):
@@ -44,82 +71,136 @@ class CreateConversationRequest(BaseModel):
 async def list_conversations(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 skip"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取当前用户的对话列表
     
     参数:
-        skip: 跳过的记录数
+        skip: 跳过的记录数（偏移翻页）
         limit: 返回的记录数
+        cursor: 游标（按 updated_at、id 倒序续读，每页开销与翻到第几页无关）
         current_user: 当前登录用户
         db: 数据库会话
     
     返回:
-        dict: 包含总数和对话列表
+        dict: 包含总数、对话列表与下一页游标（没有更多时为 null）；
+              游标翻页时不再统计总数，total 为 null
     """
-    # 查询总数
-    count_result = await db.execute(
-        select(func.count(Conversation.id)).where(Conversation.user_id == current_user.id)
-    )
-    total = count_result.scalar()
-    
-    # 查询对话列表
-    result = await db.execute(
+    # 排队中的消息会更新 updated_at 与消息数，先等其落库
+    await message_writer.flush()
+
+    query = (
         select(Conversation)
         .where(Conversation.user_id == current_user.id)
-        .order_by(Conversation.updated_at.desc())
-        .offset(skip)
-        .limit(limit)
+        .order_by(Conversation.updated_at.desc(), Conversation.id.desc())
     )
+    total = None
+    if cursor:
+        try:
+            updated_at, last_id = decode_cursor(cursor, 2)
+            updated_at = datetime.fromisoformat(updated_at)
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的游标"
+            )
+        query = query.where(tuple_(Conversation.updated_at, Conversation.id) < tuple_(updated_at, last_id))
+    else:
+        # 查询总数
+        count_result = await db.execute(
+            select(func.count(Conversation.id)).where(Conversation.user_id == current_user.id)
+        )
+        total = count_result.scalar()
+        query = query.offset(skip)
+
+    # 多取一条判断是否还有下一页
+    result = await db.execute(query.limit(limit + 1))
     conversations = result.scalars().all()
-    
-    # 获取每个对话的消息数量
-    conversation_data = []
-    for conv in conversations:
-        msg_count_result = await db.execute(
-            select(func.count(Message.id)).where(Message.conversation_id == conv.id)
+    has_more = len(conversations) > limit
+    conversations = conversations[:limit]
+
+    # 一次分组查询本页全部对话的消息数量
+    message_counts = {}
+    if conversations:
+        count_rows = await db.execute(
+            select(Message.conversation_id, func.count(Message.id))
+            .where(Message.conversation_id.in_([conv.id for conv in conversations]))
+            .group_by(Message.conversation_id)
         )
-        message_count = msg_count_result.scalar()
-        
-        conversation_data.append({
+        message_counts = dict(count_rows.all())
+
+    conversation_data = [
+        {
             "id": conv.id,
             "title": conv.title,
             "mode": conv.mode,
             "created_at": conv.created_at.isoformat(),
             "updated_at": conv.updated_at.isoformat(),
-            "message_count": message_count
-        })
-    
+            "message_count": message_counts.get(conv.id, 0)
+        }
+        for conv in conversations
+    ]
+    next_cursor = None
+    if has_more:
+        last = conversations[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+
     return {
         "total": total,
-        "items": conversation_data
+        "items": conversation_data,
+        "next_cursor": next_cursor
     }
 
 
-@router.get("/{conversation_id}/messages", response_model=List[MessageResponse])
-async def get_conversation_messages(
-    conversation_id: int,
+@router.get("/search", response_model=List[SearchHitResponse])
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=200, description="检索词，空白分隔的多个词需同时命中"),
+    mode: Optional[str] = Query(None, description="只检索该模式的对话"),
+    limit: int = Query(20, ge=1, le=50),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    获取指定对话的消息列表
+    全文检索当前用户的历史消息（SQLite FTS5），按相关度排序
     
     参数:
-        conversation_id: 对话ID
+        q: 检索词
+        mode: 对话模式过滤（normal, data_analysis, code_review）
+        limit: 最多返回条数
         current_user: 当前登录用户
         db: 数据库会话
     
     返回:
-        List[MessageResponse]: 消息列表
+        List[SearchHitResponse]: 命中的消息、所属对话与高亮片段
     """
-    # 验证对话是否属于当前用户
+    # 排队中的消息尚未进入索引，先等其落库
+    await message_writer.flush()
+
+    hits = await search_messages(db, current_user.id, q, limit=limit, mode=mode)
+    return [
+        {
+            "message_id": hit.message_id,
+            "conversation_id": hit.conversation_id,
+            "conversation_title": hit.conversation_title,
+            "mode": hit.mode,
+            "role": hit.role,
+            "snippet": hit.snippet,
+            "created_at": hit.created_at.isoformat(),
+        }
+        for hit in hits
+    ]
+
+
+async def _get_own_conversation(db: AsyncSession, conversation_id: int, user_id: int) -> Conversation:
+    """读取当前用户的对话，不存在或无权访问时返回 404"""
     conv_result = await db.execute(
         select(Conversation).where(
             Conversation.id == conversation_id,
-            Conversation.user_id == current_user.id
+            Conversation.user_id == user_id
         )
     )
     conversation = conv_result.scalar_one_or_none()
@@ -129,24 +210,117 @@ async def get_conversation_messages(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="对话不存在或无权访问"
         )
+    return conversation
+
+
+@router.get("/{conversation_id}/messages", response_model=MessagePageResponse)
+async def get_conversation_messages(
+    conversation_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，继续加载更早的消息"),
+    preview_chars: Optional[int] = Query(None, ge=1, description="只返回每条消息的前 N 个字符"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    分页获取指定对话的消息（先返回最近的 limit 条，再按游标向前翻页）
     
-    # 查询消息
-    result = await db.execute(
-        select(Message)
+    参数:
+        conversation_id: 对话ID
+        limit: 每页消息数
+        cursor: 游标（按 created_at、id 向前续读）
+        preview_chars: 预览长度；超出的消息标记 truncated，完整内容通过
+                       GET /{conversation_id}/messages/{message_id} 获取
+        current_user: 当前登录用户
+        db: 数据库会话
+    
+    返回:
+        MessagePageResponse: 本页消息（按时间正序）与更早一页的游标（没有更多时为 null）
+    """
+    await _get_own_conversation(db, conversation_id, current_user.id)
+    
+    # 读己之写：等该对话排队中的消息落库
+    await message_writer.wait_for(conversation_id)
+
+    # 预览模式在 SQL 中截断，超长消息不会整条读出
+    content = func.substr(Message.content, 1, preview_chars) if preview_chars else Message.content
+    query = (
+        select(Message.id, Message.role, content.label("content"), func.length(Message.content).label("content_length"), Message.created_at)
         .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at.asc())
+        .order_by(Message.created_at.desc(), Message.id.desc())
     )
-    messages = result.scalars().all()
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, 2)
+            created_at = datetime.fromisoformat(created_at)
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的游标"
+            )
+        query = query.where(tuple_(Message.created_at, Message.id) < tuple_(created_at, last_id))
+
+    # 多取一条判断是否还有更早的消息
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "role": row.role,
+                "content": row.content,
+                "created_at": row.created_at.isoformat(),
+                "content_length": row.content_length,
+                "truncated": bool(preview_chars) and row.content_length > preview_chars,
+            }
+            for row in reversed(rows)
+        ],
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/{conversation_id}/messages/{message_id}", response_model=MessageResponse)
+async def get_conversation_message(
+    conversation_id: int,
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    获取单条消息的完整内容（配合消息列表的预览模式按需加载）
     
-    return [
-        {
-            "id": msg.id,
-            "role": msg.role,
-            "content": msg.content,
-            "created_at": msg.created_at.isoformat()
-        }
-        for msg in messages
-    ]
+    参数:
+        conversation_id: 对话ID
+        message_id: 消息ID
+        current_user: 当前登录用户
+        db: 数据库会话
+    
+    返回:
+        MessageResponse: 完整消息
+    """
+    await _get_own_conversation(db, conversation_id, current_user.id)
+    result = await db.execute(
+        select(Message).where(Message.id == message_id, Message.conversation_id == conversation_id)
+    )
+    message = result.scalar_one_or_none()
+    if not message:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="消息不存在"
+        )
+    
+    return {
+        "id": message.id,
+        "role": message.role,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "content_length": len(message.content),
+        "truncated": False
+    }
 
 
 @router.post("", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
@@ -182,6 +356,7 @@ async def create_conversation(
     
     db.add(new_conversation)
     await safe_commit(db)
+    chat_stats_cache.invalidate(current_user.id)
     await db.refresh(new_conversation)
     
     return {
@@ -226,8 +401,13 @@ async def delete_conversation(
             detail="对话不存在或无权访问"
         )
     
+    # 先等排队中的消息写完，避免删除后再写入孤儿消息
+    await message_writer.wait_for(conversation_id)
+
     # 删除对话（会级联删除消息）
     await db.delete(conversation)
     await safe_commit(db)
+    conversation_memory.forget(conversation_id)
+    chat_stats_cache.invalidate(current_user.id)
     
     return {"message": "对话删除成功"}
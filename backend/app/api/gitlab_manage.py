@@ -3,20 +3,20 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from app.models.database import get_db, safe_commit
-from app.models.config import Config
 from app.models.gitlab_project import GitLabProject
 from app.models.gitlab_user import GitLabUser
 from app.models.gitlab_branch import GitLabBranch
 from app.models.gitlab_commit import GitLabCommit
 from app.models.gitlab_commit_diff import GitLabCommitDiff
 from app.middleware.auth import get_current_user
+from app.services.config_service import config_service
 from app.services.gitlab_sync import (
     sync_gitlab_branches,
     sync_gitlab_commits,
     sync_gitlab_commit_diffs,
 )
 from app.utils.validation import normalize_remark
-from app.utils.pagination import paginate_query, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.pagination import count_cache, paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 import json
 import logging
 
@@ -25,22 +25,22 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/gitlab", tags=["GitLab管理"])
 
 
-def _load_gitlab_config_value(db_config: Config) -> dict:
+async def _load_gitlab_config(db: AsyncSession) -> dict:
     try:
-        config = json.loads(db_config.value)
+        config = await config_service.get("gitlab_config", db)
     except json.JSONDecodeError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="GitLab配置解析失败")
-    if not config.get("url") or not config.get("token"):
+    if not config or not config.get("url") or not config.get("token"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置GitLab连接信息")
     return config
 
 
-async def _load_gitlab_config(db: AsyncSession) -> dict:
-    result = await db.execute(select(Config).where(Config.key == "gitlab_config"))
-    config = result.scalar_one_or_none()
-    if not config:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置GitLab连接信息")
-    return _load_gitlab_config_value(config)
+async def _paginate(db: AsyncSession, query, page: int, page_size: int, cursor: str | None):
+    """页码或游标翻页，返回 (total, items, next_cursor)"""
+    try:
+        return await paginate(db, query, page, page_size, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的游标")
 
 
 @router.get("/projects")
@@ -49,10 +49,11 @@ async def list_gitlab_projects(
     name: str | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    query = select(GitLabProject).order_by(GitLabProject.path_with_namespace.asc())
+    query = select(GitLabProject).order_by(GitLabProject.path_with_namespace.asc(), GitLabProject.id.asc())
     if not include_disabled:
         query = query.where(GitLabProject.enabled.is_(True))
     if name:
@@ -66,7 +67,7 @@ async def list_gitlab_projects(
                 )
             )
 
-    total, items = await paginate_query(db, query, page, page_size)
+    total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     count_result = await db.execute(
         select(GitLabBranch.project_id, func.count())
@@ -78,6 +79,7 @@ async def list_gitlab_projects(
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": item.id,
@@ -115,6 +117,8 @@ async def update_gitlab_project(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
     await safe_commit(db)
+    # 启用状态是列表过滤条件之一
+    count_cache.invalidate(GitLabProject.__tablename__)
     return {"success": True}
 
 
@@ -124,10 +128,11 @@ async def list_gitlab_users(
     name: str | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    query = select(GitLabUser).order_by(GitLabUser.username.asc())
+    query = select(GitLabUser).order_by(GitLabUser.username.asc(), GitLabUser.id.asc())
     if not include_disabled:
         query = query.where(GitLabUser.enabled.is_(True))
     if name:
@@ -141,12 +146,13 @@ async def list_gitlab_users(
                 )
             )
 
-    total, users = await paginate_query(db, query, page, page_size)
+    total, users, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": user.id,
@@ -184,6 +190,8 @@ async def update_gitlab_user(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
     await safe_commit(db)
+    # 启用状态是列表过滤条件之一
+    count_cache.invalidate(GitLabUser.__tablename__)
     return {"success": True}
 
 
@@ -193,6 +201,7 @@ async def list_gitlab_branches(
     refresh: bool = Query(False),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -203,13 +212,14 @@ async def list_gitlab_branches(
     query = (
         select(GitLabBranch)
         .where(GitLabBranch.project_id == project_id)
-        .order_by(GitLabBranch.name.asc())
+        .order_by(GitLabBranch.name.asc(), GitLabBranch.id.asc())
     )
-    total, branches = await paginate_query(db, query, page, page_size)
+    total, branches, next_cursor = await _paginate(db, query, page, page_size, cursor)
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "name": branch.name,
@@ -229,6 +239,7 @@ async def list_gitlab_commits(
     limit: int = Query(50, ge=1, le=200),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -242,13 +253,14 @@ async def list_gitlab_commits(
             GitLabCommit.project_id == project_id,
             GitLabCommit.branch == branch,
         )
-        .order_by(GitLabCommit.created_at.desc())
+        .order_by(GitLabCommit.created_at.desc(), GitLabCommit.id.desc())
     )
-    total, commits = await paginate_query(db, query, page, page_size)
+    total, commits, next_cursor = await _paginate(db, query, page, page_size, cursor)
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "commit_sha": item.commit_sha,
@@ -0,0 +1,44 @@
+"""
+运行指标API（仅管理员）
+"""
+from fastapi import APIRouter, Depends
+from app.models.user import User
+from app.middleware.auth import get_current_admin
+from app.services.mcp_cache import mcp_result_cache
+from app.services.mcp_mysql import mysql_session_pool
+from app.services.mcp_gitlab import gitlab_session_pool, inprocess_stats
+from app.services.agent_scheduler import agent_scheduler
+from app.services.response_cache import response_cache
+from app.services.message_writer import message_writer
+from app.services.chat_stats import chat_stats_cache
+
+
+router = APIRouter(prefix="/api/v1/metrics", tags=["运行指标"])
+
+
+@router.get("/mcp")
+async def get_mcp_metrics(current_admin: User = Depends(get_current_admin)):
+    """
+    获取MCP结果缓存命中率、会话池状态与进程内GitLab工作线程状态
+    """
+    return {
+        "cache": mcp_result_cache.stats(),
+        "sessions": {
+            "mysql": mysql_session_pool.stats(),
+            "gitlab": gitlab_session_pool.stats(),
+            "gitlab_inprocess": inprocess_stats(),
+        },
+    }
+
+
+@router.get("/chat")
+async def get_chat_metrics(current_admin: User = Depends(get_current_admin)):
+    """
+    获取Agent运行调度（并发、队列深度、等待时间）、快捷模板回答缓存命中率、消息写入队列批次与对话统计缓存
+    """
+    return {
+        "scheduler": agent_scheduler.stats(),
+        "response_cache": response_cache.stats(),
+        "message_writer": message_writer.stats(),
+        "chat_stats": chat_stats_cache.stats(),
+    }
@@ -5,13 +5,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.models.database import get_db, safe_commit
-from app.models.config import Config
 from app.models.mysql_database import MySQLDatabase
 from app.models.mysql_table import MySQLTable
 from app.middleware.auth import get_current_user
+from app.services.config_service import config_service
 from app.services.mysql_sync import sync_mysql_databases, sync_mysql_tables
+from app.services.mysql_catalog import get_local_columns, get_local_indexes, get_local_table_stats
 from app.utils.validation import normalize_remark
-from app.utils.pagination import paginate_query, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.pagination import count_cache, paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 import json
 import logging
 
@@ -22,19 +23,25 @@ router = APIRouter(prefix="/api/v1/mysql", tags=["MySQL元数据"])
 
 
 async def _load_mysql_config(db: AsyncSession) -> dict:
-    result = await db.execute(select(Config).where(Config.key == "mysql_config"))
-    config = result.scalar_one_or_none()
-    if not config:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置MySQL连接信息")
     try:
-        mysql_config = json.loads(config.value)
+        mysql_config = await config_service.get("mysql_config", db)
     except json.JSONDecodeError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="MySQL配置解析失败")
+    if not mysql_config:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请先配置MySQL连接信息")
     if not mysql_config.get("enabled"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="MySQL未启用")
     return mysql_config
 
 
+async def _paginate(db: AsyncSession, query, page: int, page_size: int, cursor: str | None):
+    """页码或游标翻页，返回 (total, items, next_cursor)"""
+    try:
+        return await paginate(db, query, page, page_size, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的游标")
+
+
 async def _sync_databases(db: AsyncSession, mysql_config: dict) -> list[dict]:
     """同步MySQL数据库列表"""
     databases = await sync_mysql_databases(db, mysql_config)
@@ -56,6 +63,7 @@ async def list_mysql_databases(
     name: str | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
@@ -67,7 +75,7 @@ async def list_mysql_databases(
     if refresh:
         await _sync_databases(db, mysql_config)
 
-    query = select(MySQLDatabase).order_by(MySQLDatabase.name.asc())
+    query = select(MySQLDatabase).order_by(MySQLDatabase.name.asc(), MySQLDatabase.id.asc())
     if not include_disabled:
         query = query.where(MySQLDatabase.enabled.is_(True))
     if name:
@@ -75,16 +83,17 @@ async def list_mysql_databases(
         if trimmed:
             query = query.where(MySQLDatabase.name.ilike(f"%{trimmed}%"))
 
-    total, items = await paginate_query(db, query, page, page_size)
+    total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     if not items and total == 0 and not name:
         await _sync_databases(db, mysql_config)
-        total, items = await paginate_query(db, query, page, page_size)
+        total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": item.id,
@@ -105,6 +114,7 @@ async def list_mysql_tables(
     name: str | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
@@ -119,7 +129,7 @@ async def list_mysql_tables(
     query = (
         select(MySQLTable)
         .where(MySQLTable.database_name == database)
-        .order_by(MySQLTable.table_name.asc())
+        .order_by(MySQLTable.table_name.asc(), MySQLTable.id.asc())
     )
     if not include_disabled:
         query = query.where(MySQLTable.enabled.is_(True))
@@ -128,16 +138,17 @@ async def list_mysql_tables(
         if trimmed:
             query = query.where(MySQLTable.table_name.ilike(f"%{trimmed}%"))
 
-    total, items = await paginate_query(db, query, page, page_size)
+    total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     if not items and total == 0 and not name:
         await _sync_tables(db, mysql_config, database)
-        total, items = await paginate_query(db, query, page, page_size)
+        total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": item.id,
@@ -160,6 +171,7 @@ async def list_mysql_databases_manage(
     name: str | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -167,7 +179,7 @@ async def list_mysql_databases_manage(
     if refresh:
         await _sync_databases(db, mysql_config)
 
-    query = select(MySQLDatabase).order_by(MySQLDatabase.name.asc())
+    query = select(MySQLDatabase).order_by(MySQLDatabase.name.asc(), MySQLDatabase.id.asc())
     if not include_disabled:
         query = query.where(MySQLDatabase.enabled.is_(True))
     if name:
@@ -175,7 +187,7 @@ async def list_mysql_databases_manage(
         if trimmed:
             query = query.where(MySQLDatabase.name.ilike(f"%{trimmed}%"))
 
-    total, items = await paginate_query(db, query, page, page_size)
+    total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     count_result = await db.execute(
         select(MySQLTable.database_name, func.count())
@@ -187,6 +199,7 @@ async def list_mysql_databases_manage(
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": item.id,
@@ -208,6 +221,7 @@ async def list_mysql_tables_manage(
     name: str | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor，传入后按游标翻页并忽略 page"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -218,7 +232,7 @@ async def list_mysql_tables_manage(
     query = (
         select(MySQLTable)
         .where(MySQLTable.database_name == database)
-        .order_by(MySQLTable.table_name.asc())
+        .order_by(MySQLTable.table_name.asc(), MySQLTable.id.asc())
     )
     if not include_disabled:
         query = query.where(MySQLTable.enabled.is_(True))
@@ -227,12 +241,13 @@ async def list_mysql_tables_manage(
         if trimmed:
             query = query.where(MySQLTable.table_name.ilike(f"%{trimmed}%"))
 
-    total, items = await paginate_query(db, query, page, page_size)
+    total, items, next_cursor = await _paginate(db, query, page, page_size, cursor)
 
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": item.id,
@@ -269,6 +284,8 @@ async def update_mysql_database_manage(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
     await safe_commit(db)
+    # 启用状态是列表过滤条件之一
+    count_cache.invalidate(MySQLDatabase.__tablename__)
     return {"success": True}
 
 
@@ -293,6 +310,8 @@ async def update_mysql_table_manage(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
     await safe_commit(db)
+    # 启用状态是列表过滤条件之一
+    count_cache.invalidate(MySQLTable.__tablename__)
     return {"success": True}
 
 
@@ -303,9 +322,19 @@ async def get_mysql_table_detail(
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
+    # 优先读取本地元数据目录，未同步时再实时查询
+    columns = await get_local_columns(db, database, table)
+    if columns:
+        return {
+            "columns": columns,
+            "indexes": await get_local_indexes(db, database, table),
+            "stats": await get_local_table_stats(db, database, table),
+            "source": "catalog",
+        }
+
     mysql_config = await _load_mysql_config(db)
     from app.services.mcp_mysql import MCPMySQLClient
 
     client = MCPMySQLClient()
     columns = await client.describe_table(table, database, mysql_config)
-    return {"columns": columns}
+    return {"columns": columns, "source": "live"}
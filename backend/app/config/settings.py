@@ -11,6 +11,18 @@ class Settings(BaseSettings):
     
     # 数据库配置
     DATABASE_URL: str = "sqlite+aiosqlite:///./zyk_ai_platform.db"
+    # SQLite 调优：每个连接建立时执行的 PRAGMA
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    # 锁定等待超时（秒）
+    SQLITE_BUSY_TIMEOUT: float = 30
+    # 页缓存，负数单位为 KiB（-65536 即 64MB）
+    SQLITE_CACHE_SIZE: int = -65536
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # 数据库维护（PRAGMA optimize / ANALYZE / 增量 VACUUM / WAL 检查点）间隔（秒），0 表示关闭
+    DB_MAINTENANCE_INTERVAL: int = 3600
+    # 每次增量 VACUUM 最多回收的空闲页数
+    DB_INCREMENTAL_VACUUM_PAGES: int = 2000
     
     # MySQL配置
     MYSQL_HOST: str = "localhost"
@@ -18,7 +30,76 @@ class Settings(BaseSettings):
     MYSQL_USER: str = "root"
     MYSQL_PASSWORD: str = "yuanpai00!"
     MYSQL_DATABASE: str = ""
+
+    # MySQL MCP会话池配置
+    MYSQL_MCP_TIMEOUT: int = 60
+    MYSQL_MCP_POOL_SIZE: int = 4
+    MYSQL_MCP_IDLE_TIMEOUT: int = 300
+    MYSQL_MCP_HEALTH_CHECK_INTERVAL: int = 30
+    # 流式查询：每页行数与单次查询的行数/字节上限
+    MYSQL_STREAM_CHUNK_SIZE: int = 500
+    MYSQL_STREAM_MAX_ROWS: int = 1000
+    MYSQL_STREAM_MAX_BYTES: int = 4 * 1024 * 1024
+    # execute_query 使用列式编码传输结果（列名只传一次，按行懒解码）
+    MYSQL_MCP_COLUMNAR: bool = False
+    # Agent 把查询结果回传给模型时的字符预算与单元格最大长度
+    AGENT_RESULT_MAX_CHARS: int = 8000
+    AGENT_RESULT_MAX_CELL_CHARS: int = 120
+    # 已编译 Agent 的 LRU 缓存容量
+    AGENT_CACHE_SIZE: int = 16
+    # Agent 运行准入控制：全局/单用户并发上限、等待队列长度与排队超时（秒）
+    AGENT_MAX_CONCURRENT_RUNS: int = 8
+    AGENT_MAX_RUNS_PER_USER: int = 2
+    AGENT_QUEUE_SIZE: int = 32
+    AGENT_QUEUE_TIMEOUT: float = 60
+    # 流式对话检测客户端断开的间隔（秒），断开后取消 Agent 与进行中的 MySQL 查询
+    CHAT_DISCONNECT_POLL_INTERVAL: float = 1.0
+    # 对话统计缓存有效期（秒），写入消息或增删对话时立即失效；0 表示不缓存
+    CHAT_STATS_CACHE_TTL: int = 300
+    # 管理列表分页总数缓存：按过滤条件缓存 COUNT 结果的有效期（秒）与条目上限，0 表示不缓存；
+    # 同步或修改列表数据时立即失效
+    PAGINATION_COUNT_CACHE_TTL: int = 30
+    PAGINATION_COUNT_CACHE_MAX_ENTRIES: int = 512
+    # 消息写入队列：单个写入任务每批合并的最大消息数
+    MESSAGE_WRITER_MAX_BATCH: int = 200
+    # 对话记忆：最近消息的 token 预算、每个对话缓存的消息数、缓存的对话数
+    CHAT_HISTORY_MAX_TOKENS: int = 3000
+    CHAT_HISTORY_MAX_MESSAGES: int = 40
+    CHAT_HISTORY_CACHE_SIZE: int = 256
+
+    # 快捷模板回答缓存（精确匹配，默认关闭），TTL单位秒，0表示该模式不缓存；
+    # 数据分析回答另按数据新鲜度窗口分桶，窗口切换后重新查询
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    RESPONSE_CACHE_TTLS: dict[str, int] = {
+        "normal": 3600,
+        "data_analysis": 600,
+        "code_review": 0,
+    }
+    RESPONSE_CACHE_FRESHNESS_WINDOW: int = 600
+
+    # SQL 方案记忆（默认关闭）：重复的数据分析问题直接重跑记住的 SQL，仅由模型解读结果；
+    # 只记录最后一次查询失败之后的数据查询（跳过取样探查），超过有效期（天）的方案不再复用，
+    # 查询数超过上限时视为探索性分析，不记录
+    SQL_PLAN_MEMORY_ENABLED: bool = False
+    SQL_PLAN_TTL_DAYS: int = 30
+    SQL_PLAN_MAX_QUERIES: int = 5
+
+    # MCP只读工具结果缓存（内存LRU + SQLite持久化），TTL单位秒，0表示不缓存
+    MCP_CACHE_ENABLED: bool = True
+    MCP_CACHE_MAX_ENTRIES: int = 512
+    MCP_CACHE_TTLS: dict[str, int] = {
+        "describe_table": 3600,
+        "get_table_indexes": 3600,
+        "list_tables": 600,
+        "list_projects": 600,
+        "list_branches": 300,
+    }
     
+    # 配置表缓存：解析后的配置常驻内存，PUT /api/v1/config/* 时刷新；
+    # TTL 用于多进程部署时兜底重新读取，0 表示只在更新时刷新
+    CONFIG_CACHE_TTL: int = 300
+
     # JWT配置
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
@@ -37,6 +118,11 @@ class Settings(BaseSettings):
     GITLAB_URL: str = ""
     GITLAB_TOKEN: str = ""
     GITLAB_MCP_TIMEOUT: int = 120
+    GITLAB_MCP_POOL_SIZE: int = 2
+    GITLAB_MCP_IDLE_TIMEOUT: int = 300
+    # stdio: 通过子进程调用 gitlab-mcp-server；inprocess: 在线程池中直接调用工具函数
+    GITLAB_MCP_MODE: str = "stdio"
+    GITLAB_MCP_INPROCESS_WORKERS: int = 8
 
     # 浏览器MCP配置（默认使用官方 Playwright MCP Server）
     BROWSER_MCP_COMMAND: str = "npx -y @playwright/mcp@latest"
@@ -2,7 +2,7 @@
 对话模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 
@@ -10,6 +10,10 @@ from app.models.database import Base
 class Conversation(Base):
     """对话表"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # 对话列表按用户、更新时间倒序翻页
+        Index("ix_conversations_user_updated", "user_id", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -17,6 +21,9 @@ class Conversation(Base):
     mode = Column(String(50), nullable=False)  # normal, data_analysis, code_review
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # 早期对话的滚动摘要，覆盖到 summary_message_id（含）为止的消息
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
     
     # 关系
     user = relationship("User", back_populates="conversations")
@@ -1,10 +1,10 @@
 """
 数据库连接和会话管理
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.exc import OperationalError
-from sqlalchemy import text
+from sqlalchemy import event, text
 import asyncio
 import logging
 from functools import wraps
@@ -18,17 +18,74 @@ class Base(DeclarativeBase):
     pass
 
 
-# 创建异步引擎 - 优化SQLite配置以避免数据库锁定
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True,
-    # SQLite特定配置
-    connect_args={
-        "check_same_thread": False,  # 允许多线程访问
-        "timeout": 30  # 30秒锁定超时
-    }
-)
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_file(url: str) -> bool:
+    """文件型 SQLite（内存库每个连接各自独立，不能拆分读写引擎）"""
+    return _is_sqlite(url) and ":memory:" not in url and not url.rstrip("/").endswith(":")
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    """每个新连接执行的 PRAGMA（取值见 settings.SQLITE_*）"""
+    pragmas = [
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT * 1000)}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # 库级设置只由写连接执行（切换日志模式需要写锁）；
+        # auto_vacuum 只对尚未建表的新库生效，旧库需一次 VACUUM 才会切换
+        pragmas[:0] = ["PRAGMA auto_vacuum=INCREMENTAL", f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}"]
+    return pragmas
+
+
+def create_engine(url: str, read_only: bool = False, tuned: bool = True) -> AsyncEngine:
+    """
+    创建异步引擎；SQLite 连接建立时按调优配置执行 PRAGMA
+
+    参数:
+        url: 数据库地址
+        read_only: 只读引擎（query_only，误写会直接报错）
+        tuned: 是否执行调优 PRAGMA（基准测试对比默认配置时关闭）
+    """
+    if not _is_sqlite(url):
+        return create_async_engine(url, echo=False, future=True)
+
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        # SQLite特定配置
+        connect_args={
+            "check_same_thread": False,  # 允许多线程访问
+            "timeout": settings.SQLITE_BUSY_TIMEOUT,  # 锁定等待超时（秒）
+        },
+    )
+    if tuned:
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+    return new_engine
+
+
+# 写引擎：所有写入与读写混合的请求会话
+engine = create_engine(settings.DATABASE_URL)
+# 读引擎：只读查询（列表、统计、配置与元数据读取），WAL 下不与写入互相阻塞
+read_engine = create_engine(settings.DATABASE_URL, read_only=True) if _is_sqlite_file(settings.DATABASE_URL) else engine
 
 # 创建异步会话工厂
 AsyncSessionLocal = async_sessionmaker(
@@ -37,6 +94,13 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# 只读会话工厂
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 
 async def safe_commit(session: AsyncSession):
     """
@@ -74,6 +138,17 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """
+    依赖注入：获取只读数据库会话（走读引擎，只用于不写库的接口）
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def init_db():
     """初始化数据库表"""
     async with engine.begin() as conn:
@@ -89,6 +164,10 @@ async def init_db():
         from app.models.config import Config
         from app.models.mysql_database import MySQLDatabase
         from app.models.mysql_table import MySQLTable
+        from app.models.mysql_column import MySQLColumn
+        from app.models.mysql_index import MySQLIndex
+        from app.models.mcp_cache import MCPCacheEntry
+        from app.models.sql_plan import SQLPlan
         
         # 创建所有表
         await conn.run_sync(Base.metadata.create_all)
@@ -101,6 +180,10 @@ async def apply_sqlite_migrations():
 
     async with engine.begin() as conn:
         table_columns: dict[str, dict[str, str]] = {
+            "conversations": {
+                "summary": "TEXT",
+                "summary_message_id": "INTEGER",
+            },
             "gitlab_users": {
                 "remark": "TEXT",
                 "enabled": "INTEGER DEFAULT 1",
@@ -118,6 +201,11 @@ async def apply_sqlite_migrations():
             "mysql_tables": {
                 "remark": "TEXT",
                 "enabled": "INTEGER DEFAULT 1",
+                "engine": "TEXT",
+                "table_rows": "INTEGER",
+                "data_length": "INTEGER",
+                "index_length": "INTEGER",
+                "catalog_synced_at": "DATETIME",
             },
         }
 
@@ -131,6 +219,11 @@ async def apply_sqlite_migrations():
                     continue
                 await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
 
+        # create_all 只为新建的表创建索引，旧库补齐新增的索引
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+
 
 def retry_on_locked(max_retries: int = 3, delay: float = 0.1):
     """
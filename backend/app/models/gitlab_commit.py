@@ -25,6 +25,8 @@ class GitLabCommit(Base):
             "commit_sha",
             unique=True,
         ),
+        # 按分支分页浏览提交（created_at 倒序）
+        Index("idx_gitlab_commit_project_branch_created", "project_id", "branch", "created_at"),
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,22 @@
+"""
+MCP 工具结果缓存模型（持久化缓存层）
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, Text, DateTime
+from app.models.database import Base
+
+
+class MCPCacheEntry(Base):
+    """MCP只读工具调用结果缓存"""
+    __tablename__ = "mcp_cache_entries"
+
+    cache_key = Column(String(64), primary_key=True)
+    namespace = Column(String(50), nullable=False, index=True)
+    tool = Column(String(100), nullable=False, index=True)
+    config_fingerprint = Column(String(64), nullable=False)
+    value = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MCPCacheEntry(namespace='{self.namespace}', tool='{self.tool}')>"
@@ -2,7 +2,7 @@
 消息模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 
@@ -10,6 +10,10 @@ from app.models.database import Base
 class Message(Base):
     """消息表"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # 按对话读取、统计消息（按时间排序）
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
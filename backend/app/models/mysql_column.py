@@ -0,0 +1,29 @@
+"""
+MySQL字段元数据模型
+"""
+from sqlalchemy import Column, Integer, String, Text, Index
+from app.models.database import Base
+
+
+class MySQLColumn(Base):
+    """MySQL表字段信息（来自 information_schema.COLUMNS）"""
+    __tablename__ = "mysql_columns"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    database_name = Column(String(255), nullable=False)
+    table_name = Column(String(255), nullable=False)
+    column_name = Column(String(255), nullable=False)
+    ordinal_position = Column(Integer, nullable=False, default=0)
+    column_type = Column(String(255), nullable=True)
+    is_nullable = Column(String(3), nullable=True)
+    column_key = Column(String(3), nullable=True)
+    column_default = Column(Text, nullable=True)
+    extra = Column(String(255), nullable=True)
+    column_comment = Column(String(1024), nullable=True)
+
+    __table_args__ = (
+        Index("idx_mysql_columns_db_table", "database_name", "table_name", "ordinal_position"),
+    )
+
+    def __repr__(self):
+        return f"<MySQLColumn(table='{self.database_name}.{self.table_name}', column='{self.column_name}')>"
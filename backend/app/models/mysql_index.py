@@ -0,0 +1,27 @@
+"""
+MySQL索引元数据模型
+"""
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, Index
+from app.models.database import Base
+
+
+class MySQLIndex(Base):
+    """MySQL表索引信息（来自 information_schema.STATISTICS，每个索引列一行）"""
+    __tablename__ = "mysql_indexes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    database_name = Column(String(255), nullable=False)
+    table_name = Column(String(255), nullable=False)
+    index_name = Column(String(255), nullable=False)
+    seq_in_index = Column(Integer, nullable=False, default=1)
+    column_name = Column(String(255), nullable=True)
+    non_unique = Column(Boolean, nullable=False, default=True)
+    index_type = Column(String(50), nullable=True)
+    cardinality = Column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        Index("idx_mysql_indexes_db_table", "database_name", "table_name", "index_name", "seq_in_index"),
+    )
+
+    def __repr__(self):
+        return f"<MySQLIndex(table='{self.database_name}.{self.table_name}', index='{self.index_name}')>"
@@ -2,7 +2,7 @@
 MySQL表元数据模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Index, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, Boolean
 from app.models.database import Base
 
 
@@ -15,6 +15,12 @@ class MySQLTable(Base):
     table_name = Column(String(255), nullable=False, index=True)
     table_type = Column(String(50), nullable=True)
     table_comment = Column(String(500), nullable=True)
+    # 统计信息（来自 information_schema.TABLES，行数为估计值）
+    engine = Column(String(50), nullable=True)
+    table_rows = Column(BigInteger, nullable=True)
+    data_length = Column(BigInteger, nullable=True)
+    index_length = Column(BigInteger, nullable=True)
+    catalog_synced_at = Column(DateTime, nullable=True)
     remark = Column(String(255), nullable=True)
     enabled = Column(Boolean, default=True, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,26 @@
+"""
+SQL 方案记忆模型
+
+保存数据分析问题 → Agent 成功执行过的查询 SQL，重复提问时直接复用。
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from app.models.database import Base
+
+
+class SQLPlan(Base):
+    """数据分析问题的SQL方案"""
+    __tablename__ = "sql_plans"
+
+    plan_key = Column(String(64), primary_key=True)
+    question = Column(Text, nullable=False)
+    context = Column(Text, nullable=True)
+    config_fingerprint = Column(String(64), nullable=False)
+    queries = Column(Text, nullable=False)  # JSON 数组，按执行顺序
+    hit_count = Column(Integer, default=0, nullable=False)
+    last_used_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<SQLPlan(question='{self.question[:30]}', hits={self.hit_count})>"
@@ -0,0 +1,219 @@
+"""
+Agent 运行准入控制
+
+/chat/stream 的每次 Agent 运行都会调用模型、启动/占用 MCP 会话。调度器限制全局并发数
+与单用户并发数，超出时进入有界等待队列；队列按用户轮转放行，避免单个用户的突发请求
+占满所有名额。队列已满时立即拒绝（由接口返回 429 与排队信息），排队超时同样拒绝。
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Hashable, Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 用于统计等待时间分位数的最近样本数
+WAIT_SAMPLES = 500
+
+
+class SchedulerBusy(Exception):
+    """队列已满或排队超时"""
+
+    def __init__(self, message: str, queue_depth: int, position: Optional[int] = None, retry_after: int = 1):
+        super().__init__(message)
+        self.message = message
+        self.queue_depth = queue_depth
+        self.position = position
+        self.retry_after = retry_after
+
+
+class AgentRunTicket:
+    """一次 Agent 运行的准入凭证"""
+
+    __slots__ = ("user_id", "future", "enqueued_at", "granted", "released")
+
+    def __init__(self, user_id: Hashable):
+        self.user_id = user_id
+        self.future: Optional[asyncio.Future] = None
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.released = False
+
+
+class AgentRunScheduler:
+    """全局/单用户并发上限 + 有界队列 + 按用户轮转"""
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        wait_timeout: Optional[float] = None,
+    ):
+        self.max_concurrent = max(1, max_concurrent or settings.AGENT_MAX_CONCURRENT_RUNS)
+        self.max_per_user = max(1, max_per_user or settings.AGENT_MAX_RUNS_PER_USER)
+        self.max_queue = settings.AGENT_QUEUE_SIZE if max_queue is None else max_queue
+        self.wait_timeout = settings.AGENT_QUEUE_TIMEOUT if wait_timeout is None else wait_timeout
+        self._running = 0
+        self._running_by_user: dict[Hashable, int] = {}
+        # 用户 -> 等待中的凭证；字典顺序即轮转顺序，放行后用户移到队尾
+        self._waiting: OrderedDict[Hashable, deque[AgentRunTicket]] = OrderedDict()
+        self._queued = 0
+        self._wait_times: deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    def _can_run(self, user_id: Hashable) -> bool:
+        return self._running < self.max_concurrent and self._running_by_user.get(user_id, 0) < self.max_per_user
+
+    def _grant(self, ticket: AgentRunTicket) -> None:
+        ticket.granted = True
+        self._running += 1
+        self._running_by_user[ticket.user_id] = self._running_by_user.get(ticket.user_id, 0) + 1
+        self._wait_times.append(time.monotonic() - ticket.enqueued_at)
+        self._counters["admitted"] += 1
+        if ticket.future is not None and not ticket.future.done():
+            ticket.future.set_result(None)
+
+    def submit(self, user_id: Hashable) -> AgentRunTicket:
+        """
+        申请运行名额：有空闲名额时直接放行，否则进入队列
+
+        异常:
+            SchedulerBusy: 队列已满
+        """
+        ticket = AgentRunTicket(user_id)
+        if self._can_run(user_id):
+            self._grant(ticket)
+            return ticket
+        if self._queued >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise SchedulerBusy(
+                "当前请求较多，请稍后重试",
+                queue_depth=self._queued,
+                position=self._queued + 1,
+                retry_after=self._retry_after(),
+            )
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(ticket)
+        self._queued += 1
+        self._counters["queued"] += 1
+        return ticket
+
+    def position(self, ticket: AgentRunTicket) -> int:
+        """按轮转顺序估算的放行位次（1 表示下一个）"""
+        if ticket.granted:
+            return 0
+        own = self._waiting.get(ticket.user_id)
+        if not own or ticket not in own:
+            return 0
+        index = own.index(ticket)
+        ahead = index
+        before_user = True
+        for user_id, tickets in self._waiting.items():
+            if user_id == ticket.user_id:
+                before_user = False
+                continue
+            # 轮转顺序在前的用户每轮先放行一个
+            ahead += min(len(tickets), index + 1 if before_user else index)
+        return ahead + 1
+
+    async def wait(self, ticket: AgentRunTicket, timeout: Optional[float] = None) -> None:
+        """
+        等待放行
+
+        异常:
+            SchedulerBusy: 排队超时
+        """
+        if ticket.granted:
+            return
+        timeout = self.wait_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+        except asyncio.TimeoutError:
+            if ticket.granted:
+                return
+            self._dequeue(ticket)
+            self._counters["timed_out"] += 1
+            raise SchedulerBusy(
+                "排队等待超时，请稍后重试",
+                queue_depth=self._queued,
+                retry_after=self._retry_after(),
+            )
+        except BaseException:
+            # 客户端断开等导致等待被取消
+            if ticket.granted:
+                self.release(ticket)
+            else:
+                self._dequeue(ticket)
+            raise
+
+    def _dequeue(self, ticket: AgentRunTicket) -> None:
+        tickets = self._waiting.get(ticket.user_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            self._queued -= 1
+            if not tickets:
+                self._waiting.pop(ticket.user_id, None)
+
+    def release(self, ticket: AgentRunTicket) -> None:
+        """运行结束（或放弃排队）时调用，可重复调用"""
+        if ticket.released:
+            return
+        ticket.released = True
+        if not ticket.granted:
+            self._dequeue(ticket)
+            return
+        self._running -= 1
+        remaining = self._running_by_user.get(ticket.user_id, 1) - 1
+        if remaining > 0:
+            self._running_by_user[ticket.user_id] = remaining
+        else:
+            self._running_by_user.pop(ticket.user_id, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrent:
+            for user_id in self._waiting:
+                if self._running_by_user.get(user_id, 0) < self.max_per_user:
+                    break
+            else:
+                return
+            tickets = self._waiting.pop(user_id)
+            ticket = tickets.popleft()
+            self._queued -= 1
+            if tickets:
+                # 放回队尾，下一个名额轮到其他用户
+                self._waiting[user_id] = tickets
+            self._grant(ticket)
+
+    def _retry_after(self) -> int:
+        if not self._wait_times:
+            return 1
+        return max(1, round(sum(self._wait_times) / len(self._wait_times)))
+
+    def stats(self) -> dict[str, Any]:
+        samples = sorted(self._wait_times)
+        wait = {"avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        if samples:
+            wait = {
+                "avg_ms": round(sum(samples) / len(samples) * 1000, 1),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1),
+            }
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queue_depth": self._queued,
+            "queued_users": len(self._waiting),
+            **self._counters,
+            "wait": wait,
+        }
+
+
+# 全局调度器实例
+agent_scheduler = AgentRunScheduler()
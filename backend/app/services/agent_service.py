@@ -1,23 +1,62 @@
 """
 Agent服务层 - 实现LangChain Agent
 """
+from collections import OrderedDict
 from langchain.agents import create_agent
 from langchain_openai import ChatOpenAI
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
+import hashlib
+import json
 import logging
+from .config_service import config_service
+from .mcp_session import config_fingerprint
 from .mcp_mysql import mcp_mysql_client
+from .mysql_catalog import load_catalog_columns, load_catalog_indexes
 from .mcp_browser import mcp_browser_client
+from .sql_plan_memory import record_failure, record_query, sql_plan_memory, start_recording, stop_recording
 from .gitlab import gitlab_service
-from app.agents.prompts import CHAT_PROMPT, DATA_ANALYSIS_PROMPT
+from app.agents.prompts import CHAT_PROMPT, DATA_ANALYSIS_PROMPT, HISTORY_SUMMARY_PROMPT, SQL_PLAN_NARRATE_PROMPT
+from app.config.settings import settings
 from app.utils.code_review_prompt import render_code_review_prompt
+from app.utils.result_formatter import ResultTableFormatter, format_query_results
 from app.utils.gitlab_commit_lookup import resolve_commit_project_id
 from app.utils.gitlab_username import normalize_gitlab_username
 
 logger = logging.getLogger(__name__)
 
+# 工具事件中输入/输出预览的最大长度
+TOOL_EVENT_PREVIEW_CHARS = 500
+
+
+def _message_text(message: Any) -> str:
+    """提取 AIMessage/AIMessageChunk 中的文本内容"""
+    content = getattr(message, "content", None)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+
+def _preview(value: Any) -> str:
+    if hasattr(value, "content"):
+        value = value.content
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    if len(value) > TOOL_EVENT_PREVIEW_CHARS:
+        return value[:TOOL_EVENT_PREVIEW_CHARS] + "…"
+    return value
+
 
 class AgentService:
     """Agent服务基类"""
+
+    # 工具集名称，作为 Agent 缓存键的一部分
+    TOOL_NAMES: tuple[str, ...] = ()
     
     def __init__(self, model_config: Dict[str, Any]):
         """
@@ -34,6 +73,9 @@ class AgentService:
             streaming=True
         )
         self.agent_graph = None
+        # 模型配置指纹与系统提示词版本，用作回答缓存键的一部分
+        self.model_fingerprint = config_fingerprint(model_config)
+        self.prompt_version: Optional[str] = None
     
     async def initialize(self, system_prompt: str, tools: list):
         """
@@ -49,8 +91,9 @@ class AgentService:
                 model=self.llm,
                 tools=tools,
                 system_prompt=system_prompt,
-                debug=True
+                debug=False
             )
+            self.prompt_version = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
             
             logger.info("Agent初始化成功")
             
@@ -58,12 +101,17 @@ class AgentService:
             logger.error(f"Agent初始化失败: {str(e)}")
             raise
     
-    async def query(self, message: str) -> str:
+    @staticmethod
+    def _inputs(message: str, history: Optional[list[dict]] = None) -> Dict[str, Any]:
+        return {"messages": [*(history or []), {"role": "user", "content": message}]}
+
+    async def query(self, message: str, history: Optional[list[dict]] = None) -> str:
         """
         查询Agent
         
         参数:
             message: 用户消息
+            history: 历史消息（摘要 + 最近若干轮），见 ConversationMemory.history
         
         返回:
             str: Agent响应
@@ -73,7 +121,7 @@ class AgentService:
         
         try:
             # 使用新的 API 调用 agent
-            inputs = {"messages": [{"role": "user", "content": message}]}
+            inputs = self._inputs(message, history)
             result = await self.agent_graph.ainvoke(inputs)
             
             # 提取最终回复
@@ -90,9 +138,91 @@ class AgentService:
             logger.error(f"Agent查询失败: {str(e)}")
             return f"查询失败: {str(e)}"
 
+    async def stream(self, message: str, history: Optional[list[dict]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式查询Agent，按生成顺序产出事件
+        
+        事件:
+            {"type": "chunk", "content": str}                      模型生成的文本片段
+            {"type": "tool_start", "name", "run_id", "input"}      开始调用工具
+            {"type": "tool_end", "name", "run_id", "output"}       工具调用结束（输出为截断预览）
+        """
+        if not self.agent_graph:
+            raise RuntimeError("Agent未初始化")
+
+        inputs = self._inputs(message, history)
+        streamed_runs = set()
+        async for event in self.agent_graph.astream_events(inputs, version="v2"):
+            kind = event.get("event")
+            data = event.get("data") or {}
+            if kind == "on_chat_model_stream":
+                text = _message_text(data.get("chunk"))
+                if text:
+                    streamed_runs.add(event.get("run_id"))
+                    yield {"type": "chunk", "content": text}
+            elif kind == "on_chat_model_end":
+                # 模型未按 token 流式返回时，在结束事件里一次性补发
+                if event.get("run_id") not in streamed_runs:
+                    text = _message_text(data.get("output"))
+                    if text:
+                        yield {"type": "chunk", "content": text}
+            elif kind == "on_tool_start":
+                yield {
+                    "type": "tool_start",
+                    "name": event.get("name"),
+                    "run_id": event.get("run_id"),
+                    "input": _preview(data.get("input")),
+                }
+            elif kind == "on_tool_end":
+                yield {
+                    "type": "tool_end",
+                    "name": event.get("name"),
+                    "run_id": event.get("run_id"),
+                    "output": _preview(data.get("output")),
+                }
+
+    async def summarize(self, previous_summary: Optional[str], messages: list[dict]) -> str:
+        """把较早的对话折叠进滚动摘要（供 ConversationMemory.compact 使用）"""
+        transcript = "\n".join(
+            f"{'用户' if item['role'] == 'user' else '助手'}：{item['content']}" for item in messages
+        )
+        prompt = HISTORY_SUMMARY_PROMPT.format(summary=previous_summary or "（无）", transcript=transcript)
+        response = await self.llm.ainvoke([{"role": "user", "content": prompt}])
+        return _message_text(response).strip()
+
+
+async def _load_mysql_config() -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    mysql_config = await config_service.get("mysql_config")
+    if not mysql_config:
+        return None, "错误：未配置MySQL连接信息"
+    if not mysql_config.get("enabled"):
+        return None, "错误：MySQL未启用"
+    return mysql_config, None
+
+
+async def _run_mysql_query(query: str, mysql_config: Dict[str, Any]) -> str:
+    """流式拉取并在达到行数/字节上限时提前结束，边拉取边格式化，不保留全部行"""
+    formatter = ResultTableFormatter()
+    async with mcp_mysql_client.stream_query(query, mysql_config=mysql_config) as stream:
+        async for row in stream:
+            formatter.add(row)
+    formatted = formatter.render()
+    if stream.truncated:
+        formatted += f"\n\n（结果超过上限，仅读取前 {stream.row_count} 条，请添加过滤条件或 LIMIT）"
+    return formatted
+
 
 class DataAnalysisAgent(AgentService):
     """数据分析Agent"""
+
+    TOOL_NAMES = (
+        "execute_mysql_query",
+        "list_databases",
+        "list_tables",
+        "describe_table",
+        "show_table_status",
+        "get_table_indexes",
+    )
     
     async def initialize(self, model_config: Dict[str, Any]):
         """
@@ -108,29 +238,6 @@ class DataAnalysisAgent(AgentService):
             temperature=0.7
         )
         
-        async def _load_mysql_config():
-            from app.models.database import get_db
-            from app.models.config import Config
-            from sqlalchemy import select
-            import json
-
-            db_gen = get_db()
-            db = await db_gen.__anext__()
-            try:
-                result = await db.execute(select(Config).where(Config.key == "mysql_config"))
-                config = result.scalar_one_or_none()
-                if not config:
-                    return None, "错误：未配置MySQL连接信息"
-                mysql_config = json.loads(config.value)
-                if not mysql_config.get("enabled"):
-                    return None, "错误：MySQL未启用"
-                return mysql_config, None
-            finally:
-                try:
-                    await db_gen.aclose()
-                except Exception:
-                    pass
-
         # 创建MySQL查询工具
         async def execute_mysql_query(query: str) -> str:
             """执行MySQL查询"""
@@ -139,9 +246,11 @@ class DataAnalysisAgent(AgentService):
                 if error_message:
                     return error_message
 
-                results = await mcp_mysql_client.execute_query(query, mysql_config=mysql_config)
-                return self._format_results(results)
+                formatted = await _run_mysql_query(query, mysql_config)
+                record_query(query)
+                return formatted
             except Exception as e:
+                record_failure()
                 import traceback
                 logger.error(f"执行MySQL查询失败: {str(e)}\n{traceback.format_exc()}")
                 return f"查询失败: {str(e)}"
@@ -172,6 +281,10 @@ class DataAnalysisAgent(AgentService):
                 mysql_config, error_message = await _load_mysql_config()
                 if error_message:
                     return error_message
+                # 优先使用已同步到本地的元数据目录
+                columns = await load_catalog_columns(database or mysql_config.get("database"), table_name)
+                if columns is not None:
+                    return columns
                 return await mcp_mysql_client.describe_table(table_name, database, mysql_config=mysql_config)
             except Exception as e:
                 return f"获取表结构失败: {str(e)}"
@@ -192,6 +305,9 @@ class DataAnalysisAgent(AgentService):
                 mysql_config, error_message = await _load_mysql_config()
                 if error_message:
                     return error_message
+                indexes = await load_catalog_indexes(database or mysql_config.get("database"), table_name)
+                if indexes is not None:
+                    return indexes
                 return await mcp_mysql_client.get_table_indexes(table_name, database, mysql_config=mysql_config)
             except Exception as e:
                 return f"获取索引信息失败: {str(e)}"
@@ -208,24 +324,87 @@ class DataAnalysisAgent(AgentService):
             ],
         )
     
+    async def stream(self, message: str, history: Optional[list[dict]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式查询；没有对话历史时先查找 SQL 方案记忆：
+        命中则直接重跑记住的 SQL 并由模型解读结果，未命中则完整运行 Agent 并记录成功执行的查询
+        """
+        mysql_config = None
+        if not history and sql_plan_memory.enabled:
+            mysql_config, error_message = await _load_mysql_config()
+            if error_message:
+                mysql_config = None
+
+        if mysql_config is not None:
+            try:
+                queries = await sql_plan_memory.lookup(message, mysql_config)
+            except Exception as e:
+                logger.warning(f"读取SQL方案失败: {str(e)}")
+                queries = None
+            if queries:
+                results = []
+                try:
+                    for index, query in enumerate(queries):
+                        run_id = f"sql-plan-{index}"
+                        yield {"type": "tool_start", "name": "execute_mysql_query", "run_id": run_id, "input": query}
+                        formatted = await _run_mysql_query(query, mysql_config)
+                        yield {
+                            "type": "tool_end",
+                            "name": "execute_mysql_query",
+                            "run_id": run_id,
+                            "output": _preview(formatted),
+                        }
+                        results.append(f"```sql\n{query}\n```\n{formatted}")
+                except Exception as e:
+                    # 表结构变化等导致方案失效，删除后走完整的 Agent 流程
+                    logger.warning(f"SQL方案执行失败，改为完整分析: {str(e)}")
+                    await sql_plan_memory.forget(message, mysql_config)
+                    results = None
+                if results is not None:
+                    async for event in self._narrate(message, results):
+                        yield event
+                    return
+
+        queries = start_recording() if mysql_config is not None else None
+        try:
+            async for event in super().stream(message, history):
+                yield event
+        finally:
+            if queries is not None:
+                stop_recording()
+        if queries:
+            try:
+                await sql_plan_memory.remember(message, mysql_config, queries)
+            except Exception as e:
+                logger.warning(f"保存SQL方案失败: {str(e)}")
+
+    async def _narrate(self, message: str, results: list[str]) -> AsyncIterator[Dict[str, Any]]:
+        prompt = SQL_PLAN_NARRATE_PROMPT.format(question=message, results="\n\n".join(results))
+        inputs = [
+            {"role": "system", "content": DATA_ANALYSIS_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        async for chunk in self.llm.astream(inputs):
+            text = _message_text(chunk)
+            if text:
+                yield {"type": "chunk", "content": text}
+
     def _format_results(self, results: list) -> str:
-        """格式化查询结果"""
-        if not results:
-            return "查询结果为空"
-        
-        # 创建Markdown表格
-        headers = list(results[0].keys())
-        table = "| " + " | ".join(headers) + " |\n"
-        table += "| " + " | ".join(["---"] * len(headers)) + " |\n"
-        
-        for row in results:
-            table += "| " + " | ".join(str(row[h]) for h in headers) + " |\n"
-        
-        return f"查询结果：\n\n{table}\n\n共 {len(results)} 条记录"
+        """格式化查询结果（按字符预算截断，省略行汇总为列统计）"""
+        return format_query_results(results)
 
 
 class CodeReviewAgent(AgentService):
     """代码审查Agent"""
+
+    TOOL_NAMES = (
+        "get_user_commits",
+        "get_commit_diff",
+        "list_projects",
+        "list_users",
+        "list_branches",
+        "list_commits",
+    )
     
     async def initialize(self, model_config: Dict[str, Any], system_prompt: Optional[str] = None):
         """
@@ -315,7 +494,7 @@ class CodeReviewAgent(AgentService):
             except Exception as e:
                 return [f"获取提交失败: {str(e)}"]
 
-        final_prompt = system_prompt or render_code_review_prompt("", "")
+        final_prompt = system_prompt or render_code_review_prompt()
 
         await super().initialize(
             final_prompt,
@@ -347,6 +526,8 @@ class CodeReviewAgent(AgentService):
 
 class ChatAgent(AgentService):
     """普通对话Agent"""
+
+    TOOL_NAMES = ("browse_web",)
     
     async def initialize(self, model_config: Dict[str, Any]):
         """
@@ -377,8 +558,26 @@ class ChatAgent(AgentService):
 
 # Agent工厂
 class AgentFactory:
-    """Agent工厂类"""
-    
+    """
+    Agent工厂类
+
+    已编译的 Agent 按 (模式, 模型配置指纹, 系统提示词哈希, 工具集) 缓存复用，
+    超过 AGENT_CACHE_SIZE 时淘汰最久未使用的；每次请求的上下文只通过 query 的消息传入。
+    """
+
+    AGENT_CLASSES: Dict[str, type[AgentService]] = {
+        "data_analysis": DataAnalysisAgent,
+        "code_review": CodeReviewAgent,
+        "normal": ChatAgent,
+    }
+    _cache: "OrderedDict[tuple, AgentService]" = OrderedDict()
+
+    @staticmethod
+    def cache_key(mode: str, model_config: Dict[str, Any], system_prompt: Optional[str] = None) -> tuple:
+        agent_cls = AgentFactory.AGENT_CLASSES[mode]
+        prompt_hash = hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()
+        return (mode, config_fingerprint(model_config), prompt_hash, agent_cls.TOOL_NAMES)
+
     @staticmethod
     async def create_agent(
         mode: str,
@@ -386,26 +585,40 @@ class AgentFactory:
         system_prompt: Optional[str] = None
     ) -> AgentService:
         """
-        创建Agent实例
+        获取Agent实例（命中缓存时直接复用已编译的 Agent）
         
         参数:
             mode: Agent模式 (data_analysis, code_review, normal)
             model_config: 模型配置
+            system_prompt: 自定义系统提示词（仅代码审查模式）
         
         返回:
             AgentService: Agent实例
         """
-        if mode == "data_analysis":
-            agent = DataAnalysisAgent(model_config)
-        elif mode == "code_review":
-            agent = CodeReviewAgent(model_config)
-        elif mode == "normal":
-            agent = ChatAgent(model_config)
-        else:
+        agent_cls = AgentFactory.AGENT_CLASSES.get(mode)
+        if agent_cls is None:
             raise ValueError(f"不支持的Agent模式: {mode}")
-        
+        if mode != "code_review":
+            system_prompt = None
+
+        cache = AgentFactory._cache
+        key = AgentFactory.cache_key(mode, model_config, system_prompt)
+        agent = cache.get(key)
+        if agent is not None:
+            cache.move_to_end(key)
+            return agent
+
+        agent = agent_cls(model_config)
         if mode == "code_review":
             await agent.initialize(model_config, system_prompt=system_prompt)
         else:
             await agent.initialize(model_config)
+
+        cache[key] = agent
+        while len(cache) > max(1, settings.AGENT_CACHE_SIZE):
+            cache.popitem(last=False)
         return agent
+
+    @staticmethod
+    def clear_cache() -> None:
+        AgentFactory._cache.clear()
@@ -0,0 +1,93 @@
+"""
+对话统计
+
+用 SQL 聚合计算用户的对话数、消息数与各模式对话数，结果按用户缓存在进程内；
+写入消息、新建或删除对话后调用 invalidate(user_id) 使缓存失效。
+"""
+import time
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models.conversation import Conversation
+from app.models.message import Message
+
+CHAT_MODES = ("normal", "data_analysis", "code_review")
+
+
+async def compute_chat_stats(db: AsyncSession, user_id: int) -> dict:
+    """两条聚合查询得到统计结果，不加载对话与消息行"""
+    mode_rows = await db.execute(
+        select(Conversation.mode, func.count(Conversation.id))
+        .where(Conversation.user_id == user_id)
+        .group_by(Conversation.mode)
+    )
+    by_mode = dict(mode_rows.all())
+    message_result = await db.execute(
+        select(func.count(Message.id))
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .where(Conversation.user_id == user_id)
+    )
+    return {
+        "total_conversations": sum(by_mode.values()),
+        "total_messages": message_result.scalar() or 0,
+        "conversations_by_mode": {mode: by_mode.get(mode, 0) for mode in CHAT_MODES},
+    }
+
+
+class ChatStatsCache:
+    """按用户缓存统计结果"""
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = settings.CHAT_STATS_CACHE_TTL if ttl is None else ttl
+        # user_id -> (缓存时间(monotonic), 统计结果)
+        self._entries: dict[int, tuple[float, dict]] = {}
+        # user_id -> 失效次数；计算期间发生失效时不写入缓存
+        self._versions: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession, user_id: int) -> dict:
+        if not self.ttl:
+            # ttl 为 0 表示不缓存
+            self.misses += 1
+            return await compute_chat_stats(db, user_id)
+
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self.hits += 1
+            return _copy(entry[1])
+
+        self.misses += 1
+        version = self._versions.get(user_id, 0)
+        stats = await compute_chat_stats(db, user_id)
+        if self._versions.get(user_id, 0) == version:
+            self._entries[user_id] = (time.monotonic(), stats)
+        return _copy(stats)
+
+    def invalidate(self, user_id: int) -> None:
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._versions.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def _copy(stats: dict) -> dict:
+    return {**stats, "conversations_by_mode": dict(stats["conversations_by_mode"])}
+
+
+# 全局统计缓存
+chat_stats_cache = ChatStatsCache()
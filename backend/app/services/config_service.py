@@ -0,0 +1,90 @@
+"""
+配置读取服务
+
+model_config / mysql_config / gitlab_config 等配置解析后缓存在进程内，
+请求与 Agent 工具调用直接读内存；PUT /api/v1/config/* 写库后调用 update()
+刷新缓存并递增版本号，依赖配置的缓存（如 Agent）可按版本号判断是否过期。
+"""
+import json
+import logging
+import time
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models.config import Config
+from app.models.database import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigService:
+    """进程内配置缓存"""
+
+    def __init__(self, ttl: Optional[int] = None, session_factory=None):
+        self.ttl = settings.CONFIG_CACHE_TTL if ttl is None else ttl
+        self.session_factory = session_factory or ReadSessionLocal
+        self.version = 0
+        # 实际查询配置表的次数
+        self.loads = 0
+        # key -> (加载时间(monotonic), 解析后的值；配置不存在时为 None)
+        self._entries: dict[str, tuple[float, Optional[dict[str, Any]]]] = {}
+
+    def _cached(self, key: str) -> tuple[bool, Optional[dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        loaded_at, value = entry
+        if self.ttl and time.monotonic() - loaded_at > self.ttl:
+            return False, None
+        return True, value
+
+    async def _read(self, db: AsyncSession, key: str) -> Optional[dict[str, Any]]:
+        result = await db.execute(select(Config.value).where(Config.key == key))
+        raw = result.scalar_one_or_none()
+        self.loads += 1
+        # 解析失败时抛出 json.JSONDecodeError，不写入缓存
+        return None if raw is None else json.loads(raw)
+
+    async def get(self, key: str, db: Optional[AsyncSession] = None) -> Optional[dict[str, Any]]:
+        """
+        读取解析后的配置，返回副本；配置不存在时返回 None
+
+        参数:
+            key: 配置键
+            db: 可选的数据库会话，缓存未命中时复用该会话查询，否则单独开会话
+        """
+        found, value = self._cached(key)
+        if not found:
+            if db is not None:
+                value = await self._read(db, key)
+            else:
+                async with self.session_factory() as session:
+                    value = await self._read(session, key)
+            self._entries[key] = (time.monotonic(), value)
+        return dict(value) if value is not None else None
+
+    def update(self, key: str, value: dict[str, Any]) -> int:
+        """配置写库成功后刷新缓存，返回新的版本号"""
+        self._entries[key] = (time.monotonic(), dict(value))
+        self.version += 1
+        logger.info("配置已更新: %s (version=%s)", key, self.version)
+        return self.version
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """丢弃缓存（key 为空时全部丢弃），下次读取时重新查库"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+        self.version += 1
+        return self.version
+
+    def stats(self) -> dict[str, Any]:
+        return {"version": self.version, "cached_keys": sorted(self._entries), "loads": self.loads}
+
+
+# 全局配置服务实例
+config_service = ConfigService()
@@ -0,0 +1,183 @@
+"""
+对话记忆
+
+为 Agent 组装历史消息：最近的若干轮按 token 预算原样带上，更早的轮次折叠进
+滚动摘要。摘要只在折叠时生成一次，保存在 conversations.summary 上；
+最近消息缓存在进程内（按对话 LRU），稳定状态下每轮对话不再查询 SQLite。
+"""
+import logging
+import re
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models.conversation import Conversation
+from app.models.database import AsyncSessionLocal, safe_commit
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+# (previous_summary, messages) -> new_summary
+Summarizer = Callable[[Optional[str], list[dict]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文约每字 1 个，其余约每 4 个字符 1 个"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class _ConversationState:
+    __slots__ = ("summary", "summary_message_id", "turns")
+
+    def __init__(self, summary: Optional[str], summary_message_id: Optional[int], max_messages: int):
+        self.summary = summary
+        self.summary_message_id = summary_message_id
+        # (message_id, role, content, tokens)
+        self.turns: deque[tuple[int, str, str, int]] = deque(maxlen=max_messages)
+
+
+class ConversationMemory:
+    """按对话缓存最近消息与滚动摘要"""
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        session_factory=None,
+    ):
+        self.max_tokens = max_tokens or settings.CHAT_HISTORY_MAX_TOKENS
+        self.max_messages = max_messages or settings.CHAT_HISTORY_MAX_MESSAGES
+        self.cache_size = cache_size or settings.CHAT_HISTORY_CACHE_SIZE
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._states: OrderedDict[int, _ConversationState] = OrderedDict()
+
+    async def _state(self, conversation_id: int, db: Optional[AsyncSession]) -> _ConversationState:
+        state = self._states.get(conversation_id)
+        if state is not None:
+            self._states.move_to_end(conversation_id)
+            return state
+        if db is None:
+            async with self.session_factory() as session:
+                state = await self._load(session, conversation_id)
+        else:
+            state = await self._load(db, conversation_id)
+        self._states[conversation_id] = state
+        while len(self._states) > self.cache_size:
+            self._states.popitem(last=False)
+        return state
+
+    async def _load(self, db: AsyncSession, conversation_id: int) -> _ConversationState:
+        result = await db.execute(
+            select(Conversation.summary, Conversation.summary_message_id).where(Conversation.id == conversation_id)
+        )
+        row = result.first()
+        summary, summary_message_id = (row[0], row[1]) if row else (None, None)
+        query = (
+            select(Message.id, Message.role, Message.content)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.id.desc())
+            .limit(self.max_messages)
+        )
+        if summary_message_id:
+            query = query.where(Message.id > summary_message_id)
+        rows = (await db.execute(query)).all()
+        state = _ConversationState(summary, summary_message_id, self.max_messages)
+        for message_id, role, content in reversed(rows):
+            state.turns.append((message_id, role, content, estimate_tokens(content)))
+        return state
+
+    def _split(self, state: _ConversationState) -> tuple[list, list]:
+        """按 token 预算从最新往回取，返回 (超出预算的较早消息, 预算内的最近消息)"""
+        used = 0
+        cut = len(state.turns)
+        for index in range(len(state.turns) - 1, -1, -1):
+            tokens = state.turns[index][3]
+            if used + tokens > self.max_tokens and cut < len(state.turns):
+                break
+            used += tokens
+            cut = index
+        turns = list(state.turns)
+        return turns[:cut], turns[cut:]
+
+    async def history(self, conversation_id: int, db: Optional[AsyncSession] = None) -> list[dict]:
+        """
+        组装发送给 Agent 的历史消息（不含本轮用户消息）
+
+        返回:
+            [{"role": "system", "content": 摘要}, {"role": "user"/"assistant", "content": ...}, ...]
+        """
+        state = await self._state(conversation_id, db)
+        _, recent = self._split(state)
+        messages = []
+        if state.summary:
+            messages.append({"role": "system", "content": f"此前对话摘要：\n{state.summary}"})
+        messages.extend({"role": role, "content": content} for _, role, content, _ in recent)
+        return messages
+
+    def append(self, conversation_id: int, message_id: int, role: str, content: str) -> None:
+        """消息写库后同步进缓存；对话未在缓存中时忽略（下次读取会从库加载）"""
+        state = self._states.get(conversation_id)
+        if state is None:
+            return
+        state.turns.append((message_id, role, content, estimate_tokens(content)))
+
+    async def compact(self, conversation_id: int, summarizer: Summarizer) -> bool:
+        """
+        最近消息超出 token 预算时，把较早的消息折叠进滚动摘要并持久化；
+        一次折叠到只剩约一半预算，避免每轮都调用模型生成摘要
+        """
+        state = self._states.get(conversation_id)
+        if state is None:
+            return False
+        total = sum(turn[3] for turn in state.turns)
+        if total <= self.max_tokens:
+            return False
+
+        folded = []
+        while state.turns and total > self.max_tokens // 2:
+            turn = state.turns[0]
+            folded.append(turn)
+            total -= turn[3]
+            state.turns.popleft()
+        if not folded:
+            return False
+
+        try:
+            summary = await summarizer(
+                state.summary,
+                [{"role": role, "content": content} for _, role, content, _ in folded],
+            )
+        except Exception as exc:
+            # 摘要失败时恢复缓存，本轮仍按预算截断历史
+            logger.warning("生成对话摘要失败: %s", exc)
+            state.turns.extendleft(reversed(folded))
+            return False
+
+        state.summary = summary
+        state.summary_message_id = folded[-1][0]
+        async with self.session_factory() as db:
+            conversation = await db.get(Conversation, conversation_id)
+            if conversation is not None:
+                conversation.summary = state.summary
+                conversation.summary_message_id = state.summary_message_id
+                await safe_commit(db)
+        return True
+
+    def forget(self, conversation_id: int) -> None:
+        self._states.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        self._states.clear()
+
+
+# 全局对话记忆实例
+conversation_memory = ConversationMemory()
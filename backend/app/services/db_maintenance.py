@@ -0,0 +1,81 @@
+"""
+SQLite 数据库维护
+
+由应用启动的后台任务按 settings.DB_MAINTENANCE_INTERVAL 定期执行：
+- 首次（尚无 sqlite_stat1）执行 ANALYZE，之后执行开销很小的 PRAGMA optimize
+- 库为 auto_vacuum=INCREMENTAL 时按批回收空闲页
+- 合并消息全文检索索引（messages_fts）的增量小段
+- WAL 模式下做一次 TRUNCATE 检查点，避免 -wal 文件持续增长
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.settings import settings
+from app.models.database import engine
+from app.services.message_search import optimize_message_search, search_index_exists
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA auto_vacuum 的取值：0=NONE 1=FULL 2=INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+async def run_maintenance(target_engine: Optional[AsyncEngine] = None, vacuum_pages: Optional[int] = None) -> dict:
+    """
+    执行一轮维护，返回各步骤结果
+
+    参数:
+        target_engine: 目标引擎，默认写引擎
+        vacuum_pages: 本轮最多回收的空闲页数，默认 settings.DB_INCREMENTAL_VACUUM_PAGES
+    """
+    target_engine = target_engine or engine
+    if target_engine.dialect.name != "sqlite":
+        return {}
+    vacuum_pages = settings.DB_INCREMENTAL_VACUUM_PAGES if vacuum_pages is None else vacuum_pages
+
+    report = {
+        "analyzed": False,
+        "optimized": False,
+        "search_optimized": False,
+        "vacuumed_pages": 0,
+        "checkpoint": None,
+    }
+    # 自动提交模式：增量 VACUUM 与检查点不能在事务中执行
+    async with target_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        has_stats = (
+            await conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"))
+        ).first()
+        if has_stats:
+            await conn.execute(text("PRAGMA optimize"))
+            report["optimized"] = True
+        else:
+            await conn.execute(text("ANALYZE"))
+            report["analyzed"] = True
+
+        # 合并全文检索索引的增量小段
+        if await search_index_exists(conn):
+            await optimize_message_search(conn)
+            report["search_optimized"] = True
+
+        auto_vacuum = (await conn.execute(text("PRAGMA auto_vacuum"))).scalar()
+        free_pages = (await conn.execute(text("PRAGMA freelist_count"))).scalar() or 0
+        if auto_vacuum == AUTO_VACUUM_INCREMENTAL and free_pages and vacuum_pages > 0:
+            # 每执行一步只回收一页，executescript 会把语句执行到底
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+            remaining = (await conn.execute(text("PRAGMA freelist_count"))).scalar() or 0
+            report["vacuumed_pages"] = free_pages - remaining
+        elif free_pages and auto_vacuum != AUTO_VACUUM_INCREMENTAL:
+            logger.debug("数据库未启用增量 VACUUM（auto_vacuum=%s），空闲页 %s", auto_vacuum, free_pages)
+
+        journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        if str(journal_mode).lower() == "wal":
+            busy, log_frames, checkpointed = (await conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))).one()
+            report["checkpoint"] = {"busy": busy, "log_frames": log_frames, "checkpointed": checkpointed}
+
+    return report
@@ -1,6 +1,7 @@
 """
 GitLab 用户同步服务（基于 MCP GitLab 工具）
 """
+import asyncio
 import logging
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,7 +12,9 @@ from app.models.gitlab_project import GitLabProject
 from app.models.gitlab_branch import GitLabBranch
 from app.models.gitlab_commit import GitLabCommit
 from app.models.gitlab_commit_diff import GitLabCommitDiff
+from app.services.mcp_cache import mcp_result_cache
 from app.services.mcp_gitlab import MCPGitLabClient
+from app.utils.pagination import count_cache
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +48,7 @@ async def sync_gitlab_users(
         )
 
     await safe_commit(db)
+    count_cache.invalidate(GitLabUser.__tablename__)
     logger.info("同步GitLab用户完成: %s", len(users))
     return {"success": True, "user_count": len(users)}
 
@@ -56,6 +60,7 @@ async def sync_gitlab_projects(
 ) -> dict:
     """同步GitLab项目到本地缓存表"""
     client = client or MCPGitLabClient()
+    await mcp_result_cache.invalidate("gitlab", ["list_projects"])
     projects = await client.list_projects(gitlab_config)
 
     existing = (await db.execute(select(GitLabProject))).scalars().all()
@@ -77,6 +82,7 @@ async def sync_gitlab_projects(
         )
 
     await safe_commit(db)
+    count_cache.invalidate(GitLabProject.__tablename__)
     logger.info("同步GitLab项目完成: %s", len(projects))
     return {"success": True, "project_count": len(projects)}
 
@@ -88,6 +94,7 @@ async def sync_gitlab_branches(
     client: MCPGitLabClient | None = None,
 ) -> dict:
     client = client or MCPGitLabClient()
+    await mcp_result_cache.invalidate("gitlab", ["list_branches"])
     branches = await client.list_branches(gitlab_config, project_id)
 
     await db.execute(delete(GitLabBranch).where(GitLabBranch.project_id == project_id))
@@ -101,6 +108,7 @@ async def sync_gitlab_branches(
             )
         )
     await safe_commit(db)
+    count_cache.invalidate(GitLabBranch.__tablename__)
     return {"success": True, "branch_count": len(branches)}
 
 
@@ -134,6 +142,7 @@ async def sync_gitlab_commits(
             )
         )
     await safe_commit(db)
+    count_cache.invalidate(GitLabCommit.__tablename__)
     return {"success": True, "commit_count": len(commits)}
 
 
@@ -168,10 +177,37 @@ async def sync_gitlab_commit_diffs(
     return {"success": True, "diff_count": len(diffs)}
 
 
-async def sync_all_gitlab_branches(db: AsyncSession, gitlab_config: dict) -> dict:
-    projects = (await db.execute(select(GitLabProject))).scalars().all()
+async def sync_all_gitlab_branches(
+    db: AsyncSession,
+    gitlab_config: dict,
+    client: MCPGitLabClient | None = None,
+    concurrency: int = 8,
+) -> dict:
+    """并发拉取所有项目的分支，再在同一个事务中写入本地缓存表"""
+    client = client or MCPGitLabClient()
+    await mcp_result_cache.invalidate("gitlab", ["list_branches"])
+    project_ids = (await db.execute(select(GitLabProject.id))).scalars().all()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(project_id: int) -> list[dict]:
+        async with semaphore:
+            return await client.list_branches(gitlab_config, project_id)
+
+    results = await asyncio.gather(*(fetch(project_id) for project_id in project_ids))
+
     total = 0
-    for project in projects:
-        result = await sync_gitlab_branches(db, gitlab_config, project.id)
-        total += result.get("branch_count", 0)
+    for project_id, branches in zip(project_ids, results):
+        await db.execute(delete(GitLabBranch).where(GitLabBranch.project_id == project_id))
+        for branch in branches:
+            db.add(
+                GitLabBranch(
+                    project_id=project_id,
+                    name=branch.get("name") or "",
+                    commit_sha=branch.get("commit_sha"),
+                    committed_date=branch.get("committed_date"),
+                )
+            )
+        total += len(branches)
+    await safe_commit(db)
+    count_cache.invalidate(GitLabBranch.__tablename__)
     return {"success": True, "branch_count": total}
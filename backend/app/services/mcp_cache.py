@@ -0,0 +1,201 @@
+"""
+MCP 只读工具结果缓存
+
+两级缓存：进程内 LRU + SQLite 持久化表（mcp_cache_entries）。
+缓存键为 (namespace, tool, arguments, 配置指纹)，每个工具单独配置 TTL；
+元数据同步时按工具显式失效。
+"""
+import copy
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import delete
+
+from app.config.settings import settings
+from app.models.database import AsyncSessionLocal, safe_commit
+from app.models.mcp_cache import MCPCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def build_cache_key(namespace: str, tool: str, arguments: Optional[dict[str, Any]], fingerprint: str) -> str:
+    payload = json.dumps(
+        [namespace, tool, arguments or {}, fingerprint],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MCPResultCache:
+    """MCP工具结果两级缓存"""
+
+    def __init__(
+        self,
+        ttls: Optional[dict[str, int]] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        session_factory=None,
+    ):
+        self.ttls = dict(settings.MCP_CACHE_TTLS if ttls is None else ttls)
+        self.max_entries = max(1, max_entries or settings.MCP_CACHE_MAX_ENTRIES)
+        self.enabled = settings.MCP_CACHE_ENABLED if enabled is None else enabled
+        self.session_factory = session_factory or AsyncSessionLocal
+        # cache_key -> (namespace, tool, expires_at(monotonic), value)
+        self._memory: OrderedDict[str, tuple[str, str, float, Any]] = OrderedDict()
+        self._counters: dict[str, dict[str, int]] = {}
+        # 失效次数；读取或调用 loader 期间发生失效时不写入缓存
+        self._version = 0
+
+    def is_cacheable(self, tool: str) -> bool:
+        return self.enabled and self.ttls.get(tool, 0) > 0
+
+    def _count(self, tool: str, outcome: str) -> None:
+        counters = self._counters.setdefault(tool, {"memory_hits": 0, "persistent_hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def _remember(self, key: str, namespace: str, tool: str, ttl: float, value: Any) -> None:
+        # 存副本：调用方修改返回值不影响缓存
+        self._memory[key] = (namespace, tool, time.monotonic() + ttl, copy.deepcopy(value))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _load_persistent(self, key: str) -> tuple[bool, Any, float]:
+        async with self.session_factory() as db:
+            entry = await db.get(MCPCacheEntry, key)
+            if entry is None:
+                return False, None, 0
+            remaining = (entry.expires_at - datetime.utcnow()).total_seconds()
+            if remaining <= 0:
+                return False, None, 0
+            return True, json.loads(entry.value), remaining
+
+    async def _store_persistent(
+        self,
+        key: str,
+        namespace: str,
+        tool: str,
+        fingerprint: str,
+        ttl: int,
+        value: Any,
+    ) -> None:
+        async with self.session_factory() as db:
+            await db.merge(
+                MCPCacheEntry(
+                    cache_key=key,
+                    namespace=namespace,
+                    tool=tool,
+                    config_fingerprint=fingerprint,
+                    value=json.dumps(value, ensure_ascii=False, default=str),
+                    expires_at=datetime.utcnow() + timedelta(seconds=ttl),
+                )
+            )
+            await safe_commit(db)
+
+    async def get_or_call(
+        self,
+        namespace: str,
+        tool: str,
+        arguments: Optional[dict[str, Any]],
+        fingerprint: str,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """命中缓存直接返回，否则调用 loader 并写入两级缓存"""
+        if not self.is_cacheable(tool):
+            return await loader()
+
+        ttl = self.ttls[tool]
+        key = build_cache_key(namespace, tool, arguments, fingerprint)
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            if cached[2] > time.monotonic():
+                self._memory.move_to_end(key)
+                self._count(tool, "memory_hits")
+                return copy.deepcopy(cached[3])
+            self._memory.pop(key, None)
+
+        version = self._version
+        try:
+            found, value, remaining = await self._load_persistent(key)
+        except Exception as exc:
+            # 持久化层不可用时退化为仅内存缓存
+            logger.warning("读取MCP持久化缓存失败: %s", exc)
+            found, value, remaining = False, None, 0
+        if found:
+            if self._version == version:
+                self._remember(key, namespace, tool, remaining, value)
+            self._count(tool, "persistent_hits")
+            return value
+
+        self._count(tool, "misses")
+        value = await loader()
+        if self._version != version:
+            # loader 运行期间缓存已失效，结果可能是旧数据，不写入缓存
+            return value
+        self._remember(key, namespace, tool, ttl, value)
+        try:
+            await self._store_persistent(key, namespace, tool, fingerprint, ttl, value)
+        except Exception as exc:
+            logger.warning("写入MCP持久化缓存失败: %s", exc)
+        return value
+
+    async def invalidate(self, namespace: Optional[str] = None, tools: Optional[list[str]] = None) -> None:
+        """按命名空间/工具失效缓存（两级同时清除）"""
+        self._version += 1
+        for key, (entry_namespace, entry_tool, _, _) in list(self._memory.items()):
+            if namespace and entry_namespace != namespace:
+                continue
+            if tools and entry_tool not in tools:
+                continue
+            self._memory.pop(key, None)
+
+        statement = delete(MCPCacheEntry)
+        if namespace:
+            statement = statement.where(MCPCacheEntry.namespace == namespace)
+        if tools:
+            statement = statement.where(MCPCacheEntry.tool.in_(tools))
+        try:
+            async with self.session_factory() as db:
+                await db.execute(statement)
+                await safe_commit(db)
+        except Exception as exc:
+            logger.warning("清除MCP持久化缓存失败: %s", exc)
+        logger.info("MCP缓存已失效: namespace=%s tools=%s", namespace, tools)
+
+    async def purge_expired(self) -> int:
+        """删除已过期的持久化缓存行"""
+        async with self.session_factory() as db:
+            result = await db.execute(delete(MCPCacheEntry).where(MCPCacheEntry.expires_at <= datetime.utcnow()))
+            await safe_commit(db)
+            return result.rowcount or 0
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> dict[str, Any]:
+        totals = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+        for counters in self._counters.values():
+            for name, value in counters.items():
+                totals[name] += value
+        lookups = sum(totals.values())
+        hits = totals["memory_hits"] + totals["persistent_hits"]
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            **totals,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "tools": {tool: dict(counters) for tool, counters in self._counters.items()},
+        }
+
+
+# 全局缓存实例
+mcp_result_cache = MCPResultCache()
@@ -0,0 +1,106 @@
+"""
+MCP 列式查询结果解码
+
+mysql-mcp-server 的 execute_query 在 result_format="columnar" 时返回
+{"format": "columnar", "columns", "types", "data", "row_count"}，
+data 按列组织。ColumnarRows 对外表现为只读的行字典序列，
+只有被访问的行才会构造字典，decimal/日期列在取值时才转换。
+"""
+from collections.abc import Sequence
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Optional
+
+COLUMNAR_FORMAT = "columnar"
+
+
+def _decimal(value: str) -> Any:
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError):
+        return value
+
+
+def _datetime(value: str) -> Any:
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return value
+
+
+def _date(value: str) -> Any:
+    try:
+        return date.fromisoformat(value)
+    except (ValueError, TypeError):
+        return value
+
+
+# 类型标记 -> 解码函数；未列出的类型原样返回
+_DECODERS: dict[str, Callable[[Any], Any]] = {
+    "decimal": _decimal,
+    "datetime": _datetime,
+    "date": _date,
+}
+
+
+def is_columnar(payload: Any) -> bool:
+    return isinstance(payload, dict) and payload.get("format") == COLUMNAR_FORMAT
+
+
+class ColumnarRows(Sequence):
+    """列式结果的懒解码行视图"""
+
+    __slots__ = ("columns", "types", "_data", "_decoders", "_length")
+
+    def __init__(self, payload: dict[str, Any]):
+        self.columns: list[str] = list(payload.get("columns") or [])
+        self.types: list[str] = list(payload.get("types") or [])
+        self._data: list[list[Any]] = payload.get("data") or [[] for _ in self.columns]
+        self._decoders: list[Optional[Callable[[Any], Any]]] = [
+            _DECODERS.get(self.types[index]) if index < len(self.types) else None
+            for index in range(len(self.columns))
+        ]
+        default_length = len(self._data[0]) if self._data else 0
+        self._length = int(payload.get("row_count", default_length))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(position) for position in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ColumnarRows index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        for position in range(self._length):
+            yield self._row(position)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, tuple, ColumnarRows)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ColumnarRows(columns={self.columns!r}, rows={self._length})"
+
+    def _row(self, position: int) -> dict[str, Any]:
+        row = {}
+        for name, values, decode in zip(self.columns, self._data, self._decoders):
+            value = values[position]
+            row[name] = decode(value) if decode is not None and value is not None else value
+        return row
+
+    def column(self, name: str) -> list[Any]:
+        """按列名取出整列（已解码），不构造行字典"""
+        index = self.columns.index(name)
+        decode = self._decoders[index]
+        values = self._data[index]
+        if decode is None:
+            return list(values)
+        return [None if value is None else decode(value) for value in values]
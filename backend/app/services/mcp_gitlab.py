@@ -1,15 +1,15 @@
 """
 MCP GitLab工具服务
 """
-import subprocess
-import sys
+import asyncio
+import importlib.util
 import json
-import mcp.types as mcp_types
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Any
 from pathlib import Path
 import logging
-import select as select_module
-import time
 
 from sqlalchemy import select as sa_select
 
@@ -17,17 +17,107 @@ from app.models.database import get_db
 from app.models.gitlab_project import GitLabProject
 
 from app.config.settings import settings
+from app.services.mcp_cache import MCPResultCache, mcp_result_cache
+from app.services.mcp_session import config_fingerprint, MCPSessionPool
 
 logger = logging.getLogger(__name__)
 
+GITLAB_MCP_SERVER_PATH = str(
+    Path(__file__).resolve().parents[2] / "mcp-server" / "gitlab-mcp-server" / "server.py"
+)
+
+# 全局会话池：按GitLab配置复用常驻的 gitlab-mcp-server 进程
+gitlab_session_pool = MCPSessionPool(
+    GITLAB_MCP_SERVER_PATH,
+    name="gitlab-mcp-server",
+    max_size=settings.GITLAB_MCP_POOL_SIZE,
+    idle_timeout=settings.GITLAB_MCP_IDLE_TIMEOUT,
+    call_timeout=float(settings.GITLAB_MCP_TIMEOUT or 120),
+)
+
+# 进程内模式可调用的工具（对应 gitlab-mcp-server 中的 @mcp.tool 函数）
+INPROCESS_TOOLS = {
+    "list_projects",
+    "list_users",
+    "list_branches",
+    "list_commits",
+    "get_user_commits",
+    "get_commit_diff",
+}
+# 与 gitlab-mcp-server 的 DEADLINE_KEY 一致
+DEADLINE_KEY = "_DEADLINE"
+
+_inprocess_server = None
+_inprocess_lock = threading.Lock()
+_inprocess_executor: Optional[ThreadPoolExecutor] = None
+# 已超时返回但工作线程仍在执行的调用数。工具只在分页/循环之间检查截止时间，
+# 单次 HTTP 请求仍受 GITLAB_TIMEOUT 约束，期间线程无法被中断，需计数以免线程池被悄悄占满
+_inprocess_timed_out = 0
+
+
+def _load_inprocess_server():
+    """按文件路径导入 gitlab-mcp-server 模块（只导入一次）"""
+    global _inprocess_server
+    with _inprocess_lock:
+        if _inprocess_server is None:
+            spec = importlib.util.spec_from_file_location("gitlab_mcp_server", GITLAB_MCP_SERVER_PATH)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _inprocess_server = module
+    return _inprocess_server
+
+
+def _get_inprocess_executor() -> ThreadPoolExecutor:
+    global _inprocess_executor
+    with _inprocess_lock:
+        if _inprocess_executor is None:
+            _inprocess_executor = ThreadPoolExecutor(
+                max_workers=_inprocess_workers(),
+                thread_name_prefix="gitlab-mcp",
+            )
+    return _inprocess_executor
+
+
+def _inprocess_workers() -> int:
+    return max(1, settings.GITLAB_MCP_INPROCESS_WORKERS)
+
+
+def _timed_out_worker_done(_future) -> None:
+    global _inprocess_timed_out
+    with _inprocess_lock:
+        _inprocess_timed_out -= 1
+
+
+def inprocess_stats() -> dict[str, int]:
+    return {
+        "workers": _inprocess_workers(),
+        "timed_out_running": _inprocess_timed_out,
+    }
+
+
+def _run_inprocess_tool(name: str, arguments: dict[str, Any], env: dict[str, str]):
+    server = _load_inprocess_server()
+    tool = getattr(server, name)
+    # fastmcp 的 @mcp.tool 可能返回包装对象，原函数在 fn 属性上
+    func = getattr(tool, "fn", tool)
+    with server.use_config(env):
+        return func(**arguments)
+
 
 class MCPGitLabClient:
     """MCP GitLab客户端"""
 
-    def __init__(self):
-        backend_root = Path(__file__).resolve().parents[2]
-        self.server_path = str(backend_root / "mcp-server" / "gitlab-mcp-server" / "server.py")
-        self._request_id = 0
+    def __init__(
+        self,
+        pool: Optional[MCPSessionPool] = None,
+        mode: Optional[str] = None,
+        cache: Optional[MCPResultCache] = None,
+    ):
+        self.pool = pool or gitlab_session_pool
+        self.server_path = self.pool.server_path
+        self.cache = cache or mcp_result_cache
+        # stdio: 独立子进程（隔离性好）；inprocess: 线程池内直接调用工具函数（无进程启动与重复认证开销）
+        self.mode = mode or settings.GITLAB_MCP_MODE
 
     def _build_env(self, gitlab_config: Optional[dict[str, Any]] = None) -> dict[str, str]:
         env = {}
@@ -44,141 +134,77 @@ class MCPGitLabClient:
             })
         return env
 
-    def _call_tool(
+    async def _call_tool(
         self,
         name: str,
         arguments: Optional[dict[str, Any]],
         gitlab_config: Optional[dict[str, Any]] = None,
     ) -> list[dict]:
-        self._request_id += 1
-        init_id = self._request_id
-        self._request_id += 1
-        call_id = self._request_id
-
-        init_request = {
-            "jsonrpc": "2.0",
-            "id": init_id,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": mcp_types.LATEST_PROTOCOL_VERSION,
-                "capabilities": {},
-                "clientInfo": {"name": "zyk-ai-agent", "version": "0.1"},
-            },
-        }
-        initialized_notification = {
-            "jsonrpc": "2.0",
-            "method": "notifications/initialized",
-            "params": {},
-        }
-        call_request = {
-            "jsonrpc": "2.0",
-            "id": call_id,
-            "method": "tools/call",
-            "params": {"name": name, "arguments": arguments or {}},
-        }
-
-        process = subprocess.Popen(
-            [sys.executable, self.server_path],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env=self._build_env(gitlab_config),
+        env = self._build_env(gitlab_config)
+        return await self.cache.get_or_call(
+            "gitlab",
+            name,
+            arguments,
+            config_fingerprint(env),
+            lambda: self._call_tool_uncached(name, arguments, gitlab_config),
         )
-        input_text = "\n".join(
-            json.dumps(item, ensure_ascii=False)
-            for item in [init_request, initialized_notification, call_request]
-        ) + "\n"
-        if not process.stdin or not process.stdout or not process.stderr:
-            process.kill()
-            raise Exception("MCP Server failed to start with stdio pipes")
-
-        process.stdin.write(input_text)
-        process.stdin.flush()
-
-        response = None
-        responses = []
-        stdout_lines: list[str] = []
-        stderr_lines: list[str] = []
-        deadline = time.time() + float(settings.GITLAB_MCP_TIMEOUT or 120)
-
-        while time.time() < deadline:
-            if response is not None:
-                break
-            if process.poll() is not None:
-                break
-            rlist, _, _ = select_module.select([process.stdout, process.stderr], [], [], 0.5)
-            if not rlist:
-                continue
-            for stream in rlist:
-                line = stream.readline()
-                if not line:
-                    continue
-                if stream is process.stdout:
-                    stdout_lines.append(line)
-                    try:
-                        item = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        continue
-                    responses.append(item)
-                    if isinstance(item, dict) and item.get("id") == call_id:
-                        response = item
-                        break
-                else:
-                    stderr_lines.append(line)
-            if response is not None:
-                break
 
-        try:
-            process.stdin.close()
-        except Exception:
-            pass
+    async def _call_tool_uncached(
+        self,
+        name: str,
+        arguments: Optional[dict[str, Any]],
+        gitlab_config: Optional[dict[str, Any]] = None,
+    ) -> list[dict]:
+        if self.mode == "inprocess":
+            return await self._call_tool_inprocess(name, arguments, gitlab_config)
 
-        try:
-            remaining_out, remaining_err = process.communicate(timeout=1)
-            if remaining_out:
-                stdout_lines.append(remaining_out)
-            if remaining_err:
-                stderr_lines.append(remaining_err)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            remaining_out, remaining_err = process.communicate()
-            if remaining_out:
-                stdout_lines.append(remaining_out)
-            if remaining_err:
-                stderr_lines.append(remaining_err)
-
-        stdout = "".join(stdout_lines)
-        stderr = "".join(stderr_lines)
-
-        if stdout:
-            logger.info("MCP Server stdout (%s): %s", name, stdout.strip())
-        if stderr:
-            logger.warning("MCP Server stderr (%s): %s", name, stderr.strip())
-
-        if process.returncode not in (0, None):
-            raise Exception(f"MCP Server Error: {stderr}")
-
-        if response is None:
-            for item in responses:
-                if isinstance(item, dict) and item.get("id") == call_id:
-                    response = item
-                    break
-
-        if response is None:
-            try:
-                response = json.loads(stdout)
-            except json.JSONDecodeError:
-                response = responses[0] if responses else None
+        response = await self.pool.call_tool(self._build_env(gitlab_config), name, arguments or {})
+        logger.debug("MCP Server response (%s): %s", name, response)
 
         if not isinstance(response, dict):
-            raise Exception(f"MCP Server returned no valid response: {stdout}")
+            raise Exception(f"MCP Server returned no valid response: {response}")
 
         if "error" in response:
             raise Exception(f"Tool Error: {response['error']}")
 
         return self._parse_tool_result(response)
 
+    async def _call_tool_inprocess(
+        self,
+        name: str,
+        arguments: Optional[dict[str, Any]],
+        gitlab_config: Optional[dict[str, Any]] = None,
+    ) -> list[dict]:
+        if name not in INPROCESS_TOOLS:
+            raise Exception(f"Unknown GitLab tool: {name}")
+        global _inprocess_timed_out
+        if _inprocess_timed_out >= _inprocess_workers():
+            raise Exception(
+                f"GitLab in-process workers are all busy with {_inprocess_timed_out} timed-out calls: {name}"
+            )
+        timeout = float(settings.GITLAB_MCP_TIMEOUT or 120)
+        env = self._build_env(gitlab_config)
+        # 截止时间随配置传入工具，超时后工作线程在下一次分页前自行退出
+        env[DEADLINE_KEY] = str(time.monotonic() + timeout)
+        future = _get_inprocess_executor().submit(_run_inprocess_tool, name, arguments or {}, env)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                with _inprocess_lock:
+                    _inprocess_timed_out += 1
+                future.add_done_callback(_timed_out_worker_done)
+                logger.warning(
+                    "GitLab tool %s timed out, worker still running (%s/%s timed out)",
+                    name,
+                    _inprocess_timed_out,
+                    _inprocess_workers(),
+                )
+            raise Exception(f"GitLab tool timeout after {settings.GITLAB_MCP_TIMEOUT}s: {name}") from None
+        if result is None:
+            return []
+        return result
+
     def _parse_tool_result(self, response: dict[str, Any]) -> list[dict]:
         result = response.get("result")
         if isinstance(result, list):
@@ -227,13 +253,13 @@ class MCPGitLabClient:
 
     async def list_users(self, gitlab_config: Optional[dict[str, Any]] = None) -> list[dict]:
         try:
-            return self._call_tool("list_users", {}, gitlab_config=gitlab_config)
+            return await self._call_tool("list_users", {}, gitlab_config=gitlab_config)
         except Exception as e:
             raise Exception(f"获取GitLab用户列表失败: {e}")
 
     async def list_projects(self, gitlab_config: Optional[dict[str, Any]] = None) -> list[dict]:
         try:
-            return self._call_tool("list_projects", {}, gitlab_config=gitlab_config)
+            return await self._call_tool("list_projects", {}, gitlab_config=gitlab_config)
         except Exception as e:
             raise Exception(f"获取GitLab项目列表失败: {e}")
 
@@ -243,7 +269,7 @@ class MCPGitLabClient:
         project_id: int,
     ) -> list[dict]:
         try:
-            return self._call_tool(
+            return await self._call_tool(
                 "list_branches",
                 {"project_id": project_id},
                 gitlab_config=gitlab_config,
@@ -262,7 +288,7 @@ class MCPGitLabClient:
             args: dict[str, Any] = {"project_id": project_id, "limit": limit}
             if ref_name:
                 args["ref_name"] = ref_name
-            return self._call_tool("list_commits", args, gitlab_config=gitlab_config)
+            return await self._call_tool("list_commits", args, gitlab_config=gitlab_config)
         except Exception as e:
             raise Exception(f"获取GitLab提交列表失败: {e}")
 
@@ -287,7 +313,7 @@ class MCPGitLabClient:
                     ]
             if not project_ids:
                 logger.warning("MCP get_user_commits has no project_ids")
-            result = self._call_tool(
+            result = await self._call_tool(
                 "get_user_commits",
                 {
                     "username": username,
@@ -313,7 +339,7 @@ class MCPGitLabClient:
         commit_sha: str,
     ) -> dict:
         try:
-            result = self._call_tool(
+            result = await self._call_tool(
                 "get_commit_diff",
                 {"project_id": project_id, "commit_sha": commit_sha},
                 gitlab_config=gitlab_config,
@@ -1,35 +1,51 @@
 """
 MCP MySQL工具服务
 """
-import subprocess
-import sys
+import asyncio
 import json
-import mcp.types as mcp_types
+from collections import deque
 from typing import Optional, Any
 from pathlib import Path
 from app.config.settings import settings
+from app.services.mcp_cache import MCPResultCache, mcp_result_cache
+from app.services.mcp_columnar import ColumnarRows, is_columnar
+from app.services.mcp_session import config_fingerprint, MCPSessionError, MCPSessionPool
 import logging
-import select
-import time
 
 logger = logging.getLogger(__name__)
 
+# 基于当前文件位置计算 MCP Server 绝对路径，避免工作目录差异
+MYSQL_MCP_SERVER_PATH = str(
+    Path(__file__).resolve().parents[2] / "mcp-server" / "mysql-mcp-server" / "server.py"
+)
+
+# 全局会话池：按MySQL配置复用常驻的 mysql-mcp-server 进程
+mysql_session_pool = MCPSessionPool(
+    MYSQL_MCP_SERVER_PATH,
+    name="mysql-mcp-server",
+    max_size=settings.MYSQL_MCP_POOL_SIZE,
+    idle_timeout=settings.MYSQL_MCP_IDLE_TIMEOUT,
+    health_check_interval=settings.MYSQL_MCP_HEALTH_CHECK_INTERVAL,
+    call_timeout=settings.MYSQL_MCP_TIMEOUT,
+    # mysql-mcp-server 收到 notifications/cancelled 后 KILL QUERY 并中止请求
+    supports_cancel=True,
+)
+
 
 class MCPMySQLClient:
     """MCP MySQL客户端"""
     
-    def __init__(self):
+    def __init__(self, pool: Optional[MCPSessionPool] = None, cache: Optional[MCPResultCache] = None):
         """初始化客户端"""
-        # 基于当前文件位置计算 MCP Server 绝对路径，避免工作目录差异
-        backend_root = Path(__file__).resolve().parents[2]
-        self.server_path = str(backend_root / "mcp-server" / "mysql-mcp-server" / "server.py")
-        self._request_id = 0
+        self.pool = pool or mysql_session_pool
+        self.server_path = self.pool.server_path
+        self.cache = cache or mcp_result_cache
 
     def _build_env(self, mysql_config: Optional[dict[str, Any]] = None) -> dict[str, str]:
         """构建环境变量，优先使用传入的mysql_config"""
         env = {}
         if mysql_config:
-            logger.info(f"使用传入的MySQL配置连接: {mysql_config.get('host')}:{mysql_config.get('port')}")
+            logger.debug("使用传入的MySQL配置连接: %s:%s", mysql_config.get("host"), mysql_config.get("port"))
             env.update({
                 "MYSQL_HOST": mysql_config.get("host", "localhost"),
                 "MYSQL_PORT": str(mysql_config.get("port", 3306)),
@@ -38,7 +54,7 @@ class MCPMySQLClient:
                 "MYSQL_DATABASE": mysql_config.get("database", ""),
             })
         else:
-            logger.info("使用settings默认MySQL配置连接")
+            logger.debug("使用settings默认MySQL配置连接")
             env.update({
                 "MYSQL_HOST": settings.MYSQL_HOST,
                 "MYSQL_PORT": str(settings.MYSQL_PORT),
@@ -48,136 +64,26 @@ class MCPMySQLClient:
             })
         return env
 
-    def _call_tool(self, name: str, arguments: Optional[dict[str, Any]], mysql_config: Optional[dict[str, Any]] = None) -> list[dict]:
-        self._request_id += 1
-        init_id = self._request_id
-        self._request_id += 1
-        call_id = self._request_id
-
-        init_request = {
-            "jsonrpc": "2.0",
-            "id": init_id,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": mcp_types.LATEST_PROTOCOL_VERSION,
-                "capabilities": {},
-                "clientInfo": {
-                    "name": "zyk-ai-agent",
-                    "version": "0.1"
-                }
-            }
-        }
-        initialized_notification = {
-            "jsonrpc": "2.0",
-            "method": "notifications/initialized",
-            "params": {}
-        }
-        call_request = {
-            "jsonrpc": "2.0",
-            "id": call_id,
-            "method": "tools/call",
-            "params": {
-                "name": name,
-                "arguments": arguments or {}
-            }
-        }
-
-        process = subprocess.Popen(
-            [sys.executable, self.server_path],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env=self._build_env(mysql_config)
+    async def _call_tool(self, name: str, arguments: Optional[dict[str, Any]], mysql_config: Optional[dict[str, Any]] = None) -> list[dict]:
+        env = self._build_env(mysql_config)
+        # 元数据类只读工具走缓存，其余工具直接调用
+        return await self.cache.get_or_call(
+            "mysql",
+            name,
+            arguments,
+            config_fingerprint(env),
+            lambda: self._call_tool_uncached(name, arguments, env),
         )
-        input_text = "\n".join(
-            json.dumps(item, ensure_ascii=False)
-            for item in [init_request, initialized_notification, call_request]
-        ) + "\n"
-        if not process.stdin or not process.stdout or not process.stderr:
-            process.kill()
-            raise Exception("MCP Server failed to start with stdio pipes")
-
-        process.stdin.write(input_text)
-        process.stdin.flush()
-
-        response = None
-        responses = []
-        stdout_lines: list[str] = []
-        stderr_lines: list[str] = []
-        deadline = time.time() + 60
-
-        while time.time() < deadline:
-            if response is not None:
-                break
-            if process.poll() is not None:
-                break
-            rlist, _, _ = select.select([process.stdout, process.stderr], [], [], 0.5)
-            if not rlist:
-                continue
-            for stream in rlist:
-                line = stream.readline()
-                if not line:
-                    continue
-                if stream is process.stdout:
-                    stdout_lines.append(line)
-                    try:
-                        item = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        continue
-                    responses.append(item)
-                    if isinstance(item, dict) and item.get("id") == call_id:
-                        response = item
-                        break
-                else:
-                    stderr_lines.append(line)
-            if response is not None:
-                break
 
-        try:
-            process.stdin.close()
-        except Exception:
-            pass
+    async def _call_tool_uncached(self, name: str, arguments: Optional[dict[str, Any]], env: dict[str, str]) -> list[dict]:
+        response = await self.pool.call_tool(env, name, arguments or {})
+        return self._check_response(name, response)
 
-        try:
-            remaining_out, remaining_err = process.communicate(timeout=1)
-            if remaining_out:
-                stdout_lines.append(remaining_out)
-            if remaining_err:
-                stderr_lines.append(remaining_err)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            remaining_out, remaining_err = process.communicate()
-            if remaining_out:
-                stdout_lines.append(remaining_out)
-            if remaining_err:
-                stderr_lines.append(remaining_err)
-
-        stdout = "".join(stdout_lines)
-        stderr = "".join(stderr_lines)
-
-        if stdout:
-            logger.info("MCP Server stdout: %s", stdout.strip())
-        if stderr:
-            logger.warning("MCP Server stderr: %s", stderr.strip())
-
-        if process.returncode not in (0, None):
-            raise Exception(f"MCP Server Error: {stderr}")
-
-        if response is None:
-            for item in responses:
-                if isinstance(item, dict) and item.get("id") == call_id:
-                    response = item
-                    break
-
-        if response is None:
-            try:
-                response = json.loads(stdout)
-            except json.JSONDecodeError:
-                response = responses[0] if responses else None
+    def _check_response(self, name: str, response: Any) -> Any:
+        logger.debug("MCP Server response (%s): %s", name, response)
 
         if not isinstance(response, dict):
-            raise Exception(f"MCP Server returned no valid response: {stdout}")
+            raise Exception(f"MCP Server returned no valid response: {response}")
 
         if "error" in response:
             raise Exception(f"Tool Error: {response['error']}")
@@ -201,6 +107,10 @@ class MCPMySQLClient:
                 if isinstance(structured, dict) and "result" in structured:
                     if isinstance(structured["result"], list):
                         return structured["result"]
+                    if is_columnar(structured["result"]):
+                        return ColumnarRows(structured["result"])
+                if is_columnar(structured):
+                    return ColumnarRows(structured)
                 return structured
             if "result" in result and isinstance(result["result"], list):
                 return result["result"]
@@ -210,36 +120,69 @@ class MCPMySQLClient:
                     if isinstance(block, dict) and block.get("type") == "text":
                         text = block.get("text", "")
                         try:
-                            return json.loads(text)
+                            payload = json.loads(text)
                         except json.JSONDecodeError as exc:
                             raise Exception(f"Unexpected tool result text: {text}") from exc
+                        return ColumnarRows(payload) if is_columnar(payload) else payload
         raise Exception(f"Unexpected MCP tool result: {result}")
     
-    async def execute_query(self, query: str, mysql_config: Optional[dict[str, Any]] = None) -> list[dict]:
+    async def execute_query(
+        self,
+        query: str,
+        mysql_config: Optional[dict[str, Any]] = None,
+        columnar: Optional[bool] = None,
+    ) -> list[dict]:
         """
         执行MySQL查询
         
         参数:
             query: SQL查询语句
+            columnar: 是否使用列式编码传输，默认取 settings.MYSQL_MCP_COLUMNAR
         
         返回:
-            list[dict]: 查询结果
+            list[dict]: 查询结果；列式编码时为按行懒解码的 ColumnarRows
         """
+        arguments = {"sql": query}
+        if settings.MYSQL_MCP_COLUMNAR if columnar is None else columnar:
+            arguments["result_format"] = "columnar"
         try:
-            return self._call_tool(
+            return await self._call_tool(
                 "execute_query",
-                {"sql": query},
+                arguments,
                 mysql_config=mysql_config
             )
             
-        except subprocess.TimeoutExpired:
-            process.kill()
-            raise Exception("Query timeout")
         except json.JSONDecodeError as e:
             raise Exception(f"Failed to parse response: {e}")
         except Exception as e:
             raise Exception(f"Failed to execute query: {e}")
     
+    def stream_query(
+        self,
+        query: str,
+        mysql_config: Optional[dict[str, Any]] = None,
+        chunk_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> "MySQLQueryStream":
+        """
+        流式执行MySQL查询，按页拉取结果，超过行数/字节上限时提前结束
+
+        用法:
+            async with client.stream_query(sql) as stream:
+                async for row in stream:
+                    ...
+            stream.truncated  # 是否因上限被截断
+        """
+        return MySQLQueryStream(
+            self,
+            query,
+            mysql_config=mysql_config,
+            chunk_size=chunk_size or settings.MYSQL_STREAM_CHUNK_SIZE,
+            max_rows=settings.MYSQL_STREAM_MAX_ROWS if max_rows is None else max_rows,
+            max_bytes=settings.MYSQL_STREAM_MAX_BYTES if max_bytes is None else max_bytes,
+        )
+
     async def get_hospital_stats(self) -> list[dict]:
         """
         获取医院统计信息
@@ -262,7 +205,7 @@ class MCPMySQLClient:
     async def list_databases(self, mysql_config: Optional[dict[str, Any]] = None) -> list[dict]:
         """列出所有数据库"""
         try:
-            databases = self._call_tool("list_databases", {}, mysql_config=mysql_config)
+            databases = await self._call_tool("list_databases", {}, mysql_config=mysql_config)
             if not databases:
                 fallback_db = (mysql_config or {}).get("database")
                 if fallback_db:
@@ -275,7 +218,7 @@ class MCPMySQLClient:
         """列出指定数据库的所有表"""
         try:
             args = {"database": database} if database else {}
-            return self._call_tool("list_tables", args, mysql_config=mysql_config)
+            return await self._call_tool("list_tables", args, mysql_config=mysql_config)
         except Exception as e:
             raise Exception(f"获取表列表失败: {e}")
 
@@ -290,7 +233,7 @@ class MCPMySQLClient:
             args = {"table_name": table_name}
             if database:
                 args["database"] = database
-            return self._call_tool("describe_table", args, mysql_config=mysql_config)
+            return await self._call_tool("describe_table", args, mysql_config=mysql_config)
         except Exception as e:
             raise Exception(f"获取表结构失败: {e}")
 
@@ -302,7 +245,7 @@ class MCPMySQLClient:
         """获取表状态信息"""
         try:
             args = {"database": database} if database else {}
-            return self._call_tool("show_table_status", args, mysql_config=mysql_config)
+            return await self._call_tool("show_table_status", args, mysql_config=mysql_config)
         except Exception as e:
             raise Exception(f"获取表状态失败: {e}")
 
@@ -317,7 +260,7 @@ class MCPMySQLClient:
             args = {"table_name": table_name}
             if database:
                 args["database"] = database
-            return self._call_tool("get_table_indexes", args, mysql_config=mysql_config)
+            return await self._call_tool("get_table_indexes", args, mysql_config=mysql_config)
         except Exception as e:
             raise Exception(f"获取索引信息失败: {e}")
     
@@ -382,6 +325,130 @@ class MCPMySQLClient:
         """
         return await self.execute_query(query)
 
+    async def get_catalog(
+        self,
+        databases: Optional[list[str]] = None,
+        mysql_config: Optional[dict[str, Any]] = None,
+    ) -> dict[str, list[dict]]:
+        """批量获取表统计、字段和索引元数据，返回 {"tables", "columns", "indexes"}"""
+        try:
+            args = {"databases": databases} if databases else {}
+            return await self._call_tool("get_catalog", args, mysql_config=mysql_config)
+        except Exception as e:
+            raise Exception(f"获取元数据目录失败: {e}")
+
+    async def get_schema_summary(self, mysql_config: Optional[dict[str, Any]] = None) -> list[dict]:
+        """单次聚合查询获取各数据库的表数量"""
+        try:
+            return await self._call_tool("get_schema_summary", {}, mysql_config=mysql_config)
+        except Exception as e:
+            raise Exception(f"获取数据库汇总失败: {e}")
+
 
 # 创建全局客户端实例
 mcp_mysql_client = MCPMySQLClient()
+
+
+class MySQLQueryStream:
+    """流式查询结果：在同一个 MCP 会话上分页拉取服务端游标，逐行异步迭代"""
+
+    def __init__(
+        self,
+        client: MCPMySQLClient,
+        query: str,
+        mysql_config: Optional[dict[str, Any]],
+        chunk_size: int,
+        max_rows: int,
+        max_bytes: int,
+    ):
+        self.client = client
+        self.query = query
+        self.mysql_config = mysql_config
+        self.chunk_size = max(1, chunk_size)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.row_count = 0
+        self.byte_count = 0
+        self.truncated = False
+        self._session_cm = None
+        self._session = None
+        self._cursor_id: Optional[str] = None
+        self._buffer: deque = deque()
+        self._done = False
+
+    async def __aenter__(self) -> "MySQLQueryStream":
+        # 游标状态保存在某个 server 进程里，整个迭代过程必须独占同一个会话
+        self._session_cm = self.client.pool.session(self.client._build_env(self.mysql_config))
+        self._session = await self._session_cm.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        try:
+            # 会话已损坏时不再发请求，服务端会在空闲超时后回收游标；
+            # 被取消（客户端断开）时仍关闭游标，让服务端立即归还连接而不是读完剩余结果
+            if exc_type is None or not issubclass(exc_type, MCPSessionError):
+                await asyncio.shield(self._close_cursor())
+        finally:
+            await self._session_cm.__aexit__(exc_type, exc, tb)
+            self._session = None
+        return False
+
+    def __aiter__(self) -> "MySQLQueryStream":
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._session is None:
+            raise RuntimeError("MySQLQueryStream 需要在 async with 中使用")
+        while not self._buffer:
+            if self._done:
+                raise StopAsyncIteration
+            await self._fetch_page()
+
+        row = self._buffer.popleft()
+        size = len(json.dumps(row, ensure_ascii=False, default=str))
+        over_rows = self.max_rows and self.row_count >= self.max_rows
+        over_bytes = self.max_bytes and self.byte_count + size > self.max_bytes
+        if over_rows or over_bytes:
+            self.truncated = True
+            self._buffer.clear()
+            self._done = True
+            await self._close_cursor()
+            raise StopAsyncIteration
+
+        self.row_count += 1
+        self.byte_count += size
+        return row
+
+    def _next_chunk_size(self) -> int:
+        if not self.max_rows:
+            return self.chunk_size
+        # 多取一行用于判断是否超出上限
+        remaining = self.max_rows - self.row_count - len(self._buffer) + 1
+        return max(1, min(self.chunk_size, remaining))
+
+    async def _fetch_page(self) -> None:
+        if self._cursor_id is None:
+            name, arguments = "open_query_cursor", {"sql": self.query}
+        else:
+            name, arguments = "fetch_query_cursor", {"cursor_id": self._cursor_id}
+        arguments["chunk_size"] = self._next_chunk_size()
+        response = await self._session.call_tool(name, arguments, self.client.pool.call_timeout)
+        page = self.client._check_response(name, response)
+        self._buffer.extend(page.get("rows") or [])
+        self._cursor_id = page.get("cursor_id")
+        if page.get("done"):
+            self._done = True
+            self._cursor_id = None
+
+    async def _close_cursor(self) -> None:
+        if self._cursor_id is None:
+            return
+        cursor_id, self._cursor_id = self._cursor_id, None
+        try:
+            await self._session.call_tool(
+                "close_query_cursor",
+                {"cursor_id": cursor_id},
+                self.client.pool.call_timeout,
+            )
+        except Exception as exc:
+            logger.warning("关闭流式查询游标失败: %s", exc)
@@ -0,0 +1,423 @@
+"""
+MCP stdio 会话与会话池
+
+每个会话对应一个常驻的 MCP Server 子进程，只在启动时执行一次 initialize 握手，
+之后可以连续发送多次 tools/call。传输层基于 asyncio 子进程与流读取实现，
+等待响应时不会阻塞事件循环。会话池按照生效配置（环境变量）的指纹分组复用会话，
+并负责健康检查、空闲回收和总数上限控制。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+import mcp.types as mcp_types
+
+logger = logging.getLogger(__name__)
+
+# 单行 JSON-RPC 消息的读取上限（大结果集会整行返回）
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class MCPSessionError(Exception):
+    """会话传输层错误（进程退出、超时、协议异常），出现后会话不可再复用"""
+
+
+def config_fingerprint(env: dict[str, str]) -> str:
+    """计算配置指纹，用作会话池的分组键"""
+    payload = json.dumps(env, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MCPStdioSession:
+    """与单个 MCP Server 子进程的持久 JSON-RPC 会话"""
+
+    def __init__(self, server_path: str, env: dict[str, str], name: str = "mcp"):
+        self.server_path = server_path
+        self.env = env
+        self.name = name
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.broken = False
+        self._request_id = 0
+        self._pending: dict[int, asyncio.Future] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    async def start(self, timeout: float) -> None:
+        """启动子进程并完成 initialize 握手"""
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            self.server_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=self.env,
+            limit=STREAM_LIMIT,
+        )
+        self._tasks = [
+            asyncio.create_task(self._read_stdout()),
+            asyncio.create_task(self._read_stderr()),
+        ]
+
+        await self.request(
+            "initialize",
+            {
+                "protocolVersion": mcp_types.LATEST_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "zyk-ai-agent", "version": "0.1"},
+            },
+            timeout=timeout,
+        )
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}})
+
+    async def _read_stdout(self) -> None:
+        stream = self.process.stdout
+        try:
+            while True:
+                line = await stream.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.debug("MCP Server stdout (%s): %s", self.name, line[:500])
+                    continue
+                if not isinstance(item, dict):
+                    continue
+                future = self._pending.pop(item.get("id"), None) if "id" in item else None
+                if future is not None and not future.done():
+                    future.set_result(item)
+        except (ValueError, asyncio.LimitOverrunError) as exc:
+            logger.error("MCP Server stdout 读取失败 (%s): %s", self.name, exc)
+        finally:
+            self.broken = True
+            self._fail_pending(MCPSessionError(f"MCP Server process exited: {self.name}"))
+
+    async def _read_stderr(self) -> None:
+        stream = self.process.stderr
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            text = line.decode("utf-8", errors="replace").strip()
+            if text:
+                logger.warning("MCP Server stderr (%s): %s", self.name, text)
+
+    def _fail_pending(self, exc: Exception) -> None:
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            self.process.stdin.write(data)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError, RuntimeError) as exc:
+            self.broken = True
+            raise MCPSessionError(f"MCP Server stdin closed: {exc}") from exc
+
+    async def _notify_cancelled(self, request_id: int, reason: str) -> None:
+        try:
+            await self._send({
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": request_id, "reason": reason},
+            })
+        except MCPSessionError:
+            pass
+
+    async def request(self, method: str, params: dict[str, Any], timeout: float) -> dict:
+        """发送 JSON-RPC 请求并在截止时间内等待同 id 的响应"""
+        if not self.is_alive():
+            raise MCPSessionError(f"MCP Server process exited: {self.name}")
+
+        self._request_id += 1
+        request_id = self._request_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.broken = True
+            await self._notify_cancelled(request_id, "timeout")
+            raise MCPSessionError(f"MCP Server timeout after {timeout}s: {method}") from None
+        except asyncio.CancelledError:
+            # 调用方取消（如客户端断开）：通知服务端中止该请求（mysql-mcp-server 会 KILL QUERY），
+            # 会话保持可用，迟到的响应因 id 已不在 _pending 中而被忽略
+            await asyncio.shield(self._notify_cancelled(request_id, "cancelled"))
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+        self.last_used = time.monotonic()
+        return response
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], timeout: float) -> dict:
+        return await self.request("tools/call", {"name": name, "arguments": arguments}, timeout=timeout)
+
+    async def ping(self, timeout: float = 5) -> bool:
+        try:
+            response = await self.request("ping", {}, timeout=timeout)
+        except MCPSessionError:
+            return False
+        self.last_checked = time.monotonic()
+        return "error" not in response
+
+    def is_alive(self) -> bool:
+        return (
+            self.process is not None
+            and self.process.returncode is None
+            and not self.broken
+        )
+
+    async def close(self) -> None:
+        if not self.process:
+            return
+        if self.broken:
+            # 超时/取消后放弃的会话可能仍在执行，直接终止
+            self.kill()
+        self.broken = True
+        try:
+            if self.process.stdin and not self.process.stdin.is_closing():
+                self.process.stdin.close()
+        except Exception:
+            pass
+        if self.process.returncode is None:
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                try:
+                    await asyncio.wait_for(self.process.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+        for task in self._tasks:
+            task.cancel()
+        self._fail_pending(MCPSessionError(f"MCP Server session closed: {self.name}"))
+
+    def kill(self) -> None:
+        """同步终止子进程（事件循环不可用时的兜底）"""
+        self.broken = True
+        if self.process and self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+
+class MCPSessionPool:
+    """按配置指纹复用 MCP 会话的池"""
+
+    def __init__(
+        self,
+        server_path: str,
+        name: str = "mcp",
+        max_size: int = 4,
+        idle_timeout: float = 300,
+        health_check_interval: float = 30,
+        call_timeout: float = 60,
+        session_factory=MCPStdioSession,
+        supports_cancel: bool = False,
+    ):
+        self.server_path = server_path
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.call_timeout = call_timeout
+        self.session_factory = session_factory
+        # 服务端是否处理 notifications/cancelled 并中止请求；不处理时被取消的会话不能复用
+        self.supports_cancel = supports_cancel
+        self._idle: dict[str, list[MCPStdioSession]] = {}
+        self._busy = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _bind_loop(self) -> asyncio.Condition:
+        """会话与子进程绑定在事件循环上，循环切换（如测试）时丢弃旧会话"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            for items in self._idle.values():
+                for session in items:
+                    session.kill()
+            self._idle = {}
+            self._busy = 0
+            self._loop = loop
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _idle_count(self) -> int:
+        return sum(len(items) for items in self._idle.values())
+
+    def _pop_idle(self, key: str) -> Optional[MCPStdioSession]:
+        items = self._idle.get(key)
+        if not items:
+            return None
+        session = items.pop()
+        if not items:
+            self._idle.pop(key, None)
+        return session
+
+    def _evict_lru_idle(self) -> Optional[MCPStdioSession]:
+        oldest_key = None
+        oldest = None
+        for key, items in self._idle.items():
+            for session in items:
+                if oldest is None or session.last_used < oldest.last_used:
+                    oldest_key, oldest = key, session
+        if oldest is None:
+            return None
+        self._idle[oldest_key].remove(oldest)
+        if not self._idle[oldest_key]:
+            self._idle.pop(oldest_key, None)
+        return oldest
+
+    def _collect_expired(self) -> list[MCPStdioSession]:
+        now = time.monotonic()
+        expired: list[MCPStdioSession] = []
+        for key in list(self._idle):
+            keep = []
+            for session in self._idle[key]:
+                if now - session.last_used > self.idle_timeout or not session.is_alive():
+                    expired.append(session)
+                else:
+                    keep.append(session)
+            if keep:
+                self._idle[key] = keep
+            else:
+                self._idle.pop(key, None)
+        return expired
+
+    async def evict_idle(self) -> int:
+        """关闭超过空闲时间或已退出的会话，返回回收数量"""
+        cond = self._bind_loop()
+        async with cond:
+            expired = self._collect_expired()
+        for session in expired:
+            await session.close()
+        return len(expired)
+
+    async def _checkout(self, key: str, timeout: float) -> Optional[MCPStdioSession]:
+        """取出一个空闲会话；返回 None 表示调用方需要新建会话（已占用名额）"""
+        cond = self._bind_loop()
+        to_close: list[MCPStdioSession] = []
+        deadline = time.monotonic() + timeout
+        async with cond:
+            to_close.extend(self._collect_expired())
+            while True:
+                session = self._pop_idle(key)
+                if session is not None:
+                    self._busy += 1
+                    break
+                if self._busy + self._idle_count() < self.max_size:
+                    self._busy += 1
+                    break
+                victim = self._evict_lru_idle()
+                if victim is not None:
+                    to_close.append(victim)
+                    self._busy += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise MCPSessionError(f"MCP会话池已满（{self.max_size}），等待超时")
+                try:
+                    await asyncio.wait_for(cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        for item in to_close:
+            await item.close()
+        return session
+
+    async def _checkin(self, key: str, session: Optional[MCPStdioSession], reusable: bool) -> None:
+        cond = self._bind_loop()
+        async with cond:
+            self._busy = max(0, self._busy - 1)
+            if session is not None and reusable and session.is_alive():
+                self._idle.setdefault(key, []).append(session)
+                session = None
+            cond.notify()
+        if session is not None:
+            await session.close()
+
+    async def _ensure_healthy(self, session: MCPStdioSession) -> bool:
+        if not session.is_alive():
+            return False
+        if time.monotonic() - session.last_used < self.health_check_interval:
+            return True
+        return await session.ping()
+
+    @asynccontextmanager
+    async def session(self, env: dict[str, str]) -> AsyncIterator[MCPStdioSession]:
+        """借出一个与配置匹配的会话，用完自动归还"""
+        key = config_fingerprint(env)
+        session = await self._checkout(key, self.call_timeout)
+        reusable = False
+        in_use = False
+        try:
+            if session is not None and not await self._ensure_healthy(session):
+                logger.info("MCP会话健康检查失败，重建: %s pid=%s", self.name, session.pid)
+                await session.close()
+                session = None
+            if session is None:
+                session = self.session_factory(self.server_path, env, name=self.name)
+                await session.start(self.call_timeout)
+                logger.info("MCP会话已创建: %s pid=%s", self.name, session.pid)
+            in_use = True
+            yield session
+            reusable = True
+        except MCPSessionError:
+            raise
+        except asyncio.CancelledError:
+            # 调用中被取消时已通知服务端：服务端会中止请求时会话可继续复用，
+            # 否则它仍在处理被放弃的请求，下一个调用方会排在后面，直接丢弃；握手阶段被取消的会话也丢弃
+            reusable = in_use and self.supports_cancel
+            raise
+        except Exception:
+            # 工具层异常不影响会话本身
+            reusable = session is not None
+            raise
+        finally:
+            # 取消时也要归还名额
+            await asyncio.shield(self._checkin(key, session, reusable))
+
+    async def call_tool(
+        self,
+        env: dict[str, str],
+        name: str,
+        arguments: Optional[dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """在池化会话上调用工具，返回原始 JSON-RPC 响应"""
+        async with self.session(env) as session:
+            return await session.call_tool(name, arguments or {}, timeout or self.call_timeout)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_size": self.max_size,
+            "busy": self._busy,
+            "idle": self._idle_count(),
+            "configs": len(self._idle),
+        }
+
+    async def close_all(self) -> None:
+        self._bind_loop()
+        sessions = [session for items in self._idle.values() for session in items]
+        self._idle = {}
+        for session in sessions:
+            await session.close()
@@ -0,0 +1,249 @@
+"""
+对话历史全文检索（SQLite FTS5）
+
+messages_fts 是 FTS5 索引（trigram 分词，中文可按子串检索），由触发器随消息
+插入/更新/删除增量维护；旧库首次启动时自动建表并全量构建。
+
+除正文外索引还有一列 owner：用 3 个私用区字符编码所属用户ID，trigram 分词后
+恰好是每个用户唯一的一个词元。检索时 owner 与检索词一起交给 MATCH，由 FTS5
+直接求交，只对当前用户的命中打分，不会因为其他用户的大量命中而变慢。
+
+手动重建索引（在 backend 目录下）:
+    python -m app.services.message_search rebuild
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "messages_fts"
+# trigram 分词只能索引 3 个字符及以上的检索词，更短的词退回到当前用户消息内的 LIKE 扫描
+MIN_INDEXED_TERM = 3
+# snippet 的 token 数（trigram 下约等于字符数）
+SNIPPET_TOKENS = 48
+HIGHLIGHT = ("**", "**")
+
+# 用户ID -> owner 词元（与 owner_token 一致）
+_OWNER_SQL = "char(983040 + (c.user_id >> 16), 1048576 + (c.user_id & 65535), 983040)"
+
+_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(content, owner, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content, owner)
+        SELECT new.id, new.content, {_OWNER_SQL} FROM conversations c WHERE c.id = new.conversation_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        UPDATE {FTS_TABLE} SET content = new.content WHERE rowid = new.id;
+    END""",
+]
+
+
+def owner_token(user_id: int) -> str:
+    """用户ID编码为 3 个私用区字符（trigram 下为单个词元）"""
+    return chr(0xF0000 + (user_id >> 16)) + chr(0x100000 + (user_id & 0xFFFF)) + chr(0xF0000)
+
+
+@dataclass
+class SearchHit:
+    message_id: int
+    conversation_id: int
+    conversation_title: str
+    mode: str
+    role: str
+    snippet: str
+    created_at: datetime
+
+
+async def search_index_exists(conn: AsyncConnection) -> bool:
+    result = await conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    )
+    return result.first() is not None
+
+
+async def ensure_message_search(conn: AsyncConnection) -> bool:
+    """创建索引表与触发器；索引表是新建的（旧库升级）时全量构建，返回是否构建过"""
+    if conn.dialect.name != "sqlite":
+        return False
+    existed = await search_index_exists(conn)
+    for statement in _DDL:
+        await conn.execute(text(statement))
+    if not existed:
+        await rebuild_message_search(conn)
+        return True
+    return False
+
+
+async def init_message_search(target_engine: Optional[AsyncEngine] = None) -> None:
+    """应用启动时调用：确保索引与触发器存在"""
+    if target_engine is None:
+        from app.models.database import engine as target_engine
+    async with target_engine.begin() as conn:
+        if await ensure_message_search(conn):
+            logger.info("消息检索索引已构建")
+
+
+async def rebuild_message_search(conn: AsyncConnection) -> None:
+    """按 messages 表全量重建索引"""
+    await conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    await conn.execute(
+        text(
+            f"""
+            INSERT INTO {FTS_TABLE}(rowid, content, owner)
+            SELECT m.id, m.content, {_OWNER_SQL}
+            FROM messages m JOIN conversations c ON c.id = m.conversation_id
+            """
+        )
+    )
+
+
+async def optimize_message_search(conn: AsyncConnection) -> None:
+    """合并索引段（增量写入会产生很多小段）"""
+    await conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def split_terms(query: str) -> list[str]:
+    """按空白拆分检索词（各词之间为 AND）"""
+    return [term for term in query.split() if term]
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(terms: list[str], user_id: Optional[int] = None) -> str:
+    """每个检索词作为短语，避免用户输入被解析为 FTS5 语法；指定用户时限定 owner"""
+    content = "content : (" + " AND ".join(_phrase(term) for term in terms) + ")"
+    if user_id is None:
+        return content
+    return f"owner : {_phrase(owner_token(user_id))} AND {content}"
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _make_snippet(content: str, terms: list[str], width: int = 60) -> str:
+    """LIKE 检索结果的摘要：第一个命中位置前后各取一段并高亮命中词"""
+    lowered = content.lower()
+    position = min((lowered.find(term.lower()) for term in terms if term.lower() in lowered), default=0)
+    start = max(0, position - width // 2)
+    snippet = content[start:start + width * 2]
+    for term in terms:
+        index = snippet.lower().find(term.lower())
+        if index >= 0:
+            snippet = f"{snippet[:index]}{HIGHLIGHT[0]}{snippet[index:index + len(term)]}{HIGHLIGHT[1]}{snippet[index + len(term):]}"
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width * 2 < len(content) else ""
+    return f"{prefix}{snippet}{suffix}"
+
+
+async def search_messages(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    mode: Optional[str] = None,
+) -> list[SearchHit]:
+    """
+    检索用户的历史消息，按相关度（bm25）排序
+
+    参数:
+        db: 数据库会话
+        user_id: 只检索该用户的对话
+        query: 检索词，空白分隔的多个词需同时命中
+        limit: 最多返回条数
+        mode: 只检索指定模式的对话
+    """
+    terms = split_terms(query)
+    if not terms:
+        return []
+    mode_filter = "AND c.mode = :mode" if mode else ""
+    params = {"user_id": user_id, "limit": limit, "mode": mode}
+
+    if all(len(term) >= MIN_INDEXED_TERM for term in terms):
+        params["match"] = build_match_query(terms, user_id)
+        params["open"], params["close"] = HIGHLIGHT
+        rows = await db.execute(
+            text(
+                f"""
+                SELECT m.id, m.conversation_id, c.title, c.mode, m.role, m.created_at,
+                       snippet({FTS_TABLE}, 0, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet
+                FROM {FTS_TABLE}
+                JOIN messages m ON m.id = {FTS_TABLE}.rowid
+                JOIN conversations c ON c.id = m.conversation_id
+                WHERE {FTS_TABLE} MATCH :match AND c.user_id = :user_id {mode_filter}
+                ORDER BY bm25({FTS_TABLE}, 1.0, 0.0)
+                LIMIT :limit
+                """
+            ).columns(created_at=DateTime),
+            params,
+        )
+        return [_hit(row, row.snippet) for row in rows]
+
+    # 存在过短的检索词：沿 (user_id) 与 (conversation_id, created_at) 索引只扫描该用户的消息
+    conditions = []
+    for index, term in enumerate(terms):
+        params[f"term{index}"] = f"%{_escape_like(term)}%"
+        conditions.append(f"m.content LIKE :term{index} ESCAPE '\\'")
+    rows = await db.execute(
+        text(
+            f"""
+            SELECT m.id, m.conversation_id, c.title, c.mode, m.role, m.created_at, m.content
+            FROM conversations c
+            JOIN messages m ON m.conversation_id = c.id
+            WHERE c.user_id = :user_id {mode_filter} AND {" AND ".join(conditions)}
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT :limit
+            """
+        ).columns(created_at=DateTime),
+        params,
+    )
+    return [_hit(row, _make_snippet(row.content, terms)) for row in rows]
+
+
+def _hit(row, snippet: str) -> SearchHit:
+    return SearchHit(
+        message_id=row.id,
+        conversation_id=row.conversation_id,
+        conversation_title=row.title,
+        mode=row.mode,
+        role=row.role,
+        snippet=snippet,
+        created_at=row.created_at,
+    )
+
+
+async def _rebuild() -> None:
+    from app.models.database import apply_sqlite_migrations, engine, init_db
+
+    await init_db()
+    await apply_sqlite_migrations()
+    async with engine.begin() as conn:
+        if not await ensure_message_search(conn):
+            await rebuild_message_search(conn)
+        count = (await conn.execute(text("SELECT count(*) FROM messages"))).scalar()
+    await engine.dispose()
+    logger.info("消息检索索引已重建，共 %s 条消息", count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对话历史全文检索索引维护")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: 按 messages 表全量重建索引")
+    parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_rebuild())
+
+
+if __name__ == "__main__":
+    main()
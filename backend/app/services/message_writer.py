@@ -0,0 +1,196 @@
+"""
+消息写入队列（write-behind）
+
+对话过程中的消息插入与 conversations.updated_at 更新不再由各个请求各自提交，
+而是交给单个写入任务按批次合并到同一个事务里，SQLite 上只有一个写者，
+请求路径不再因为写锁竞争而重试退避。
+
+读己之写：每条消息返回一个在提交后得到消息ID的 future；读取某个对话前调用
+wait_for(conversation_id) 即可等到该对话已排队的写入全部落库。应用关闭时 close() 会写完队列。
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+
+from app.config.settings import settings
+from app.models.conversation import Conversation
+from app.models.database import AsyncSessionLocal, safe_commit
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingMessage:
+    conversation_id: int
+    role: str
+    content: str
+    created_at: datetime
+    future: asyncio.Future = field(repr=False)
+
+
+class MessageWriter:
+    """单写者消息持久化队列"""
+
+    def __init__(self, session_factory=None, max_batch: Optional[int] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.max_batch = max(1, max_batch or settings.MESSAGE_WRITER_MAX_BATCH)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 对话ID -> 该对话最后一条排队消息的 future（按提交顺序完成）
+        self._last: dict[int, asyncio.Future] = {}
+        # failures 为最终写入失败的消息数，retries 为整批重试次数
+        self._counters = {"batches": 0, "messages": 0, "retries": 0, "failures": 0, "max_batch_seen": 0}
+
+    def _ensure_running(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 事件循环切换（如测试）时丢弃旧队列
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = None
+            self._last = {}
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return self._queue
+
+    def add_message(self, conversation_id: int, role: str, content: str) -> asyncio.Future:
+        """
+        排队写入一条消息，并把对话的 updated_at 更新为消息时间
+
+        返回:
+            asyncio.Future: 提交后得到消息ID；写入失败时为异常
+        """
+        queue = self._ensure_running()
+        future = self._loop.create_future()
+        queue.put_nowait(_PendingMessage(conversation_id, role, content, datetime.utcnow(), future))
+        self._last[conversation_id] = future
+        return future
+
+    async def wait_for(self, conversation_id: int) -> None:
+        """等待该对话已排队的写入全部提交（写入失败不在此抛出）"""
+        future = self._last.get(conversation_id)
+        if future is not None and future.get_loop() is asyncio.get_running_loop() and not future.done():
+            await asyncio.wait({future})
+
+    async def flush(self) -> None:
+        """等待当前已排队的全部写入提交"""
+        loop = asyncio.get_running_loop()
+        pending = {future for future in self._last.values() if future.get_loop() is loop and not future.done()}
+        if pending:
+            await asyncio.wait(pending)
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stop:
+                return
+
+    async def _commit(self, batch: list[_PendingMessage]) -> list[int]:
+        """在一个事务中写入一批消息，返回消息ID"""
+        async with self.session_factory() as db:
+            messages = [
+                Message(
+                    conversation_id=item.conversation_id,
+                    role=item.role,
+                    content=item.content,
+                    created_at=item.created_at,
+                )
+                for item in batch
+            ]
+            db.add_all(messages)
+            await db.flush()
+            ids = [message.id for message in messages]
+
+            touched: dict[int, datetime] = {}
+            for item in batch:
+                touched[item.conversation_id] = max(item.created_at, touched.get(item.conversation_id, item.created_at))
+            for conversation_id, updated_at in touched.items():
+                await db.execute(
+                    update(Conversation)
+                    .where(Conversation.id == conversation_id)
+                    .values(updated_at=updated_at)
+                )
+            await safe_commit(db)
+        return ids
+
+    async def _write(self, batch: list[_PendingMessage]) -> None:
+        """
+        写入一批消息：失败时整批重试一次，仍失败则逐条写入，
+        只有本身写不进去的消息失败，不连累同批其他用户/对话的消息
+        """
+        try:
+            try:
+                ids = await self._commit(batch)
+            except Exception as exc:
+                self._counters["retries"] += 1
+                logger.warning("批量写入消息失败（%s 条），重试一次: %s", len(batch), exc)
+                try:
+                    ids = await self._commit(batch)
+                except Exception as exc:
+                    if len(batch) == 1:
+                        self._fail(batch[0], exc)
+                        return
+                    logger.error("批量写入消息重试失败（%s 条），改为逐条写入: %s", len(batch), exc)
+                    for item in batch:
+                        try:
+                            message_ids = await self._commit([item])
+                        except Exception as item_exc:
+                            self._fail(item, item_exc)
+                        else:
+                            self._succeed([item], message_ids)
+                    return
+            self._succeed(batch, ids)
+        finally:
+            for item in batch:
+                if self._last.get(item.conversation_id) is item.future:
+                    self._last.pop(item.conversation_id, None)
+
+    def _succeed(self, batch: list[_PendingMessage], ids: list[int]) -> None:
+        self._counters["batches"] += 1
+        self._counters["messages"] += len(batch)
+        self._counters["max_batch_seen"] = max(self._counters["max_batch_seen"], len(batch))
+        for item, message_id in zip(batch, ids):
+            if not item.future.done():
+                item.future.set_result(message_id)
+
+    def _fail(self, item: _PendingMessage, exc: Exception) -> None:
+        self._counters["failures"] += 1
+        logger.error("写入消息失败（对话 %s）: %s", item.conversation_id, exc)
+        if not item.future.done():
+            item.future.set_exception(exc)
+
+    async def close(self) -> None:
+        """写完已排队的消息后停止写入任务（应用关闭时调用）"""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self._counters,
+        }
+
+
+# 全局消息写入队列
+message_writer = MessageWriter()
@@ -0,0 +1,94 @@
+"""
+本地 MySQL 元数据目录查询
+
+读取 sync_mysql_catalog 同步到 SQLite 的字段/索引/表统计，
+输出格式与 describe_table / get_table_indexes 工具保持一致。
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import ReadSessionLocal
+from app.models.mysql_column import MySQLColumn
+from app.models.mysql_index import MySQLIndex
+from app.models.mysql_table import MySQLTable
+
+
+def _column_row(item: MySQLColumn) -> dict:
+    return {
+        "Field": item.column_name,
+        "Type": item.column_type,
+        "Null": item.is_nullable,
+        "Key": item.column_key or "",
+        "Default": item.column_default,
+        "Extra": item.extra or "",
+        "Comment": item.column_comment or "",
+    }
+
+
+def _index_row(item: MySQLIndex) -> dict:
+    return {
+        "Table": item.table_name,
+        "Non_unique": 1 if item.non_unique else 0,
+        "Key_name": item.index_name,
+        "Seq_in_index": item.seq_in_index,
+        "Column_name": item.column_name,
+        "Cardinality": item.cardinality,
+        "Index_type": item.index_type,
+    }
+
+
+async def get_local_columns(db: AsyncSession, database: str, table: str) -> list[dict]:
+    """读取本地字段信息（DESCRIBE 格式），未同步时返回空列表"""
+    result = await db.execute(
+        select(MySQLColumn)
+        .where(MySQLColumn.database_name == database, MySQLColumn.table_name == table)
+        .order_by(MySQLColumn.ordinal_position.asc())
+    )
+    return [_column_row(item) for item in result.scalars().all()]
+
+
+async def get_local_indexes(db: AsyncSession, database: str, table: str) -> list[dict]:
+    """读取本地索引信息（SHOW INDEX 格式）"""
+    result = await db.execute(
+        select(MySQLIndex)
+        .where(MySQLIndex.database_name == database, MySQLIndex.table_name == table)
+        .order_by(MySQLIndex.index_name.asc(), MySQLIndex.seq_in_index.asc())
+    )
+    return [_index_row(item) for item in result.scalars().all()]
+
+
+async def get_local_table_stats(db: AsyncSession, database: str, table: str) -> Optional[dict]:
+    result = await db.execute(
+        select(MySQLTable).where(MySQLTable.database_name == database, MySQLTable.table_name == table)
+    )
+    item = result.scalar_one_or_none()
+    if not item or item.catalog_synced_at is None:
+        return None
+    return {
+        "engine": item.engine,
+        "table_rows": item.table_rows,
+        "data_length": item.data_length,
+        "index_length": item.index_length,
+        "synced_at": item.catalog_synced_at.isoformat(),
+    }
+
+
+async def load_catalog_columns(database: Optional[str], table: str) -> Optional[list[dict]]:
+    """供 Agent 工具使用：读取本地字段信息，表未同步到目录时返回 None"""
+    if not database:
+        return None
+    async with ReadSessionLocal() as db:
+        columns = await get_local_columns(db, database, table)
+    return columns or None
+
+
+async def load_catalog_indexes(database: Optional[str], table: str) -> Optional[list[dict]]:
+    """供 Agent 工具使用：读取本地索引信息，表未同步到目录时返回 None"""
+    if not database:
+        return None
+    async with ReadSessionLocal() as db:
+        if await get_local_table_stats(db, database, table) is None:
+            return None
+        return await get_local_indexes(db, database, table)
@@ -2,13 +2,18 @@
 MySQL 元数据同步服务（基于 MCP MySQL 工具）
 """
 import logging
-from sqlalchemy import delete, select
+from datetime import datetime
+from sqlalchemy import delete, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import safe_commit
 from app.models.mysql_database import MySQLDatabase
 from app.models.mysql_table import MySQLTable
+from app.models.mysql_column import MySQLColumn
+from app.models.mysql_index import MySQLIndex
+from app.services.mcp_cache import mcp_result_cache
 from app.services.mcp_mysql import MCPMySQLClient
+from app.utils.pagination import count_cache
 
 logger = logging.getLogger(__name__)
 
@@ -42,45 +47,136 @@ async def sync_mysql_databases(
             )
         )
     await safe_commit(db)
+    count_cache.invalidate(MySQLDatabase.__tablename__)
 
     logger.info("同步MySQL数据库完成")
     return databases
 
 
-async def sync_mysql_tables(
+async def sync_mysql_catalog(
     db: AsyncSession,
     mysql_config: dict,
-    database: str,
+    databases: list[str],
     client: MCPMySQLClient | None = None,
-) -> list[dict]:
-    """同步指定数据库的表列表到本地缓存表"""
+) -> dict:
+    """
+    批量同步指定数据库的表、字段、索引元数据
+
+    一次 get_catalog 调用（information_schema 的三次集合查询）取回所有数据，
+    在同一个事务中替换本地的 mysql_tables / mysql_columns / mysql_indexes。
+    """
     client = client or MCPMySQLClient()
-    tables = await client.list_tables(database, mysql_config)
+    databases = [name for name in databases if name]
+    if not databases:
+        return {"tables": [], "table_count": 0, "column_count": 0, "index_count": 0}
+
+    catalog = await client.get_catalog(databases, mysql_config)
+    tables = catalog.get("tables") or []
+    columns = catalog.get("columns") or []
+    indexes = catalog.get("indexes") or []
+
     existing = (
-        await db.execute(
-            select(MySQLTable).where(MySQLTable.database_name == database)
-        )
+        await db.execute(select(MySQLTable).where(MySQLTable.database_name.in_(databases)))
     ).scalars().all()
-    existing_map = {item.table_name: item for item in existing}
+    existing_map = {(item.database_name, item.table_name): item for item in existing}
 
-    await db.execute(delete(MySQLTable).where(MySQLTable.database_name == database))
+    await db.execute(delete(MySQLTable).where(MySQLTable.database_name.in_(databases)))
+    await db.execute(delete(MySQLColumn).where(MySQLColumn.database_name.in_(databases)))
+    await db.execute(delete(MySQLIndex).where(MySQLIndex.database_name.in_(databases)))
+
+    synced_at = datetime.utcnow()
     for item in tables:
-        table_name = item.get("table_name") or ""
-        prev = existing_map.get(table_name)
+        key = (item.get("table_schema"), item.get("table_name") or "")
+        prev = existing_map.get(key)
         db.add(
             MySQLTable(
-                database_name=database,
-                table_name=table_name,
+                database_name=key[0],
+                table_name=key[1],
                 table_type=item.get("table_type") or "",
                 table_comment=item.get("table_comment") or "",
+                engine=item.get("engine"),
+                table_rows=item.get("table_rows"),
+                data_length=item.get("data_length"),
+                index_length=item.get("index_length"),
+                catalog_synced_at=synced_at,
                 remark=prev.remark if prev else None,
                 enabled=prev.enabled if prev else True,
             )
         )
+
+    # 字段/索引行数可能很多，使用 executemany 批量插入
+    if columns:
+        await db.execute(
+            insert(MySQLColumn),
+            [
+                {
+                    "database_name": item.get("table_schema"),
+                    "table_name": item.get("table_name"),
+                    "column_name": item.get("column_name"),
+                    "ordinal_position": item.get("ordinal_position") or 0,
+                    "column_type": item.get("column_type"),
+                    "is_nullable": item.get("is_nullable"),
+                    "column_key": item.get("column_key"),
+                    "column_default": item.get("column_default"),
+                    "extra": item.get("extra"),
+                    "column_comment": item.get("column_comment"),
+                }
+                for item in columns
+            ],
+        )
+    if indexes:
+        await db.execute(
+            insert(MySQLIndex),
+            [
+                {
+                    "database_name": item.get("table_schema"),
+                    "table_name": item.get("table_name"),
+                    "index_name": item.get("index_name"),
+                    "seq_in_index": item.get("seq_in_index") or 1,
+                    "column_name": item.get("column_name"),
+                    "non_unique": bool(int(item.get("non_unique") or 0)),
+                    "index_type": item.get("index_type"),
+                    "cardinality": item.get("cardinality"),
+                }
+                for item in indexes
+            ],
+        )
     await safe_commit(db)
+    count_cache.invalidate(MySQLTable.__tablename__)
+
+    logger.info(
+        "同步MySQL元数据目录完成: %s 个库, %s 张表, %s 个字段, %s 条索引",
+        len(databases),
+        len(tables),
+        len(columns),
+        len(indexes),
+    )
+    return {
+        "tables": [
+            {
+                "table_name": item.get("table_name") or "",
+                "table_type": item.get("table_type") or "",
+                "table_comment": item.get("table_comment") or "",
+            }
+            for item in tables
+        ],
+        "table_count": len(tables),
+        "column_count": len(columns),
+        "index_count": len(indexes),
+    }
 
+
+async def sync_mysql_tables(
+    db: AsyncSession,
+    mysql_config: dict,
+    database: str,
+    client: MCPMySQLClient | None = None,
+) -> list[dict]:
+    """同步指定数据库的表列表（连同字段、索引）到本地缓存表"""
+    await mcp_result_cache.invalidate("mysql", ["list_tables", "describe_table", "get_table_indexes"])
+    result = await sync_mysql_catalog(db, mysql_config, [database], client=client)
     logger.info("同步MySQL表完成: %s", database)
-    return tables
+    return result["tables"]
 
 
 async def sync_mysql_metadata(
@@ -88,8 +184,10 @@ async def sync_mysql_metadata(
     mysql_config: dict,
     client: MCPMySQLClient | None = None,
 ) -> dict:
-    """同步数据库与表元数据"""
+    """同步数据库列表，并批量同步所有启用库的表、字段、索引元数据"""
     client = client or MCPMySQLClient()
+    # 全量同步时表结构/索引也可能已变化，清空整个 MySQL 缓存
+    await mcp_result_cache.invalidate("mysql")
     databases = await sync_mysql_databases(db, mysql_config, client=client)
 
     user_dbs = [
@@ -97,12 +195,16 @@ async def sync_mysql_metadata(
         for item in databases
         if (item.get("database") or item.get("Database")) not in SYSTEM_DATABASES
     ]
+    enabled_dbs = (
+        await db.execute(select(MySQLDatabase.name).where(MySQLDatabase.enabled.is_(True)))
+    ).scalars().all()
 
-    table_count = 0
-    for db_name in user_dbs:
-        if not db_name:
-            continue
-        tables = await sync_mysql_tables(db, mysql_config, db_name, client=client)
-        table_count += len(tables)
+    result = await sync_mysql_catalog(db, mysql_config, list(enabled_dbs), client=client)
 
-    return {"success": True, "database_count": len(user_dbs), "table_count": table_count}
+    return {
+        "success": True,
+        "database_count": len(user_dbs),
+        "table_count": result["table_count"],
+        "column_count": result["column_count"],
+        "index_count": result["index_count"],
+    }
@@ -0,0 +1,124 @@
+"""
+快捷模板回答缓存
+
+TEMPLATES_BY_MODE 中的快捷提问常被多个用户原样发送，每次都会完整运行一遍 Agent。
+此缓存只对以模板开头、且没有对话历史的消息生效，按
+(模式, 规范化消息, 解析后的提及上下文, 模型配置, 提示词版本, 工具集) 精确匹配；
+数据分析模式额外按数据新鲜度窗口分桶。进程内 LRU，默认关闭。
+"""
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.agents.prompts import TEMPLATES_BY_MODE
+from app.config.settings import settings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    return _WHITESPACE.sub(" ", message or "").strip()
+
+
+def is_template_message(mode: str, message: str) -> bool:
+    """消息是否由该模式的快捷模板生成（模板内容为前缀）"""
+    normalized = normalize_message(message)
+    return any(
+        normalized.startswith(normalize_message(template["content"]))
+        for template in TEMPLATES_BY_MODE.get(mode, [])
+    )
+
+
+class ResponseCache:
+    """模板提问的回答缓存"""
+
+    def __init__(
+        self,
+        ttls: Optional[dict[str, int]] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        freshness_window: Optional[int] = None,
+    ):
+        self.ttls = dict(settings.RESPONSE_CACHE_TTLS if ttls is None else ttls)
+        self.max_entries = max(1, max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES)
+        self.enabled = settings.RESPONSE_CACHE_ENABLED if enabled is None else enabled
+        self.freshness_window = max(
+            1, settings.RESPONSE_CACHE_FRESHNESS_WINDOW if freshness_window is None else freshness_window
+        )
+        # cache_key -> (mode, expires_at(monotonic), content)
+        self._entries: OrderedDict[str, tuple[str, float, str]] = OrderedDict()
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def build_key(self, mode: str, message: str, resolved_message: str, agent: Any) -> Optional[str]:
+        """
+        计算缓存键；消息不可缓存（未启用、该模式 TTL 为 0、非模板消息）时返回 None
+
+        参数:
+            message: 用户原始消息
+            resolved_message: prepare_agent 解析 @ 提及后发给 Agent 的消息
+            agent: 已初始化的 Agent（提供模型指纹、提示词版本与工具集）
+        """
+        if not self.enabled or self.ttls.get(mode, 0) <= 0:
+            return None
+        if not is_template_message(mode, message):
+            return None
+        parts = [
+            mode,
+            normalize_message(message),
+            normalize_message(resolved_message),
+            getattr(agent, "model_fingerprint", None),
+            getattr(agent, "prompt_version", None),
+            list(getattr(agent, "TOOL_NAMES", ())),
+        ]
+        if mode == "data_analysis":
+            parts.append(int(time.time() // self.freshness_window))
+        payload = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, mode: str, outcome: str) -> None:
+        counters = self._counters.setdefault(mode, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, key: str, mode: str) -> Optional[str]:
+        cached = self._entries.get(key)
+        if cached is not None:
+            if cached[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(mode, "hits")
+                return cached[2]
+            self._entries.pop(key, None)
+        self._count(mode, "misses")
+        return None
+
+    def set(self, key: str, mode: str, content: str) -> None:
+        ttl = self.ttls.get(mode, 0)
+        if ttl <= 0 or not content:
+            return
+        self._entries[key] = (mode, time.monotonic() + ttl, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        hits = sum(counters["hits"] for counters in self._counters.values())
+        misses = sum(counters["misses"] for counters in self._counters.values())
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "modes": {mode: dict(counters) for mode, counters in self._counters.items()},
+        }
+
+
+# 全局回答缓存实例
+response_cache = ResponseCache()
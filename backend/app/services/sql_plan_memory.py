@@ -0,0 +1,159 @@
+"""
+SQL 方案记忆
+
+数据分析模式下，记录每个问题中 execute_mysql_query 最后一次失败之后成功执行的数据查询
+（跳过 SELECT * ... LIMIT n 之类的取样探查），按 (规范化问题, [DB_TABLE_CONTEXT], MySQL 配置指纹) 保存到 sql_plans 表。
+再次收到相同问题时直接在实时数据上重跑这些 SQL，只让模型解读结果，
+跳过多轮的查表/写 SQL 工具调用。
+"""
+import hashlib
+import json
+import logging
+import re
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+
+from app.config.settings import settings
+from app.models.database import AsyncSessionLocal, safe_commit
+from app.models.sql_plan import SQLPlan
+from app.services.mcp_session import config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+_CONTEXT_BLOCK = re.compile(r"\[DB_TABLE_CONTEXT\]\s*(.*?)\s*\[/DB_TABLE_CONTEXT\]", re.DOTALL)
+_QUESTION_PREFIX = "用户问题："
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = "。．.？?！!；;，, "
+_DATA_QUERY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# 取样探查：从单表直接取行（只有列名/* 与可选的 LIMIT），不用于回答问题
+_PROBE_QUERY = re.compile(
+    r"^\s*SELECT\s+(\*|[\w`.]+(\s*,\s*[\w`.]+)*)\s+FROM\s+[\w`.]+(\s+LIMIT\s+\d+(\s*,\s*\d+)?)?\s*$",
+    re.IGNORECASE,
+)
+
+# 当前 Agent 运行中成功执行的查询（None 表示未在记录）
+_recorded_queries: ContextVar[Optional[list[str]]] = ContextVar("sql_plan_recorded_queries", default=None)
+
+
+def split_question(message: str) -> tuple[str, Optional[str]]:
+    """拆分发给 Agent 的消息，返回 (规范化问题, 规范化的 DB_TABLE_CONTEXT JSON)"""
+    context = None
+    question = message or ""
+    match = _CONTEXT_BLOCK.search(question)
+    if match:
+        try:
+            context = json.dumps(json.loads(match.group(1)), sort_keys=True, ensure_ascii=False)
+        except ValueError:
+            context = _WHITESPACE.sub(" ", match.group(1)).strip()
+        question = question[match.end():].strip()
+        if question.startswith(_QUESTION_PREFIX):
+            question = question[len(_QUESTION_PREFIX):]
+    question = _WHITESPACE.sub(" ", question).strip().rstrip(_TRAILING_PUNCTUATION).lower()
+    return question, context
+
+
+def build_plan_key(question: str, context: Optional[str], fingerprint: str) -> str:
+    payload = json.dumps([question, context, fingerprint], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def start_recording() -> list[str]:
+    """开始记录当前上下文中 execute_mysql_query 成功执行的查询"""
+    queries: list[str] = []
+    _recorded_queries.set(queries)
+    return queries
+
+
+def stop_recording() -> None:
+    _recorded_queries.set(None)
+
+
+def record_query(query: str) -> None:
+    """由 execute_mysql_query 工具在查询成功后调用；只记录数据查询（SELECT/WITH），跳过取样探查"""
+    queries = _recorded_queries.get()
+    if queries is None or not _DATA_QUERY.match(query) or "information_schema" in query.lower():
+        return
+    query = query.strip().rstrip(";").strip()
+    if _PROBE_QUERY.match(query):
+        return
+    if query in queries:
+        queries.remove(query)
+    queries.append(query)
+
+
+def record_failure() -> None:
+    """由 execute_mysql_query 工具在查询失败后调用：之前的查询属于被放弃的尝试，清空重新记录"""
+    queries = _recorded_queries.get()
+    if queries is not None:
+        queries.clear()
+
+
+class SQLPlanMemory:
+    """问题 → SQL 方案存储"""
+
+    def __init__(self, enabled: Optional[bool] = None, ttl_days: Optional[int] = None, session_factory=None):
+        self.enabled = settings.SQL_PLAN_MEMORY_ENABLED if enabled is None else enabled
+        self.ttl_days = settings.SQL_PLAN_TTL_DAYS if ttl_days is None else ttl_days
+        self.max_queries = settings.SQL_PLAN_MAX_QUERIES
+        self.session_factory = session_factory or AsyncSessionLocal
+
+    def plan_key(self, message: str, mysql_config: dict) -> tuple[str, str, Optional[str]]:
+        question, context = split_question(message)
+        return build_plan_key(question, context, config_fingerprint(mysql_config)), question, context
+
+    async def lookup(self, message: str, mysql_config: dict) -> Optional[list[str]]:
+        """查找可复用的 SQL 方案，命中时更新使用次数"""
+        if not self.enabled:
+            return None
+        key, question, _ = self.plan_key(message, mysql_config)
+        if not question:
+            return None
+        async with self.session_factory() as db:
+            plan = await db.get(SQLPlan, key)
+            if plan is None:
+                return None
+            if self.ttl_days and plan.updated_at < datetime.utcnow() - timedelta(days=self.ttl_days):
+                return None
+            plan.hit_count = (plan.hit_count or 0) + 1
+            plan.last_used_at = datetime.utcnow()
+            queries = json.loads(plan.queries)
+            await safe_commit(db)
+        logger.info("复用SQL方案: question=%s queries=%d", question, len(queries))
+        return queries
+
+    async def remember(self, message: str, mysql_config: dict, queries: list[str]) -> bool:
+        """保存一次 Agent 运行中最后一次失败之后成功执行的数据查询"""
+        if not self.enabled or not queries or len(queries) > self.max_queries:
+            return False
+        key, question, context = self.plan_key(message, mysql_config)
+        if not question:
+            return False
+        async with self.session_factory() as db:
+            plan = await db.get(SQLPlan, key)
+            if plan is None:
+                plan = SQLPlan(
+                    plan_key=key,
+                    question=question,
+                    context=context,
+                    config_fingerprint=config_fingerprint(mysql_config),
+                    hit_count=0,
+                )
+                db.add(plan)
+            plan.queries = json.dumps(queries, ensure_ascii=False)
+            plan.updated_at = datetime.utcnow()
+            await safe_commit(db)
+        return True
+
+    async def forget(self, message: str, mysql_config: dict) -> None:
+        """方案在实时数据上执行失败（如表结构变更）时删除"""
+        key, _, _ = self.plan_key(message, mysql_config)
+        async with self.session_factory() as db:
+            await db.execute(delete(SQLPlan).where(SQLPlan.plan_key == key))
+            await safe_commit(db)
+
+
+# 全局 SQL 方案记忆实例
+sql_plan_memory = SQLPlanMemory()
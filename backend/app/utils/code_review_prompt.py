@@ -1,9 +1,15 @@
 from app.agents.prompts import CODE_REVIEW_PROMPT
 
 
-def render_code_review_prompt(diff: str, notice: str | None = None) -> str:
+def render_code_review_prompt() -> str:
+    """代码审查系统提示词（不含 diff，便于复用已编译的 Agent）"""
+    return CODE_REVIEW_PROMPT
+
+
+def render_code_review_message(message: str, diff: str | None, notice: str | None = None) -> str:
+    """把待审查的 diff 附加到本次用户消息中"""
     content = diff or "(未提供diff内容)"
-    diff_notice = notice or ""
-    prompt = CODE_REVIEW_PROMPT.replace("{{DIFF}}", content)
-    prompt = prompt.replace("{{DIFF_NOTICE}}", diff_notice)
-    return prompt
+    parts = [message, "## 代码差异", content]
+    if notice:
+        parts.append(notice)
+    return "\n\n".join(parts)
@@ -1,6 +1,15 @@
-from sqlalchemy import select, func
+import base64
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, and_, false, or_, select, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import Select
+from sqlalchemy.sql import Select, operators
+
+from app.config.settings import settings
 
 DEFAULT_PAGE_SIZE = 20
 MAX_PAGE_SIZE = 200
@@ -10,16 +19,230 @@ def get_offset(page: int, page_size: int) -> int:
     return (page - 1) * page_size
 
 
+class CountCache:
+    """
+    分页总数缓存
+
+    以去掉 ORDER BY 后的 SQL 与参数（即过滤条件）为键缓存 COUNT 结果，
+    翻页时不再重复统计；同步或修改数据后按表名调用 invalidate 使其失效。
+    """
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl = settings.PAGINATION_COUNT_CACHE_TTL if ttl is None else ttl
+        self.max_entries = (
+            settings.PAGINATION_COUNT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        # 键 -> (缓存时间(monotonic), 总数, 涉及的表名)
+        self._entries: OrderedDict[tuple, tuple[float, int, frozenset]] = OrderedDict()
+        # 失效次数；统计期间发生失效时不写入缓存
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def count(self, db: AsyncSession, query: Select) -> int:
+        if not self.ttl:
+            return await count_query(db, query)
+
+        query = query.order_by(None)
+        compiled = query.compile(dialect=db.bind.dialect)
+        key = (str(compiled), repr(sorted(compiled.params.items())))
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        version = self._version
+        total = await count_query(db, query)
+        if self._version == version:
+            tables = frozenset(getattr(item, "name", None) for item in query.get_final_froms())
+            self._entries[key] = (time.monotonic(), total, tables)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def invalidate(self, *tables: str) -> None:
+        """使涉及指定表的总数失效，不传表名时全部失效"""
+        self._version += 1
+        if not tables:
+            self._entries.clear()
+            return
+        for key in [key for key, entry in self._entries.items() if entry[2] & set(tables)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._version += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+async def count_query(db: AsyncSession, query: Select) -> int:
+    total_result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+    return total_result.scalar_one() or 0
+
+
 async def paginate_query(
     db: AsyncSession,
     query: Select,
     page: int,
     page_size: int,
+    counter: Optional[CountCache] = None,
 ):
-    total_result = await db.execute(select(func.count()).select_from(query.subquery()))
-    total = total_result.scalar_one() or 0
+    if counter is not None:
+        total = await counter.count(db, query)
+    else:
+        total = await count_query(db, query)
 
     offset = get_offset(page, page_size)
     items_result = await db.execute(query.offset(offset).limit(page_size))
     items = items_result.scalars().all()
     return total, items
+
+
+def _order_columns(query: Select) -> list[tuple]:
+    """取出查询的 ORDER BY 列及方向，返回 [(列, 是否倒序)]"""
+    columns = []
+    for clause in query._order_by_clauses:
+        modifier = getattr(clause, "modifier", None)
+        if modifier in (operators.asc_op, operators.desc_op):
+            columns.append((clause.element, modifier is operators.desc_op))
+        elif modifier is None and getattr(clause, "key", None):
+            columns.append((clause, False))
+        else:
+            raise ValueError("游标翻页只支持按列升序或倒序排序")
+    if not columns:
+        raise ValueError("游标翻页需要查询带 ORDER BY")
+    return columns
+
+
+def _cursor_value(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Integer):
+        return int(value)
+    return value
+
+
+def _beyond(column, descending: bool, value):
+    """排在 value 之后的条件；NULL 视为最小值（与 SQLite/MySQL 的默认排序一致）"""
+    if value is None:
+        return None if descending else column.is_not(None)
+    if descending:
+        return or_(column < value, column.is_(None))
+    return column > value
+
+
+def _after(columns: list[tuple], values: list):
+    """展开为 (c1 之后) OR (c1 相等 AND c2 之后) ...；同向且无 NULL 时用行值比较以便走索引"""
+    directions = {descending for _, descending in columns}
+    if len(directions) == 1 and None not in values:
+        left = tuple_(*[column for column, _ in columns])
+        right = tuple_(*values)
+        return left < right if directions.pop() else left > right
+
+    conditions = []
+    for index, (column, descending) in enumerate(columns):
+        step = _beyond(column, descending, values[index])
+        if step is None:
+            continue
+        equals = [
+            prev.is_(None) if prev_value is None else prev == prev_value
+            for (prev, _), prev_value in zip(columns[:index], values[:index])
+        ]
+        conditions.append(and_(*equals, step))
+    return or_(*conditions) if conditions else false()
+
+
+def cursor_for(query: Select, item) -> str:
+    """按查询的排序列为某条记录生成游标（列名需与 ORM 属性名一致）"""
+    return encode_cursor(*[getattr(item, column.key) for column, _ in _order_columns(query)])
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    query: Select,
+    page_size: int,
+    cursor: Optional[str] = None,
+):
+    """
+    游标翻页：从查询的 ORDER BY 列取排序键，接着上一页最后一条继续读取，
+    每页开销与翻到第几页无关。排序列需能唯一确定顺序（通常在末尾加主键）。
+
+    返回 (items, next_cursor)，没有更多时 next_cursor 为 None；游标无效时抛出 ValueError
+    """
+    columns = _order_columns(query)
+    if cursor:
+        raw_values = decode_cursor(cursor, len(columns))
+        try:
+            values = [_cursor_value(column, value) for (column, _), value in zip(columns, raw_values)]
+        except (TypeError, ValueError) as exc:
+            raise ValueError("无效的游标") from exc
+        query = query.where(_after(columns, values))
+
+    result = await db.execute(query.limit(page_size + 1))
+    items = result.scalars().all()
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    next_cursor = cursor_for(query, items[-1]) if has_more else None
+    return items, next_cursor
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    page: int,
+    page_size: int,
+    cursor: Optional[str] = None,
+    counter: Optional[CountCache] = None,
+):
+    """
+    同时支持页码与游标两种翻页方式：传入 cursor 时按游标续读并忽略 page，
+    两种方式都返回下一页游标，总数经 counter 缓存后按过滤条件复用。
+
+    返回 (total, items, next_cursor)；游标无效时抛出 ValueError
+    """
+    counter = counter or count_cache
+    if cursor:
+        items, next_cursor = await keyset_paginate(db, query, page_size, cursor)
+        return await counter.count(db, query), items, next_cursor
+
+    total, items = await paginate_query(db, query, page, page_size, counter=counter)
+    next_cursor = None
+    if items and get_offset(page, page_size) + len(items) < total:
+        next_cursor = cursor_for(query, items[-1])
+    return total, items, next_cursor
+
+
+def encode_cursor(*values) -> str:
+    """把上一页最后一条记录的排序键编码为不透明游标（datetime 按 ISO 格式保存）"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """解析游标，返回 size 个排序键；格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("无效的游标") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("无效的游标")
+    return values
+
+
+# 全局分页总数缓存
+count_cache = CountCache()
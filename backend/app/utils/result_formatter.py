@@ -0,0 +1,145 @@
+"""
+查询结果 Markdown 格式化
+
+逐行追加，表格达到字符预算后不再输出行，只为剩余行累计每列的
+最小值/最大值/去重数/空值数，最后附在表格后面，模型仍能了解完整结果集的分布。
+"""
+from typing import Any, Iterable, Optional
+
+from app.config.settings import settings
+
+# 单列去重计数的上限，超过后只报告 ">上限"
+MAX_DISTINCT_TRACKED = 1000
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return text[: max(limit - 1, 0)] + "…"
+    return text
+
+
+def _cell(value: Any, limit: int, null: str = "NULL") -> str:
+    text = null if value is None else str(value)
+    text = text.replace("\r", " ").replace("\n", " ").replace("|", "\\|")
+    return _truncate(text, limit)
+
+
+class _ColumnStats:
+    """被省略行的单列统计"""
+
+    __slots__ = ("nulls", "minimum", "maximum", "comparable", "distinct", "distinct_overflow")
+
+    def __init__(self):
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        self.comparable = True
+        self.distinct: set = set()
+        self.distinct_overflow = False
+
+    def add(self, value: Any) -> None:
+        if value is None:
+            self.nulls += 1
+            return
+        if not self.distinct_overflow:
+            try:
+                self.distinct.add(value)
+            except TypeError:
+                self.distinct.add(repr(value))
+            if len(self.distinct) > MAX_DISTINCT_TRACKED:
+                self.distinct_overflow = True
+                self.distinct.clear()
+        if not self.comparable:
+            return
+        try:
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+        except TypeError:
+            # 混合类型无法比较大小，只保留去重/空值统计
+            self.comparable = False
+            self.minimum = self.maximum = None
+
+    def distinct_label(self) -> str:
+        return f">{MAX_DISTINCT_TRACKED}" if self.distinct_overflow else str(len(self.distinct))
+
+
+class ResultTableFormatter:
+    """按字符预算输出 Markdown 表格，超出预算的行汇总为列统计"""
+
+    def __init__(self, max_chars: Optional[int] = None, max_cell_chars: Optional[int] = None):
+        self.max_chars = settings.AGENT_RESULT_MAX_CHARS if max_chars is None else max_chars
+        self.max_cell_chars = settings.AGENT_RESULT_MAX_CELL_CHARS if max_cell_chars is None else max_cell_chars
+        self.headers: Optional[list[str]] = None
+        self.row_count = 0
+        self.shown_rows = 0
+        self._lines: list[str] = []
+        self._chars = 0
+        self._omitted: Optional[dict[str, _ColumnStats]] = None
+
+    def _line(self, cells: Iterable[str]) -> str:
+        return "| " + " | ".join(cells) + " |\n"
+
+    def add(self, row: dict) -> None:
+        if self.headers is None:
+            self.headers = list(row.keys())
+            for line in (
+                self._line(_cell(header, self.max_cell_chars) for header in self.headers),
+                self._line(["---"] * len(self.headers)),
+            ):
+                self._lines.append(line)
+                self._chars += len(line)
+        self.row_count += 1
+
+        if self._omitted is None:
+            line = self._line(_cell(row.get(header), self.max_cell_chars) for header in self.headers)
+            # 至少展示一行，之后严格按预算截止
+            if not self.shown_rows or not self.max_chars or self._chars + len(line) <= self.max_chars:
+                self._lines.append(line)
+                self._chars += len(line)
+                self.shown_rows += 1
+                return
+            self._omitted = {header: _ColumnStats() for header in self.headers}
+
+        for header, stats in self._omitted.items():
+            stats.add(row.get(header))
+
+    def extend(self, rows: Iterable[dict]) -> "ResultTableFormatter":
+        for row in rows:
+            self.add(row)
+        return self
+
+    def _summary(self) -> str:
+        omitted = self.row_count - self.shown_rows
+        limit = self.max_cell_chars
+        lines = [
+            f"未展示的 {omitted} 条记录概要：\n",
+            self._line(["列", "最小值", "最大值", "去重数", "空值数"]),
+            self._line(["---"] * 5),
+        ]
+        for header, stats in self._omitted.items():
+            lines.append(self._line([
+                _cell(header, limit),
+                _cell(stats.minimum, limit, "-"),
+                _cell(stats.maximum, limit, "-"),
+                stats.distinct_label(),
+                str(stats.nulls),
+            ]))
+        return "".join(lines)
+
+    def render(self) -> str:
+        if not self.row_count:
+            return "查询结果为空"
+        text = f"查询结果：\n\n{''.join(self._lines)}\n\n共 {self.row_count} 条记录"
+        if self._omitted is None:
+            return text
+        return f"{text}，超出长度预算仅展示前 {self.shown_rows} 条\n\n{self._summary()}"
+
+
+def format_query_results(
+    rows: Iterable[dict],
+    max_chars: Optional[int] = None,
+    max_cell_chars: Optional[int] = None,
+) -> str:
+    return ResultTableFormatter(max_chars, max_cell_chars).extend(rows).render()
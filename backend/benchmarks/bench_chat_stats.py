@@ -0,0 +1,119 @@
+"""
+对话统计：逐行加载 vs SQL 聚合 vs 缓存命中
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_chat_stats --messages 100000
+
+逐行加载为改造前 GET /api/v1/chat/stats 的做法（加载该用户全部对话与消息后 len()）；
+内存为 tracemalloc 统计的峰值分配。
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.models.conversation import Conversation  # noqa: E402
+from app.models.database import Base, create_engine  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.chat_stats import CHAT_MODES, ChatStatsCache, compute_chat_stats  # noqa: E402
+
+
+async def seed(session_factory, messages: int, conversations: int) -> None:
+    async with session_factory() as db:
+        db.add(User(id=1, username="power", password_hash="x", role="user"))
+        db.add(User(id=2, username="other", password_hash="x", role="user"))
+        await db.flush()
+        await db.execute(
+            insert(Conversation),
+            [
+                {"id": index + 1, "user_id": 1 + index % 2, "title": f"c{index}", "mode": CHAT_MODES[index % 3]}
+                for index in range(conversations * 2)
+            ],
+        )
+        # 用户 1 的对话为奇数ID
+        body = "消息内容" * 50
+        batch = []
+        for index in range(messages):
+            batch.append({"conversation_id": (index % conversations) * 2 + 1, "role": "user", "content": body})
+            if len(batch) == 5000:
+                await db.execute(insert(Message), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Message), batch)
+        await db.commit()
+
+
+async def load_rows(db: AsyncSession, user_id: int) -> dict:
+    conversations = (await db.execute(select(Conversation).where(Conversation.user_id == user_id))).scalars().all()
+    messages = (
+        await db.execute(select(Message).join(Conversation).where(Conversation.user_id == user_id))
+    ).scalars().all()
+    return {
+        "total_conversations": len(conversations),
+        "total_messages": len(messages),
+        "conversations_by_mode": {mode: len([c for c in conversations if c.mode == mode]) for mode in CHAT_MODES},
+    }
+
+
+async def measure(session_factory, func, repeat: int) -> tuple[float, int, dict]:
+    best = float("inf")
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        async with session_factory() as db:
+            tracemalloc.start()
+            started = time.perf_counter()
+            result = await func(db)
+            best = min(best, time.perf_counter() - started)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return best, peak, result
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed(session_factory, args.messages, args.conversations)
+
+        cache = ChatStatsCache(ttl=0)
+        async with session_factory() as db:
+            await cache.get(db, 1)
+        cases = [
+            ("load rows", lambda db: load_rows(db, 1)),
+            ("aggregate", lambda db: compute_chat_stats(db, 1)),
+            ("cache hit", lambda db: cache.get(db, 1)),
+        ]
+        print(f"messages={args.messages} conversations={args.conversations} (user 1)")
+        expected = None
+        for name, func in cases:
+            elapsed, peak, result = await measure(session_factory, func, args.repeat)
+            expected = expected or result
+            assert result == expected, (name, result, expected)
+            print(f"  {name:<10} {elapsed * 1000:9.2f} ms   peak {peak / 1024 / 1024:8.2f} MB")
+        print(f"  result: {expected}")
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
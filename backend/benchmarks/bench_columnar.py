@@ -0,0 +1,122 @@
+"""
+列式编码 vs 逐行字典：传输体积与解析耗时对比
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_columnar --rows 5000
+
+编码使用 mysql-mcp-server 的 _encode_columnar，逐行格式按 fastmcp 的
+默认序列化（Decimal/datetime 转字符串）生成；解析耗时包含 json.loads
+以及逐行访问全部字段。
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from pymysql.constants import FIELD_TYPE
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.mcp_columnar import ColumnarRows  # noqa: E402
+from app.services.mcp_mysql import MYSQL_MCP_SERVER_PATH  # noqa: E402
+
+DESCRIPTION = [
+    ("order_id", FIELD_TYPE.LONGLONG),
+    ("customer_name", FIELD_TYPE.VAR_STRING),
+    ("total_amount", FIELD_TYPE.NEWDECIMAL),
+    ("discount_amount", FIELD_TYPE.NEWDECIMAL),
+    ("status", FIELD_TYPE.VAR_STRING),
+    ("created_at", FIELD_TYPE.DATETIME),
+    ("updated_at", FIELD_TYPE.DATETIME),
+]
+
+
+def load_server():
+    spec = importlib.util.spec_from_file_location("mysql_mcp_server_bench", MYSQL_MCP_SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_rows(count: int) -> list[tuple]:
+    base = datetime(2024, 1, 1)
+    return [
+        (
+            index,
+            f"customer-{index % 97}",
+            Decimal(index * 3) / 100,
+            Decimal(index % 7) / 10,
+            "paid" if index % 3 else "pending",
+            base + timedelta(minutes=index),
+            base + timedelta(minutes=index, seconds=30),
+        )
+        for index in range(count)
+    ]
+
+
+def row_payload(rows: list[tuple]) -> str:
+    names = [column[0] for column in DESCRIPTION]
+    records = [dict(zip(names, row)) for row in rows]
+    return json.dumps({"result": records}, ensure_ascii=False, default=str)
+
+
+def columnar_payload(server, rows: list[tuple]) -> str:
+    return json.dumps({"result": server._encode_columnar(DESCRIPTION, rows)}, ensure_ascii=False)
+
+
+def timed(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    server = load_server()
+    rows = make_rows(args.rows)
+    rows_text = row_payload(rows)
+    columnar_text = columnar_payload(server, rows)
+
+    def parse_rows():
+        for row in json.loads(rows_text)["result"]:
+            for _ in row.values():
+                pass
+
+    def parse_columnar():
+        for row in ColumnarRows(json.loads(columnar_text)["result"]):
+            for _ in row.values():
+                pass
+
+    def parse_columnar_first_page():
+        # Agent 只展示前几十行时，其余行不会被解码
+        result = ColumnarRows(json.loads(columnar_text)["result"])
+        for row in result[:50]:
+            for _ in row.values():
+                pass
+
+    rows_bytes = len(rows_text.encode("utf-8"))
+    columnar_bytes = len(columnar_text.encode("utf-8"))
+    print(f"rows={args.rows}")
+    print(f"payload  rows: {rows_bytes:>10} B   columnar: {columnar_bytes:>10} B   "
+          f"({columnar_bytes / rows_bytes:.0%})")
+    print(f"encode   rows: {timed(lambda: row_payload(rows), args.repeat) * 1000:8.2f} ms   "
+          f"columnar: {timed(lambda: columnar_payload(server, rows), args.repeat) * 1000:8.2f} ms")
+    print(f"parse    rows: {timed(parse_rows, args.repeat) * 1000:8.2f} ms   "
+          f"columnar: {timed(parse_columnar, args.repeat) * 1000:8.2f} ms (all rows)   "
+          f"{timed(parse_columnar_first_page, args.repeat) * 1000:8.2f} ms (first 50)")
+
+
+if __name__ == "__main__":
+    main()
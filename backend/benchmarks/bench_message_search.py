@@ -0,0 +1,132 @@
+"""
+消息检索：FTS5 索引 vs LIKE 全表扫描
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_message_search --messages 1000000
+
+消息分布在多个用户的对话中，检索只针对其中一个用户。search 为 search_messages
+（按相关度排序）；like 为同样限定用户的 LIKE 扫描（不排序，凑满 20 条即停止，
+检索词罕见或不存在时需扫描该用户全部消息）。同时给出写入期间触发器增量维护
+索引的额外耗时。
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.models.conversation import Conversation  # noqa: E402
+from app.models.database import Base, create_engine  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.message_search import ensure_message_search, search_messages  # noqa: E402
+
+USERS = 50
+CONVERSATIONS = 5000
+WORDS = [
+    "订单", "退款", "用户", "留存", "转化率", "慢查询", "索引", "华东", "华南", "日志",
+    "SELECT", "GROUP BY", "revenue", "checkout", "timeout", "分析", "汇总", "环比", "同比", "库存",
+]
+
+
+def make_content(rng: random.Random) -> str:
+    return "，".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+
+
+async def seed(session_factory, messages: int) -> float:
+    rng = random.Random(42)
+    async with session_factory() as db:
+        await db.execute(
+            insert(User), [{"id": i, "username": f"u{i}", "password_hash": "x", "role": "user"} for i in range(1, USERS + 1)]
+        )
+        await db.execute(
+            insert(Conversation),
+            [{"id": i, "user_id": i % USERS + 1, "title": f"c{i}", "mode": "data_analysis"} for i in range(1, CONVERSATIONS + 1)],
+        )
+        await db.commit()
+    started = time.perf_counter()
+    async with session_factory() as db:
+        for offset in range(0, messages, 10000):
+            await db.execute(
+                insert(Message),
+                [
+                    {"conversation_id": rng.randint(1, CONVERSATIONS), "role": "assistant", "content": make_content(rng)}
+                    for _ in range(min(10000, messages - offset))
+                ],
+            )
+        # 罕见词，只出现在用户 1 的少数消息里
+        await db.execute(
+            insert(Message),
+            [{"conversation_id": USERS * (i + 1), "role": "assistant", "content": "发现异常的幂等键冲突"} for i in range(20)],
+        )
+        await db.commit()
+    return time.perf_counter() - started
+
+
+async def like_search(db: AsyncSession, user_id: int, term: str) -> list:
+    rows = await db.execute(
+        text(
+            "SELECT m.id FROM messages m JOIN conversations c ON c.id = m.conversation_id "
+            "WHERE c.user_id = :user_id AND m.content LIKE :term LIMIT 20"
+        ),
+        {"user_id": user_id, "term": f"%{term}%"},
+    )
+    return rows.all()
+
+
+async def timed(session_factory, func, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        async with session_factory() as db:
+            started = time.perf_counter()
+            count = len(await func(db))
+            best = min(best, time.perf_counter() - started)
+    return best, count
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        results = {}
+        for indexed in (False, True):
+            engine = create_engine(url if indexed else f"sqlite+aiosqlite:///{Path(tmp) / 'plain.db'}")
+            session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                if indexed:
+                    await ensure_message_search(conn)
+            results[indexed] = await seed(session_factory, args.messages)
+            if not indexed:
+                await engine.dispose()
+        print(f"messages={args.messages} users={USERS}")
+        print(f"  insert   without index {results[False]:8.2f} s   with triggers {results[True]:8.2f} s")
+
+        # 罕见词 / 高频词 / 两字词（走 LIKE 回退）/ 不存在的词
+        for term in ("幂等键冲突", "慢查询", "华东", "不存在的检索词"):
+            fts, fts_count = await timed(session_factory, lambda db: search_messages(db, 1, term), args.repeat)
+            like, like_count = await timed(session_factory, lambda db: like_search(db, 1, term), args.repeat)
+            print(
+                f"  {term:<8} search {fts * 1000:9.2f} ms ({fts_count} hits)   "
+                f"like {like * 1000:9.2f} ms ({like_count} hits)"
+            )
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+SQLite 调优前后对比：并发对话写入与配置/列表读取
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_sqlite --chats 16 --readers 16 --seconds 5
+
+default 为调优前的配置（回滚日志、单引擎读写），tuned 为 app.models.database
+的调优配置（WAL、synchronous=NORMAL、mmap/cache/busy_timeout，读写引擎分离）。
+对话负载每次写入一条消息并更新对话 updated_at，默认经消息写入队列批量提交
+（--writes direct 为每条消息单独提交）；读取负载读取配置并按 updated_at
+列出当前用户的对话。
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.models.config import Config  # noqa: E402
+from app.models.conversation import Conversation  # noqa: E402
+from app.models.database import Base, create_engine, safe_commit  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.message_writer import MessageWriter  # noqa: E402
+
+USERS = 8
+CONVERSATIONS_PER_USER = 20
+
+
+async def seed(session_factory) -> None:
+    async with session_factory() as db:
+        for user_id in range(1, USERS + 1):
+            db.add(User(id=user_id, username=f"u{user_id}", password_hash="x", role="user"))
+            for index in range(CONVERSATIONS_PER_USER):
+                db.add(Conversation(user_id=user_id, title=f"c{index}", mode="normal"))
+        for key in ("model_config", "mysql_config", "gitlab_config"):
+            db.add(Config(key=key, value='{"enabled": true}'))
+        await db.commit()
+
+
+def conversation_for(worker: int) -> int:
+    user_id = worker % USERS + 1
+    return (user_id - 1) * CONVERSATIONS_PER_USER + worker % CONVERSATIONS_PER_USER + 1
+
+
+async def direct_chat_worker(session_factory, worker: int, deadline: float, latencies: list, errors: list) -> None:
+    """每条消息单独开会话提交（消息写入队列之前的写法）"""
+    conversation_id = conversation_for(worker)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                db.add(Message(conversation_id=conversation_id, role="assistant", content="回答" * 200))
+                await db.execute(
+                    update(Conversation)
+                    .where(Conversation.id == conversation_id)
+                    .values(updated_at=datetime.utcnow())
+                )
+                await safe_commit(db)
+        except OperationalError as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def queued_chat_worker(writer: MessageWriter, worker: int, deadline: float, latencies: list, errors: list) -> None:
+    """经消息写入队列提交（当前 chat_stream 的写法）"""
+    conversation_id = conversation_for(worker)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            await writer.add_message(conversation_id, "assistant", "回答" * 200)
+        except OperationalError as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def read_worker(session_factory, worker: int, deadline: float, latencies: list, errors: list) -> None:
+    user_id = worker % USERS + 1
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                (await db.execute(select(Config.value))).scalars().all()
+                (
+                    await db.execute(
+                        select(Conversation)
+                        .where(Conversation.user_id == user_id)
+                        .order_by(Conversation.updated_at.desc())
+                        .limit(20)
+                    )
+                ).scalars().all()
+        except OperationalError as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def summarize(name: str, latencies: list[float], errors: list[str], seconds: float) -> str:
+    if not latencies:
+        return f"  {name:<6} ops=0 errors={len(errors)}"
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"  {name:<6} ops/s={len(latencies) / seconds:8.1f}   p50={statistics.median(ordered) * 1000:7.2f} ms   "
+        f"p95={p95 * 1000:7.2f} ms   max={ordered[-1] * 1000:7.2f} ms   errors={len(errors)}"
+    )
+
+
+async def run_profile(profile: str, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        tuned = profile == "tuned"
+        write_engine = create_engine(url, tuned=tuned)
+        read_engine = create_engine(url, read_only=True) if tuned else write_engine
+        write_factory = async_sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False)
+        read_factory = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+        async with write_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed(write_factory)
+
+        write_latencies, write_errors, read_latencies, read_errors = [], [], [], []
+        deadline = time.perf_counter() + args.seconds
+        if args.writes == "queued":
+            writer = MessageWriter(session_factory=write_factory)
+            chats = [queued_chat_worker(writer, i, deadline, write_latencies, write_errors) for i in range(args.chats)]
+        else:
+            chats = [direct_chat_worker(write_factory, i, deadline, write_latencies, write_errors) for i in range(args.chats)]
+        await asyncio.gather(
+            *chats,
+            *(read_worker(read_factory, i, deadline, read_latencies, read_errors) for i in range(args.readers)),
+        )
+
+        if args.writes == "queued":
+            await writer.close()
+        print(f"{profile}:")
+        print(summarize("chat", write_latencies, write_errors, args.seconds))
+        print(summarize("read", read_latencies, read_errors, args.seconds))
+        if read_engine is not write_engine:
+            await read_engine.dispose()
+        await write_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chats", type=int, default=16, help="并发对话写入数")
+    parser.add_argument("--readers", type=int, default=16, help="并发配置/列表读取数")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writes", choices=["queued", "direct"], default="queued", help="对话消息的提交方式")
+    parser.add_argument("--profile", choices=["default", "tuned", "both"], default="both")
+    args = parser.parse_args()
+
+    profiles = ["default", "tuned"] if args.profile == "both" else [args.profile]
+    print(f"chats={args.chats} readers={args.readers} seconds={args.seconds} writes={args.writes}")
+    for profile in profiles:
+        asyncio.run(run_profile(profile, args))
+
+
+if __name__ == "__main__":
+    main()
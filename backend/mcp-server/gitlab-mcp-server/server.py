@@ -1,7 +1,11 @@
 import logging
 import os
 import sys
-from typing import List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
@@ -25,6 +29,44 @@ MAX_LIMIT = 200
 DEFAULT_PER_PAGE = 50
 _gl = None
 
+# 进程内调用（backend 直接导入工具函数）时按调用传入配置，而不是读取进程环境变量
+_config_override: ContextVar[Optional[Dict[str, str]]] = ContextVar("gitlab_config_override", default=None)
+# 进程内模式下按 (url, token) 缓存已认证的客户端，避免每次调用重复 auth()
+_gl_cache: Dict[Tuple[str, str], object] = {}
+_gl_cache_lock = threading.Lock()
+# 进程内调用的截止时间（time.monotonic() 值）通过配置中的该键传入；超时后工具在下一次分页/循环前主动退出
+DEADLINE_KEY = "_DEADLINE"
+
+
+class DeadlineExceeded(Exception):
+    """进程内调用已超过调用方给定的截止时间"""
+
+
+@contextmanager
+def use_config(config: Dict[str, str]):
+    """在当前上下文内使用指定配置（键与环境变量同名，如 GITLAB_URL）"""
+    token = _config_override.set(config)
+    try:
+        yield
+    finally:
+        _config_override.reset(token)
+
+
+def _getenv(name: str, default: Optional[str] = None) -> Optional[str]:
+    # 仅在本次配置未提供该键时回退到进程环境变量；空值与 stdio 模式一样按空值处理
+    override = _config_override.get()
+    if override is not None and name in override:
+        value = override[name]
+        return default if value is None else value
+    return os.getenv(name, default)
+
+
+def _check_deadline() -> None:
+    override = _config_override.get()
+    deadline = override.get(DEADLINE_KEY) if override else None
+    if deadline and time.monotonic() > float(deadline):
+        raise DeadlineExceeded("GitLab tool deadline exceeded")
+
 
 def _parse_groups(value: Optional[str]) -> List[str]:
     if not value:
@@ -48,30 +90,45 @@ def _truncate_patch(patch: Optional[str], max_chars: int) -> str:
 
 def _connect_gitlab(gitlab_module=gitlab):
     global _gl
-    if _gl is not None:
+    override = _config_override.get()
+    if override is None and _gl is not None:
         return _gl
 
-    url = os.getenv("GITLAB_URL")
-    token = os.getenv("GITLAB_TOKEN")
-    api_version = os.getenv("GITLAB_API_VERSION", "4")
-    timeout = float(os.getenv("GITLAB_TIMEOUT", "120"))
+    url = _getenv("GITLAB_URL")
+    token = _getenv("GITLAB_TOKEN")
+    api_version = _getenv("GITLAB_API_VERSION", "4")
+    timeout = float(_getenv("GITLAB_TIMEOUT", "120"))
     if not url or not token:
         raise Exception("Missing GITLAB_URL or GITLAB_TOKEN")
 
-    _gl = gitlab_module.Gitlab(
-        url=url,
-        private_token=token,
-        api_version=api_version,
-        timeout=timeout,
-    )
-    _gl.auth()
-    return _gl
+    def create():
+        gl = gitlab_module.Gitlab(
+            url=url,
+            private_token=token,
+            api_version=api_version,
+            timeout=timeout,
+        )
+        gl.auth()
+        return gl
+
+    if override is None:
+        _gl = create()
+        return _gl
+
+    # 持锁创建，保证并发的首次调用只认证一次
+    with _gl_cache_lock:
+        gl = _gl_cache.get((url, token))
+        if gl is None:
+            gl = create()
+            _gl_cache[(url, token)] = gl
+    return gl
 
 
 def _list_all(listable, per_page: int, **kwargs):
     page = 1
     items = []
     while True:
+        _check_deadline()
         page_items = listable.list(page=page, per_page=per_page, **kwargs)
         if not page_items:
             break
@@ -105,7 +162,7 @@ def _parse_iso_datetime(value: Optional[str]) -> Optional[datetime]:
 
 
 def _get_now() -> datetime:
-    override = os.getenv("GITLAB_NOW")
+    override = _getenv("GITLAB_NOW")
     if override:
         parsed = _parse_iso_datetime(override)
         if parsed:
@@ -122,6 +179,8 @@ def _count_user_commit_stats(user, per_page: int, start_week: datetime, start_mo
 
     try:
         events = _list_all(events_api, per_page, after=start_month.date().isoformat())
+    except DeadlineExceeded:
+        raise
     except Exception as exc:
         logger.warning("Failed to load events for user %s: %s", _get_attr(user, "username"), exc)
         return 0, 0
@@ -154,8 +213,8 @@ def _count_user_commit_stats(user, per_page: int, start_week: datetime, start_mo
 
 @mcp.tool()
 def list_projects():
-    per_page = int(os.getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
-    groups = _parse_groups(os.getenv("GITLAB_GROUPS"))
+    per_page = int(_getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
+    groups = _parse_groups(_getenv("GITLAB_GROUPS"))
     gl = _connect_gitlab()
 
     projects = []
@@ -183,7 +242,7 @@ def list_projects():
 
 @mcp.tool()
 def list_users():
-    per_page = int(os.getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
+    per_page = int(_getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
     gl = _connect_gitlab()
     users = _list_all(gl.users, per_page)
     now = _get_now()
@@ -238,7 +297,7 @@ def get_user_commits(username: str, project_ids: List[int], limit: int = DEFAULT
         len(project_ids),
     )
 
-    per_page = int(os.getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
+    per_page = int(_getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
     gl = _connect_gitlab()
 
     users = gl.users.list(username=username)
@@ -251,6 +310,7 @@ def get_user_commits(username: str, project_ids: List[int], limit: int = DEFAULT
     for project_id in project_ids:
         if remaining <= 0:
             break
+        _check_deadline()
         try:
             project = gl.projects.get(project_id)
         except Exception:
@@ -289,13 +349,14 @@ def get_user_commits(username: str, project_ids: List[int], limit: int = DEFAULT
 
 @mcp.tool()
 def list_commits(project_id: int, limit: int = DEFAULT_LIMIT, ref_name: Optional[str] = None):
-    per_page = int(os.getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
+    per_page = int(_getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
     gl = _connect_gitlab()
 
     commits = []
     remaining = _clamp_limit(limit)
     page = 1
     while remaining > 0:
+        _check_deadline()
         page_size = min(per_page, remaining)
         list_kwargs = {"page": page, "per_page": page_size}
         if ref_name:
@@ -330,7 +391,7 @@ def list_commits(project_id: int, limit: int = DEFAULT_LIMIT, ref_name: Optional
 
 @mcp.tool()
 def list_branches(project_id: int):
-    per_page = int(os.getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
+    per_page = int(_getenv("GITLAB_PER_PAGE", DEFAULT_PER_PAGE))
     gl = _connect_gitlab()
     project = gl.projects.get(project_id)
     branches = _list_all(project.branches, per_page)
@@ -351,7 +412,7 @@ def get_commit_diff(project_id: int, commit_sha: str):
     if not commit_sha:
         raise Exception("commit_sha is required")
 
-    max_diff_chars = int(os.getenv("GITLAB_MAX_DIFF_CHARS", "200000"))
+    max_diff_chars = int(_getenv("GITLAB_MAX_DIFF_CHARS", "200000"))
     gl = _connect_gitlab()
     project = gl.projects.get(project_id)
     commit = project.commits.get(commit_sha)
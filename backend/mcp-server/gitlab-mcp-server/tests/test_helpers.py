@@ -31,3 +31,51 @@ def test_truncate_patch():
     assert server._truncate_patch("short", 10) == "short"
     assert server._truncate_patch("abcdef", 3) == "abc... [truncated]"
     assert server._truncate_patch(None, 10) == ""
+
+
+def test_use_config_overrides_env(monkeypatch):
+    monkeypatch.setenv("GITLAB_GROUPS", "env-group")
+
+    with server.use_config({"GITLAB_GROUPS": "a,b"}):
+        assert server._getenv("GITLAB_GROUPS") == "a,b"
+
+    assert server._getenv("GITLAB_GROUPS") == "env-group"
+
+
+def test_use_config_empty_value_does_not_fall_back_to_env(monkeypatch):
+    monkeypatch.setenv("GITLAB_GROUPS", "env-group")
+    monkeypatch.setenv("GITLAB_NOW", "2024-01-01T00:00:00Z")
+
+    with server.use_config({"GITLAB_GROUPS": ""}):
+        assert server._getenv("GITLAB_GROUPS") == ""
+        assert server._getenv("GITLAB_NOW") == "2024-01-01T00:00:00Z"
+
+
+def test_connect_gitlab_caches_client_per_url_and_token(monkeypatch):
+    created = []
+
+    class StubGitlab:
+        def __init__(self, url, private_token, api_version, timeout):
+            created.append((url, private_token))
+
+        def auth(self):
+            return None
+
+    class StubModule:
+        Gitlab = StubGitlab
+
+    monkeypatch.setattr(server, "_gl_cache", {})
+
+    config = {"GITLAB_URL": "https://gitlab.example.com", "GITLAB_TOKEN": "t1"}
+    with server.use_config(config):
+        first = server._connect_gitlab(gitlab_module=StubModule)
+        second = server._connect_gitlab(gitlab_module=StubModule)
+    with server.use_config({**config, "GITLAB_TOKEN": "t2"}):
+        third = server._connect_gitlab(gitlab_module=StubModule)
+
+    assert first is second
+    assert third is not first
+    assert created == [
+        ("https://gitlab.example.com", "t1"),
+        ("https://gitlab.example.com", "t2"),
+    ]
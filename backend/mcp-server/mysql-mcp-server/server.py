@@ -3,13 +3,19 @@ MySQL MCP Server (只读查询模式)
 基于 fastmcp 框架的 MySQL 数据库查询服务器，仅提供查询功能
 """
 
+import asyncio
 import os
 import sys
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dotenv import load_dotenv
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.constants import FIELD_TYPE
+from pymysql.cursors import Cursor, DictCursor, SSDictCursor
 from fastmcp import FastMCP
 
 # 配置日志输出到 stderr，避免干扰 JSON-RPC 通信
@@ -26,108 +32,574 @@ load_dotenv()
 mcp = FastMCP("MySQL MCP Server (Query Only)")
 
 
-class MySQLConnection:
-    """MySQL 数据库连接管理"""
-    
-    def __init__(self):
-        self.connection = None
-    
-    def connect(self, use_database=None):
+class MySQLConnectionPool:
+    """MySQL 连接池
+
+    - 按数据库分组缓存连接，同一数据库的请求复用已建立的连接
+    - 总连接数受 MYSQL_POOL_SIZE 限制，满时优先关闭其他数据库的空闲连接，否则等待归还
+    - 空闲超过 MYSQL_POOL_IDLE_TIMEOUT 秒的连接会被回收
+    - 空闲超过 MYSQL_POOL_PING_INTERVAL 秒的连接在取出前执行 ping(reconnect=True)
+    """
+
+    def __init__(self, max_size=None, idle_timeout=None, ping_interval=None, wait_timeout=None, connect_factory=None):
+        self.max_size = max(1, int(max_size or os.getenv('MYSQL_POOL_SIZE', 5)))
+        self.idle_timeout = float(idle_timeout or os.getenv('MYSQL_POOL_IDLE_TIMEOUT', 300))
+        self.ping_interval = float(ping_interval or os.getenv('MYSQL_POOL_PING_INTERVAL', 30))
+        self.wait_timeout = float(wait_timeout or os.getenv('MYSQL_POOL_WAIT_TIMEOUT', 30))
+        self._connect_factory = connect_factory or pymysql.connect
+        # {database: [(connection, last_used), ...]}，列表尾部为最近归还的连接
+        self._idle: Dict[str, List[Tuple[Any, float]]] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def _default_database(self) -> str:
+        return os.getenv('MYSQL_DATABASE') or ''
+
+    def _new_connection(self, database: str):
         """建立数据库连接
-        
+
         参数:
-            use_database: 指定要连接的数据库，如果为None则不指定默认数据库
+            database: 指定要连接的数据库，空字符串表示不指定默认数据库
         """
-        if self.connection is None:
-            # 构建连接参数
-            connect_kwargs = {
-                'host': os.getenv('MYSQL_HOST', 'localhost'),
-                'port': int(os.getenv('MYSQL_PORT', 3306)),
-                'user': os.getenv('MYSQL_USER', 'root'),
-                'password': os.getenv('MYSQL_PASSWORD', ''),
-                'charset': os.getenv('MYSQL_CHARSET', 'utf8mb4'),
-                'cursorclass': DictCursor
-            }
-            
-            # 只有在显式指定时才设置database参数
-            if use_database:
-                connect_kwargs['database'] = use_database
-            else:
-                # 否则使用环境变量中的值（可能是空字符串）
-                db_from_env = os.getenv('MYSQL_DATABASE')
-                if db_from_env:
-                    connect_kwargs['database'] = db_from_env
-            
-            self.connection = pymysql.connect(**connect_kwargs)
-        return self.connection
-    
-    def ensure_database(self, database_name):
-        """确保当前连接使用指定的数据库"""
-        if database_name and (not self.connection or self.connection.db != database_name):
-            # 如果连接不在指定数据库，关闭重新连接
-            if self.connection:
-                self.connection.close()
-                self.connection = None
-            return self.connect(use_database=database_name)
-        return self.connect()
-    
-    def disconnect(self):
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+        connect_kwargs = {
+            'host': os.getenv('MYSQL_HOST', 'localhost'),
+            'port': int(os.getenv('MYSQL_PORT', 3306)),
+            'user': os.getenv('MYSQL_USER', 'root'),
+            'password': os.getenv('MYSQL_PASSWORD', ''),
+            'charset': os.getenv('MYSQL_CHARSET', 'utf8mb4'),
+            'cursorclass': DictCursor,
+            # 保持非自动提交：归还连接时回滚，误执行的写语句不会生效
+            'autocommit': False,
+        }
+        if database:
+            connect_kwargs['database'] = database
+        return self._connect_factory(**connect_kwargs)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _take_idle(self, database: str, now: float):
+        """取出指定数据库的空闲连接，同时回收过期连接（需持有锁）"""
+        idle = self._idle.get(database)
+        while idle:
+            conn, last_used = idle.pop()
+            if now - last_used > self.idle_timeout:
+                self._size -= 1
+                self._close_quietly(conn)
+                continue
+            return conn, last_used
+        return None, 0.0
+
+    def _evict_other_idle(self, database: str) -> bool:
+        """关闭其他数据库中最久未使用的空闲连接，为新连接腾出位置（需持有锁）"""
+        oldest_key, oldest_time = None, None
+        for key, idle in self._idle.items():
+            if key != database and idle and (oldest_time is None or idle[0][1] < oldest_time):
+                oldest_key, oldest_time = key, idle[0][1]
+        if oldest_key is None:
+            return False
+        conn, _ = self._idle[oldest_key].pop(0)
+        self._size -= 1
+        self._close_quietly(conn)
+        return True
+
+    def acquire(self, database: Optional[str] = None):
+        database = self._default_database() if database is None else database
+        deadline = time.monotonic() + self.wait_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                conn, last_used = self._take_idle(database, now)
+                if conn is not None:
+                    break
+                if self._size < self.max_size or self._evict_other_idle(database):
+                    self._size += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise Exception(f"等待数据库连接超时（连接池大小 {self.max_size}）")
+                self._cond.wait(remaining)
+
+        if conn is None:
+            try:
+                return self._new_connection(database)
+            except Exception:
+                self._discard()
+                raise
+
+        if time.monotonic() - last_used > self.ping_interval:
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                self.discard(conn)
+                raise
+        return conn
+
+    def release(self, conn, database: Optional[str] = None):
+        """回滚后归还连接：丢弃误执行的写操作，并结束当前一致性快照，下次取出时读到最新数据"""
+        database = self._default_database() if database is None else database
+        try:
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        with self._cond:
+            self._idle.setdefault(database, []).append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, conn):
+        """关闭一个已借出的连接并释放其名额（连接状态不可复用时使用）"""
+        self._close_quietly(conn)
+        self._discard()
+
+    def _discard(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, database: Optional[str] = None):
+        """取出一个连接，使用完自动归还；连接层错误时丢弃该连接"""
+        conn = self.acquire(database)
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self.discard(conn)
+            raise
+        except BaseException:
+            self.release(conn, database)
+            raise
+        else:
+            self.release(conn, database)
+
+    def kill_query(self, thread_id: int):
+        """通过旁路连接终止指定连接上正在执行的语句（不占用连接池名额）"""
+        conn = self._new_connection('')
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"KILL QUERY {int(thread_id)}")
+        finally:
+            self._close_quietly(conn)
+
+    def recycle_idle(self):
+        """关闭所有超过空闲时间的连接"""
+        now = time.monotonic()
+        with self._cond:
+            for key, idle in self._idle.items():
+                keep = []
+                for conn, last_used in idle:
+                    if now - last_used > self.idle_timeout:
+                        self._size -= 1
+                        self._close_quietly(conn)
+                    else:
+                        keep.append((conn, last_used))
+                self._idle[key] = keep
+            self._cond.notify_all()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            for idle in self._idle.values():
+                for conn, _ in idle:
+                    self._size -= 1
+                    self._close_quietly(conn)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = sum(len(items) for items in self._idle.values())
+            return {"max_size": self.max_size, "size": self._size, "idle": idle, "busy": self._size - idle}
 
 
-# 全局连接实例
-db = MySQLConnection()
+# 全局连接池
+db = MySQLConnectionPool()
+
+
+_last_recycle = time.monotonic()
+
+
+async def _run_blocking(func, *args):
+    """在工作线程中执行阻塞的数据库操作，使多个 tools/call 可以同时进行"""
+    global _last_recycle
+    now = time.monotonic()
+    if now - _last_recycle > min(db.idle_timeout, STREAM_CURSOR_IDLE_TIMEOUT) / 2:
+        _last_recycle = now
+        db.recycle_idle()
+        await asyncio.to_thread(_expire_stream_cursors)
+    return await asyncio.to_thread(func, *args)
+
+
+class RunningQuery:
+    """工作线程中正在执行的语句所在连接，请求被取消时据此 KILL QUERY"""
+
+    def __init__(self):
+        self.thread_id: Optional[int] = None
+        self.cancelled = False
+        # 持有锁期间连接不会归还连接池，避免误杀复用该连接的其他语句
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def track(self, conn):
+        with self.lock:
+            if self.cancelled:
+                raise Exception("查询已取消")
+            self.thread_id = conn.thread_id()
+        try:
+            yield conn
+        finally:
+            with self.lock:
+                self.thread_id = None
+
+    def kill(self):
+        with self.lock:
+            self.cancelled = True
+            if self.thread_id is None:
+                return
+            try:
+                db.kill_query(self.thread_id)
+                logging.warning("已终止被取消的查询: connection_id=%s", self.thread_id)
+            except Exception as e:
+                logging.warning("终止查询失败: connection_id=%s %s", self.thread_id, e)
+
+
+async def _run_cancellable(func, *args):
+    """执行查询类操作；请求被取消（客户端断开时的 notifications/cancelled）时，
+    工作线程无法被中断，改为在后台线程通过旁路连接 KILL QUERY，让 MySQL 立即停止执行"""
+    running = RunningQuery()
+    try:
+        return await _run_blocking(func, *args, running)
+    except asyncio.CancelledError:
+        # 取消作用域内不能再 await，使用独立线程发送 KILL
+        threading.Thread(target=running.kill, name="mysql-kill-query", daemon=True).start()
+        raise
+
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+# 客户端超过该时间未继续拉取的流式游标会被关闭
+STREAM_CURSOR_IDLE_TIMEOUT = float(os.getenv('MYSQL_STREAM_CURSOR_IDLE_TIMEOUT', 60))
+
+
+class StreamCursor:
+    """流式查询游标：独占一个连接，使用非缓冲的 SSDictCursor 按需读取行"""
+
+    def __init__(self, conn, cursor):
+        self.conn = conn
+        self.cursor = cursor
+        self.last_used = time.monotonic()
+        self.closed = False
+        # 同一游标的拉取/关闭串行执行
+        self.lock = threading.Lock()
+
+
+_stream_cursors: Dict[str, StreamCursor] = {}
+_stream_cursors_lock = threading.Lock()
+
+
+def _use_default_database(cursor, sql: str):
+    # 如果SQL中没有指定数据库名且连接了数据库，先使用该数据库
+    current_db = os.getenv('MYSQL_DATABASE')
+    if current_db and not any(keyword in sql.upper() for keyword in ['FROM `', 'FROM ', 'UPDATE ', 'INSERT INTO ', 'DELETE FROM ']):
+        # 简单的表名查询，添加数据库名前缀
+        cursor.execute(f"USE `{current_db}`")
+
+
+_READ_ONLY_KEYWORDS = ('SELECT', 'WITH', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN')
+
+
+def _ensure_read_only(sql: str):
+    """只允许 SELECT/WITH/SHOW/DESCRIBE/EXPLAIN 开头的语句（跳过前导注释与括号）"""
+    text = sql.lstrip()
+    while True:
+        if text.startswith('/*'):
+            end = text.find('*/')
+            text = text[end + 2:].lstrip() if end >= 0 else ''
+        elif text.startswith('--') or text.startswith('#'):
+            end = text.find('\n')
+            text = text[end + 1:].lstrip() if end >= 0 else ''
+        elif text.startswith('('):
+            text = text[1:].lstrip()
+        else:
+            break
+    keyword = text.split(None, 1)[0].upper() if text else ''
+    if keyword not in _READ_ONLY_KEYWORDS:
+        raise Exception("只允许执行只读查询（SELECT/WITH/SHOW/DESCRIBE/EXPLAIN）")
+
+
+def _clamp_chunk_size(chunk_size: Optional[int]) -> int:
+    if not chunk_size or chunk_size <= 0:
+        return DEFAULT_CHUNK_SIZE
+    return min(chunk_size, MAX_CHUNK_SIZE)
+
+
+def _close_stream_cursor(stream: StreamCursor, exhausted: bool):
+    """读完的游标把连接还给连接池；中途放弃的游标直接断开连接，避免读完剩余结果集"""
+    if stream.closed:
+        return
+    stream.closed = True
+    if exhausted:
+        try:
+            stream.cursor.close()
+        finally:
+            db.release(stream.conn)
+    else:
+        db.discard(stream.conn)
+
+
+def _fetch_page(
+    cursor_id: str,
+    stream: StreamCursor,
+    chunk_size: int,
+    running: Optional[RunningQuery] = None,
+) -> Dict[str, Any]:
+    with (running or RunningQuery()).track(stream.conn):
+        rows = stream.cursor.fetchmany(chunk_size)
+    stream.last_used = time.monotonic()
+    done = len(rows) < chunk_size
+    if done:
+        with _stream_cursors_lock:
+            _stream_cursors.pop(cursor_id, None)
+        _close_stream_cursor(stream, exhausted=True)
+    return {"cursor_id": None if done else cursor_id, "rows": rows, "done": done}
+
+
+def _expire_stream_cursors():
+    now = time.monotonic()
+    with _stream_cursors_lock:
+        expired = [
+            cursor_id
+            for cursor_id, stream in _stream_cursors.items()
+            if now - stream.last_used > STREAM_CURSOR_IDLE_TIMEOUT
+        ]
+        streams = [_stream_cursors.pop(cursor_id) for cursor_id in expired]
+    for stream in streams:
+        with stream.lock:
+            _close_stream_cursor(stream, exhausted=False)
 
 
 @mcp.tool()
-def execute_query(sql: str) -> List[Dict[str, Any]]:
+async def execute_query(sql: str, result_format: str = "rows") -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     执行 SELECT 查询语句并返回结果
     
     参数:
         sql: SQL 查询语句（仅支持 SELECT 语句）
+        result_format: 返回格式，"rows"（默认）为逐行字典，
+            "columnar" 为列式编码 {"format", "columns", "types", "data", "row_count"}
     
     返回:
-        查询结果列表，每行是一个字典
+        查询结果列表，每行是一个字典；列式编码时 data 为按列组织的值数组
     
     异常:
         如果查询失败会抛出异常
     """
-    conn = db.connect()
+    return await _run_cancellable(_execute_query, sql, result_format)
+
+
+# 列类型 -> (类型标记, 编码函数)；编码函数为 None 表示值可直接 JSON 序列化
+_DECIMAL_TYPES = (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL)
+_INT_TYPES = (
+    FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG,
+    FIELD_TYPE.INT24, FIELD_TYPE.YEAR,
+)
+_FLOAT_TYPES = (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE)
+_DATETIME_TYPES = (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP)
+_BYTES_TYPES = (
+    FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB, FIELD_TYPE.BLOB,
+    FIELD_TYPE.BIT, FIELD_TYPE.STRING, FIELD_TYPE.VAR_STRING, FIELD_TYPE.VARCHAR, FIELD_TYPE.JSON,
+)
+
+
+def _text(value):
+    # TEXT 与 BLOB 共用类型码，二进制值按 UTF-8 解码
+    return value.decode('utf-8', 'replace') if isinstance(value, (bytes, bytearray)) else value
+
+
+def _column_encoder(type_code):
+    if type_code in _DECIMAL_TYPES:
+        return "decimal", str
+    if type_code in _INT_TYPES:
+        return "int", None
+    if type_code in _FLOAT_TYPES:
+        return "float", None
+    if type_code in _DATETIME_TYPES:
+        return "datetime", lambda value: value.isoformat()
+    if type_code == FIELD_TYPE.DATE:
+        return "date", lambda value: value.isoformat()
+    if type_code == FIELD_TYPE.TIME:
+        return "time", str
+    if type_code in _BYTES_TYPES:
+        return "str", _text
+    return "str", str
+
+
+def _encode_columnar(description, rows) -> Dict[str, Any]:
+    """
+    把元组行编码为列式结构：列名只出现一次，每列一个值数组，
+    编码函数按列类型一次性选定，避免逐值类型判断
+    """
+    columns, types, data = [], [], []
+    for index, column in enumerate(description or ()):
+        type_name, encode = _column_encoder(column[1])
+        values = [row[index] for row in rows]
+        if encode is not None:
+            values = [None if value is None else encode(value) for value in values]
+        columns.append(column[0])
+        types.append(type_name)
+        data.append(values)
+    return {"format": "columnar", "columns": columns, "types": types, "data": data, "row_count": len(rows)}
+
+
+def _execute_query(
+    sql: str,
+    result_format: str = "rows",
+    running: Optional[RunningQuery] = None,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    columnar = result_format == "columnar"
+    running = running or RunningQuery()
     try:
-        with conn.cursor() as cursor:
-            # 如果SQL中没有指定数据库名且连接了数据库，先使用该数据库
-            current_db = os.getenv('MYSQL_DATABASE')
-            if current_db and not any(keyword in sql.upper() for keyword in ['FROM `', 'FROM ', 'UPDATE ', 'INSERT INTO ', 'DELETE FROM ']):
-                # 简单的表名查询，添加数据库名前缀
-                cursor.execute(f"USE `{current_db}`")
-            
+        _ensure_read_only(sql)
+        with db.connection() as conn, running.track(conn), conn.cursor(Cursor if columnar else None) as cursor:
+            _use_default_database(cursor, sql)
             cursor.execute(sql)
             result = cursor.fetchall()
+            if columnar:
+                return _encode_columnar(cursor.description, result)
             return result
     except Exception as e:
         raise Exception(f"查询执行失败: {str(e)}")
+
+
+@mcp.tool()
+async def open_query_cursor(sql: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    以流式方式执行 SELECT 查询，返回第一页结果
+
+    参数:
+        sql: SQL 查询语句（仅支持 SELECT 语句）
+        chunk_size: 每页行数
+
+    返回:
+        {"cursor_id", "rows", "done"}；done 为 false 时用 fetch_query_cursor 继续拉取，
+        不再需要剩余结果时调用 close_query_cursor
+    """
+    return await _run_cancellable(_open_query_cursor, sql, chunk_size)
+
+
+def _open_query_cursor(
+    sql: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    running: Optional[RunningQuery] = None,
+) -> Dict[str, Any]:
+    running = running or RunningQuery()
+    try:
+        _ensure_read_only(sql)
+    except Exception as e:
+        raise Exception(f"查询执行失败: {str(e)}")
+    conn = db.acquire()
+    try:
+        with running.track(conn):
+            cursor = conn.cursor(SSDictCursor)
+            _use_default_database(cursor, sql)
+            cursor.execute(sql)
+    except Exception as e:
+        db.discard(conn)
+        raise Exception(f"查询执行失败: {str(e)}")
+
+    cursor_id = uuid.uuid4().hex
+    stream = StreamCursor(conn, cursor)
+    with stream.lock:
+        with _stream_cursors_lock:
+            _stream_cursors[cursor_id] = stream
+        return _fetch_page_or_fail(cursor_id, stream, _clamp_chunk_size(chunk_size), running)
+
+
+@mcp.tool()
+async def fetch_query_cursor(cursor_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    拉取流式查询的下一页结果
+
+    参数:
+        cursor_id: open_query_cursor 返回的游标 ID
+        chunk_size: 每页行数
+
+    返回:
+        {"cursor_id", "rows", "done"}
+    """
+    return await _run_cancellable(_fetch_query_cursor, cursor_id, chunk_size)
+
+
+def _fetch_query_cursor(
+    cursor_id: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    running: Optional[RunningQuery] = None,
+) -> Dict[str, Any]:
+    with _stream_cursors_lock:
+        stream = _stream_cursors.get(cursor_id)
+    if stream is None:
+        raise Exception(f"游标不存在或已过期: {cursor_id}")
+    with stream.lock:
+        if stream.closed:
+            raise Exception(f"游标不存在或已过期: {cursor_id}")
+        return _fetch_page_or_fail(cursor_id, stream, _clamp_chunk_size(chunk_size), running)
+
+
+def _fetch_page_or_fail(
+    cursor_id: str,
+    stream: StreamCursor,
+    chunk_size: int,
+    running: Optional[RunningQuery] = None,
+) -> Dict[str, Any]:
+    try:
+        return _fetch_page(cursor_id, stream, chunk_size, running)
+    except Exception as e:
+        with _stream_cursors_lock:
+            _stream_cursors.pop(cursor_id, None)
+        _close_stream_cursor(stream, exhausted=False)
+        raise Exception(f"查询执行失败: {str(e)}")
+
+
+@mcp.tool()
+async def close_query_cursor(cursor_id: str) -> Dict[str, Any]:
+    """
+    提前关闭流式查询游标，放弃剩余结果
+
+    参数:
+        cursor_id: open_query_cursor 返回的游标 ID
+    """
+    return await _run_blocking(_close_query_cursor, cursor_id)
+
+
+def _close_query_cursor(cursor_id: str) -> Dict[str, Any]:
+    with _stream_cursors_lock:
+        stream = _stream_cursors.pop(cursor_id, None)
+    if stream is None:
+        return {"closed": False}
+    with stream.lock:
+        _close_stream_cursor(stream, exhausted=False)
+    return {"closed": True}
 
 
 @mcp.tool()
-def list_databases() -> List[Dict[str, Any]]:
+async def list_databases() -> List[Dict[str, Any]]:
     """
     列出所有数据库
     
     返回:
         数据库列表，每个数据库包含名称等信息
     """
-    # 使用不指定database的连接
-    if db.connection:
-        db.connection.close()
-        db.connection = None
-    
-    conn = db.connect(use_database=None)
+    return await _run_blocking(_list_databases)
+
+
+def _list_databases() -> List[Dict[str, Any]]:
     try:
-        with conn.cursor() as cursor:
+        # 使用不指定database的连接
+        with db.connection('') as conn, conn.cursor() as cursor:
             cursor.execute("SHOW DATABASES")
             result = cursor.fetchall()
             # 将结果转换为更友好的格式，并过滤系统数据库
@@ -154,7 +626,7 @@ def list_databases() -> List[Dict[str, Any]]:
 
 
 @mcp.tool()
-def list_tables(database: Optional[str] = None) -> List[Dict[str, Any]]:
+async def list_tables(database: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     列出指定数据库的所有表
     
@@ -164,6 +636,10 @@ def list_tables(database: Optional[str] = None) -> List[Dict[str, Any]]:
     返回:
         表列表，每个表包含表名、类型和注释
     """
+    return await _run_blocking(_list_tables, database)
+
+
+def _list_tables(database: Optional[str] = None) -> List[Dict[str, Any]]:
     if database:
         sql = (
             "SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT, CREATE_TIME, UPDATE_TIME "
@@ -180,9 +656,8 @@ def list_tables(database: Optional[str] = None) -> List[Dict[str, Any]]:
             "ORDER BY COALESCE(UPDATE_TIME, CREATE_TIME) DESC"
         )
     
-    conn = db.connect()
     try:
-        with conn.cursor() as cursor:
+        with db.connection(database) as conn, conn.cursor() as cursor:
             cursor.execute(sql)
             result = cursor.fetchall()
             return [
@@ -198,7 +673,7 @@ def list_tables(database: Optional[str] = None) -> List[Dict[str, Any]]:
 
 
 @mcp.tool()
-def describe_table(table_name: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
+async def describe_table(table_name: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     获取表结构信息
     
@@ -209,6 +684,10 @@ def describe_table(table_name: str, database: Optional[str] = None) -> List[Dict
     返回:
         表结构信息，包含字段名、类型、是否可空、键、默认值等
     """
+    return await _run_blocking(_describe_table, table_name, database)
+
+
+def _describe_table(table_name: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
     if database:
         sql = f"DESCRIBE `{database}`.`{table_name}`"
     else:
@@ -217,9 +696,8 @@ def describe_table(table_name: str, database: Optional[str] = None) -> List[Dict
             raise Exception("未指定数据库且环境变量 MYSQL_DATABASE 未设置")
         sql = f"DESCRIBE `{current_db}`.`{table_name}`"
     
-    conn = db.connect()
     try:
-        with conn.cursor() as cursor:
+        with db.connection(database) as conn, conn.cursor() as cursor:
             cursor.execute(sql)
             result = cursor.fetchall()
             return result
@@ -228,7 +706,7 @@ def describe_table(table_name: str, database: Optional[str] = None) -> List[Dict
 
 
 @mcp.tool()
-def show_table_status(database: Optional[str] = None) -> List[Dict[str, Any]]:
+async def show_table_status(database: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     显示表的详细信息（引擎、行数、大小等）
     
@@ -238,6 +716,10 @@ def show_table_status(database: Optional[str] = None) -> List[Dict[str, Any]]:
     返回:
         表状态信息列表
     """
+    return await _run_blocking(_show_table_status, database)
+
+
+def _show_table_status(database: Optional[str] = None) -> List[Dict[str, Any]]:
     if database:
         sql = f"SHOW TABLE STATUS FROM `{database}`"
     else:
@@ -246,9 +728,8 @@ def show_table_status(database: Optional[str] = None) -> List[Dict[str, Any]]:
             raise Exception("未指定数据库且环境变量 MYSQL_DATABASE 未设置")
         sql = f"SHOW TABLE STATUS FROM `{current_db}`"
     
-    conn = db.connect()
     try:
-        with conn.cursor() as cursor:
+        with db.connection(database) as conn, conn.cursor() as cursor:
             cursor.execute(sql)
             result = cursor.fetchall()
             result.sort(
@@ -265,7 +746,7 @@ def show_table_status(database: Optional[str] = None) -> List[Dict[str, Any]]:
 
 
 @mcp.tool()
-def get_table_indexes(table_name: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
+async def get_table_indexes(table_name: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     获取表的索引信息
     
@@ -276,6 +757,10 @@ def get_table_indexes(table_name: str, database: Optional[str] = None) -> List[D
     返回:
         索引信息列表
     """
+    return await _run_blocking(_get_table_indexes, table_name, database)
+
+
+def _get_table_indexes(table_name: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
     if database:
         sql = f"SHOW INDEX FROM `{database}`.`{table_name}`"
     else:
@@ -284,9 +769,8 @@ def get_table_indexes(table_name: str, database: Optional[str] = None) -> List[D
             raise Exception("未指定数据库且环境变量 MYSQL_DATABASE 未设置")
         sql = f"SHOW INDEX FROM `{current_db}`.`{table_name}`"
     
-    conn = db.connect()
     try:
-        with conn.cursor() as cursor:
+        with db.connection(database) as conn, conn.cursor() as cursor:
             cursor.execute(sql)
             result = cursor.fetchall()
             return result
@@ -294,21 +778,110 @@ def get_table_indexes(table_name: str, database: Optional[str] = None) -> List[D
         raise Exception(f"获取索引信息失败: {str(e)}")
 
 
+SYSTEM_SCHEMAS = ('information_schema', 'performance_schema', 'mysql', 'sys')
+
+
+def _schema_filter(column: str, databases: Optional[List[str]]) -> Tuple[str, List[str]]:
+    """生成 schema 过滤条件：指定数据库列表时按列表过滤，否则排除系统库"""
+    if databases:
+        return f"{column} IN ({', '.join(['%s'] * len(databases))})", list(databases)
+    return f"{column} NOT IN ({', '.join(['%s'] * len(SYSTEM_SCHEMAS))})", list(SYSTEM_SCHEMAS)
+
+
+@mcp.tool()
+async def get_catalog(databases: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    批量获取表、字段、索引元数据（基于 information_schema 的三次集合查询）
+
+    参数:
+        databases: 数据库名称列表，为空时返回所有非系统库
+
+    返回:
+        {"tables": [...], "columns": [...], "indexes": [...]}，
+        tables 含行数估计与数据/索引大小
+    """
+    return await _run_blocking(_get_catalog, databases)
+
+
+def _get_catalog(databases: Optional[List[str]] = None) -> Dict[str, Any]:
+    where, params = _schema_filter('TABLE_SCHEMA', databases)
+    try:
+        with db.connection('') as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT TABLE_SCHEMA AS table_schema, TABLE_NAME AS table_name, TABLE_TYPE AS table_type, "
+                "TABLE_COMMENT AS table_comment, ENGINE AS engine, TABLE_ROWS AS table_rows, "
+                "DATA_LENGTH AS data_length, INDEX_LENGTH AS index_length "
+                f"FROM information_schema.TABLES WHERE {where} "
+                "ORDER BY TABLE_SCHEMA, TABLE_NAME",
+                params,
+            )
+            tables = cursor.fetchall()
+            cursor.execute(
+                "SELECT TABLE_SCHEMA AS table_schema, TABLE_NAME AS table_name, COLUMN_NAME AS column_name, "
+                "ORDINAL_POSITION AS ordinal_position, COLUMN_TYPE AS column_type, IS_NULLABLE AS is_nullable, "
+                "COLUMN_KEY AS column_key, COLUMN_DEFAULT AS column_default, EXTRA AS extra, "
+                "COLUMN_COMMENT AS column_comment "
+                f"FROM information_schema.COLUMNS WHERE {where} "
+                "ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION",
+                params,
+            )
+            columns = cursor.fetchall()
+            cursor.execute(
+                "SELECT TABLE_SCHEMA AS table_schema, TABLE_NAME AS table_name, INDEX_NAME AS index_name, "
+                "SEQ_IN_INDEX AS seq_in_index, COLUMN_NAME AS column_name, NON_UNIQUE AS non_unique, "
+                "INDEX_TYPE AS index_type, CARDINALITY AS cardinality "
+                f"FROM information_schema.STATISTICS WHERE {where} "
+                "ORDER BY TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+                params,
+            )
+            indexes = cursor.fetchall()
+            return {"tables": tables, "columns": columns, "indexes": indexes}
+    except Exception as e:
+        raise Exception(f"获取元数据目录失败: {str(e)}")
+
+
+@mcp.tool()
+async def get_schema_summary() -> List[Dict[str, Any]]:
+    """
+    单次聚合查询返回每个非系统库的表数量
+
+    返回:
+        [{"database": 名称, "table_count": 表数量}, ...]
+    """
+    return await _run_blocking(_get_schema_summary)
+
+
+def _get_schema_summary() -> List[Dict[str, Any]]:
+    where, params = _schema_filter('s.SCHEMA_NAME', None)
+    try:
+        with db.connection('') as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT s.SCHEMA_NAME AS `database`, COUNT(t.TABLE_NAME) AS table_count "
+                "FROM information_schema.SCHEMATA s "
+                "LEFT JOIN information_schema.TABLES t ON t.TABLE_SCHEMA = s.SCHEMA_NAME "
+                f"WHERE {where} GROUP BY s.SCHEMA_NAME ORDER BY s.SCHEMA_NAME",
+                params,
+            )
+            return cursor.fetchall()
+    except Exception as e:
+        raise Exception(f"获取数据库汇总失败: {str(e)}")
+
+
 @mcp.resource("mysql://databases")
-def get_databases() -> str:
+async def get_databases() -> str:
     """
     获取数据库列表资源
     """
-    databases = list_databases()
+    databases = await list_databases()
     return "数据库列表:\n" + "\n".join([f"- {db['database']}" for db in databases])
 
 
 @mcp.resource("mysql://tables")
-def get_tables() -> str:
+async def get_tables() -> str:
     """
     获取当前数据库的表列表资源
     """
-    tables = list_tables()
+    tables = await list_tables()
     if not tables:
         return "当前数据库中没有表"
     return "表列表:\n" + "\n".join([f"- {table['table_name']} ({table['table_comment']})" for table in tables])
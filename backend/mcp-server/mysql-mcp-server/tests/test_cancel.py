@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import server
+from test_pool import FakeConnection, FakeCursor
+
+
+@pytest.fixture
+def created(monkeypatch):
+    monkeypatch.setenv("MYSQL_DATABASE", "app")
+    monkeypatch.setattr(server, "_stream_cursors", {})
+    created = []
+
+    def factory(**kwargs):
+        conn = FakeConnection(**kwargs)
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(server, "db", server.MySQLConnectionPool(max_size=1, connect_factory=factory))
+    return created
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_cancelled_query_is_killed_through_side_connection(created):
+    async def scenario():
+        task = asyncio.create_task(server.execute_query("SELECT SLEEP 0.5"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    wait_for(lambda: len(created) == 2 and created[1].closed)
+
+    worker, side = created
+    assert side.executed == [f"KILL QUERY {worker.thread_id()}"]
+    assert side.database is None
+    # 旁路连接不占用连接池名额，工作连接执行结束后正常归还
+    wait_for(lambda: server.db.stats()["idle"] == 1)
+
+
+def test_cancelled_cursor_fetch_is_killed(created, monkeypatch):
+    first = server._open_query_cursor("SELECT ROWS 5", chunk_size=2)
+    original = FakeCursor.fetchmany
+
+    def slow_fetchmany(self, size):
+        time.sleep(0.3)
+        return original(self, size)
+
+    monkeypatch.setattr(FakeCursor, "fetchmany", slow_fetchmany)
+
+    async def scenario():
+        task = asyncio.create_task(server.fetch_query_cursor(first["cursor_id"], chunk_size=2))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    wait_for(lambda: len(created) == 2)
+
+    assert created[1].executed == [f"KILL QUERY {created[0].thread_id()}"]
+
+
+def test_finished_query_is_not_killed(created):
+    running = server.RunningQuery()
+    server._execute_query("SELECT 1", "rows", running)
+
+    running.kill()
+
+    assert len(created) == 1
+    with pytest.raises(Exception, match="已取消"):
+        server._execute_query("SELECT 1", "rows", running)
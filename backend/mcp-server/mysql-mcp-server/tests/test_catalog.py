@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import server
+from test_pool import FakeConnection
+
+
+@pytest.fixture
+def created(monkeypatch):
+    created = []
+
+    def factory(**kwargs):
+        conn = FakeConnection(**kwargs)
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(server, "db", server.MySQLConnectionPool(max_size=1, connect_factory=factory))
+    return created
+
+
+def test_catalog_uses_three_set_based_queries(created):
+    catalog = server._get_catalog(["app", "crm"])
+
+    conn = created[0]
+    assert catalog == {
+        "tables": [{"query": "information_schema.TABLES"}],
+        "columns": [{"query": "information_schema.COLUMNS"}],
+        "indexes": [{"query": "information_schema.STATISTICS"}],
+    }
+    assert len(conn.executed) == 3
+    assert all("TABLE_SCHEMA IN (%s, %s)" in sql for sql in conn.executed)
+    assert conn.params == [["app", "crm"]] * 3
+    assert conn.database is None
+
+
+def test_catalog_without_databases_excludes_system_schemas(created):
+    server._get_catalog()
+
+    conn = created[0]
+    assert all("TABLE_SCHEMA NOT IN" in sql for sql in conn.executed)
+    assert conn.params[0] == list(server.SYSTEM_SCHEMAS)
+
+
+def test_schema_summary_is_single_aggregate_query(created):
+    server._get_schema_summary()
+
+    conn = created[0]
+    assert len(conn.executed) == 1
+    assert "GROUP BY s.SCHEMA_NAME" in conn.executed[0]
+    assert conn.params[0] == list(server.SYSTEM_SCHEMAS)
@@ -0,0 +1,87 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from pymysql.constants import FIELD_TYPE
+from pymysql.cursors import Cursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import server
+from test_pool import FakeConnection, FakeCursor
+
+DESCRIPTION = [
+    ("id", FIELD_TYPE.LONGLONG),
+    ("amount", FIELD_TYPE.NEWDECIMAL),
+    ("created_at", FIELD_TYPE.DATETIME),
+    ("day", FIELD_TYPE.DATE),
+    ("duration", FIELD_TYPE.TIME),
+    ("note", FIELD_TYPE.BLOB),
+]
+ROWS = [
+    (1, Decimal("12.50"), datetime(2024, 1, 2, 3, 4, 5), date(2024, 1, 2), timedelta(hours=1), b"hi"),
+    (2, None, None, None, None, "text"),
+]
+
+
+class TupleCursor(FakeCursor):
+    description = [column + (None,) * 5 for column in DESCRIPTION]
+
+    def fetchall(self):
+        return list(ROWS)
+
+
+class TupleConnection(FakeConnection):
+    def cursor(self, cursorclass=None):
+        self.cursorclass = cursorclass
+        return TupleCursor(self) if cursorclass is Cursor else FakeCursor(self)
+
+
+@pytest.fixture
+def created(monkeypatch):
+    created = []
+
+    def factory(**kwargs):
+        conn = TupleConnection(**kwargs)
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(server, "db", server.MySQLConnectionPool(max_size=1, connect_factory=factory))
+    return created
+
+
+def test_columnar_encodes_typed_column_arrays(created):
+    result = server._execute_query("SELECT * FROM orders", "columnar")
+
+    assert created[0].cursorclass is Cursor
+    assert result == {
+        "format": "columnar",
+        "columns": ["id", "amount", "created_at", "day", "duration", "note"],
+        "types": ["int", "decimal", "datetime", "date", "time", "str"],
+        "data": [
+            [1, 2],
+            ["12.50", None],
+            ["2024-01-02T03:04:05", None],
+            ["2024-01-02", None],
+            ["1:00:00", None],
+            ["hi", "text"],
+        ],
+        "row_count": 2,
+    }
+
+
+def test_rows_format_is_default(created):
+    result = server._execute_query("SELECT 1 FROM dual")
+
+    assert created[0].cursorclass is None
+    assert result[0]["sql"] == "SELECT 1 FROM dual"
+
+
+def test_columnar_empty_result_keeps_columns():
+    result = server._encode_columnar(DESCRIPTION, [])
+
+    assert result["columns"][0] == "id"
+    assert result["data"] == [[]] * len(DESCRIPTION)
+    assert result["row_count"] == 0
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pymysql
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import server
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        self.conn.params.append(params)
+        if sql.startswith("SELECT SLEEP"):
+            time.sleep(float(sql.split()[2]))
+        if sql == "BROKEN":
+            raise pymysql.err.OperationalError(2013, "Lost connection")
+        if sql.startswith("SELECT") and "information_schema" in sql:
+            self.rows = [{"query": sql.split("FROM ")[1].split()[0]}]
+        elif sql.startswith("SELECT ROWS"):
+            self.rows = [{"id": i} for i in range(int(sql.split()[2]))]
+        else:
+            self.rows = [{"sql": sql, "conn": id(self.conn)}]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        page, self.rows = self.rows[:size], self.rows[size:]
+        return page
+
+    def close(self):
+        self.conn.cursor_closed = True
+
+
+class FakeConnection:
+    next_thread_id = 100
+
+    def __init__(self, **kwargs):
+        FakeConnection.next_thread_id += 1
+        self._thread_id = FakeConnection.next_thread_id
+        self.database = kwargs.get("database")
+        self.closed = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.executed = []
+        self.params = []
+        self.cursor_closed = False
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self)
+
+    def thread_id(self):
+        return self._thread_id
+
+    def ping(self, reconnect=False):
+        assert reconnect is True
+        self.pings += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def created():
+    return []
+
+
+@pytest.fixture
+def make_pool(created, monkeypatch):
+    monkeypatch.setenv("MYSQL_DATABASE", "app")
+
+    def factory(**kwargs):
+        conn = FakeConnection(**kwargs)
+        created.append(conn)
+        return conn
+
+    def make(**kwargs):
+        kwargs.setdefault("max_size", 2)
+        kwargs.setdefault("wait_timeout", 1)
+        return server.MySQLConnectionPool(connect_factory=factory, **kwargs)
+
+    return make
+
+
+def test_connections_are_reused_per_database(make_pool, created):
+    pool = make_pool()
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    with pool.connection("other") as third:
+        pass
+
+    assert first is second
+    assert third is not first
+    assert [conn.database for conn in created] == ["app", "other"]
+    assert pool.stats() == {"max_size": 2, "size": 2, "idle": 2, "busy": 0}
+
+
+def test_full_pool_evicts_idle_connection_of_other_database(make_pool, created):
+    pool = make_pool()
+    with pool.connection("a"):
+        pass
+    with pool.connection("b"):
+        pass
+
+    with pool.connection("c") as conn:
+        assert conn.database == "c"
+
+    assert created[0].closed is True
+    assert pool.stats()["size"] == 2
+
+
+def test_full_pool_waits_then_times_out(make_pool):
+    pool = make_pool(max_size=1, wait_timeout=0.2)
+
+    with pool.connection():
+        with pytest.raises(Exception, match="等待数据库连接超时"):
+            pool.acquire()
+
+
+def test_waiter_gets_released_connection(make_pool):
+    pool = make_pool(max_size=1)
+    conn = pool.acquire()
+    threading.Timer(0.1, pool.release, args=(conn,)).start()
+
+    assert pool.acquire() is conn
+
+
+def test_idle_connections_are_recycled(make_pool, created):
+    pool = make_pool(idle_timeout=0.05)
+    with pool.connection():
+        pass
+    time.sleep(0.1)
+
+    pool.recycle_idle()
+
+    assert created[0].closed is True
+    assert pool.stats()["size"] == 0
+
+
+def test_stale_connection_is_pinged_before_reuse(make_pool, created):
+    pool = make_pool(ping_interval=0.05)
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    assert created[0].pings == 0
+
+    time.sleep(0.1)
+    with pool.connection():
+        pass
+
+    assert created[0].pings == 1
+
+
+def test_broken_connection_is_discarded(make_pool, created):
+    pool = make_pool()
+
+    with pytest.raises(pymysql.err.OperationalError):
+        with pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("BROKEN")
+
+    assert created[0].closed is True
+    assert pool.stats()["size"] == 0
+
+
+def test_tool_calls_run_concurrently(make_pool, created, monkeypatch):
+    monkeypatch.setattr(server, "db", make_pool(max_size=2))
+
+    async def scenario():
+        started = time.monotonic()
+        slow = asyncio.create_task(server.execute_query("SELECT SLEEP 0.5"))
+        await asyncio.sleep(0.05)
+        tables = await server.list_tables("app")
+        fast_elapsed = time.monotonic() - started
+        await slow
+        return tables, fast_elapsed
+
+    tables, fast_elapsed = asyncio.run(scenario())
+
+    assert tables[0]["table_name"] == ""
+    assert fast_elapsed < 0.4
+    assert len(created) == 2
+
+
+def test_released_connection_is_rolled_back(make_pool, created):
+    pool = make_pool()
+
+    with pool.connection():
+        pass
+
+    assert created[0].rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+@pytest.mark.parametrize(
+    "sql",
+    ["UPDATE t SET a = 1", "delete from t", "/* x */ INSERT INTO t VALUES (1)", "DROP TABLE t", "SET autocommit = 1"],
+)
+def test_write_statements_are_rejected(make_pool, created, monkeypatch, sql):
+    monkeypatch.setattr(server, "db", make_pool())
+
+    with pytest.raises(Exception, match="只允许执行只读查询"):
+        server._execute_query(sql)
+    with pytest.raises(Exception, match="只允许执行只读查询"):
+        server._open_query_cursor(sql)
+
+    assert created == []
+
+
+@pytest.mark.parametrize(
+    "sql",
+    ["SELECT 1", "  -- note\n(select 1)", "WITH t AS (SELECT 1) SELECT * FROM t", "SHOW TABLES", "desc t", "EXPLAIN SELECT 1"],
+)
+def test_read_statements_are_allowed(make_pool, monkeypatch, sql):
+    monkeypatch.setattr(server, "db", make_pool())
+
+    assert server._execute_query(sql)
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import server
+from test_pool import FakeConnection
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("MYSQL_DATABASE", "app")
+    created = []
+
+    def factory(**kwargs):
+        conn = FakeConnection(**kwargs)
+        created.append(conn)
+        return conn
+
+    pool = server.MySQLConnectionPool(max_size=2, wait_timeout=1, connect_factory=factory)
+    pool.created = created
+    monkeypatch.setattr(server, "db", pool)
+    monkeypatch.setattr(server, "_stream_cursors", {})
+    return pool
+
+
+def test_stream_pages_until_done_and_returns_connection(pool):
+    first = server._open_query_cursor("SELECT ROWS 5", chunk_size=2)
+    assert first["rows"] == [{"id": 0}, {"id": 1}]
+    assert first["done"] is False
+    assert pool.stats()["busy"] == 1
+
+    second = server._fetch_query_cursor(first["cursor_id"], chunk_size=2)
+    third = server._fetch_query_cursor(first["cursor_id"], chunk_size=2)
+
+    assert second["rows"] == [{"id": 2}, {"id": 3}]
+    assert third == {"cursor_id": None, "rows": [{"id": 4}], "done": True}
+    assert pool.stats() == {"max_size": 2, "size": 1, "idle": 1, "busy": 0}
+    assert pool.created[0].closed is False
+
+
+def test_small_result_finishes_in_first_page(pool):
+    page = server._open_query_cursor("SELECT ROWS 1", chunk_size=10)
+
+    assert page["done"] is True
+    assert page["cursor_id"] is None
+    assert server._stream_cursors == {}
+
+
+def test_close_abandons_connection(pool):
+    page = server._open_query_cursor("SELECT ROWS 10", chunk_size=2)
+
+    assert server._close_query_cursor(page["cursor_id"]) == {"closed": True}
+    assert server._close_query_cursor(page["cursor_id"]) == {"closed": False}
+    assert pool.created[0].closed is True
+    assert pool.stats()["size"] == 0
+    with pytest.raises(Exception, match="游标不存在"):
+        server._fetch_query_cursor(page["cursor_id"])
+
+
+def test_idle_cursors_expire(pool, monkeypatch):
+    page = server._open_query_cursor("SELECT ROWS 10", chunk_size=2)
+    monkeypatch.setattr(server, "STREAM_CURSOR_IDLE_TIMEOUT", 0)
+
+    server._expire_stream_cursors()
+
+    assert server._stream_cursors == {}
+    assert pool.stats()["size"] == 0
+    with pytest.raises(Exception, match="游标不存在"):
+        server._fetch_query_cursor(page["cursor_id"])
+
+
+def test_stream_tools_are_async(pool):
+    async def scenario():
+        page = await server.open_query_cursor("SELECT ROWS 3", chunk_size=2)
+        rest = await server.fetch_query_cursor(page["cursor_id"], chunk_size=2)
+        return page, rest
+
+    page, rest = asyncio.run(scenario())
+
+    assert len(page["rows"]) + len(rest["rows"]) == 3
+    assert rest["done"] is True
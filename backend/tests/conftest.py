@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.chat_stats import chat_stats_cache
+from app.services.config_service import config_service
+from app.services.conversation_memory import conversation_memory
+from app.utils.pagination import count_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_config_cache():
+    """配置缓存是进程级的，每个用例使用各自数据库时需清空"""
+    config_service.invalidate()
+    yield
+    config_service.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def reset_conversation_memory():
+    """对话记忆缓存按对话ID索引，用例之间的内存数据库会复用ID"""
+    conversation_memory.clear()
+    yield
+    conversation_memory.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_chat_stats_cache():
+    """统计缓存按用户ID索引，用例之间的内存数据库会复用ID"""
+    chat_stats_cache.clear()
+    yield
+    chat_stats_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_count_cache():
+    """分页总数缓存以 SQL 为键，用例之间的内存数据库会命中同样的查询"""
+    count_cache.clear()
+    yield
+    count_cache.clear()
@@ -0,0 +1,104 @@
+"""
+测试用的极简 MCP stdio Server：按行读取 JSON-RPC 请求并立即应答
+"""
+import json
+import os
+import sys
+import time
+
+
+def _reply(payload):
+    sys.stdout.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def _page(cursors, cursor_id, chunk_size):
+    rows = cursors[cursor_id]
+    page, rest = rows[:chunk_size], rows[chunk_size:]
+    done = len(page) < chunk_size
+    if done:
+        cursors.pop(cursor_id)
+    else:
+        cursors[cursor_id] = rest
+    return {"cursor_id": None if done else cursor_id, "rows": page, "done": done}
+
+
+def main():
+    # 流式查询游标：cursor_id -> 剩余行；open_query_cursor 的 sql 为 "ROWS n"
+    cursors = {}
+    calls = []
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        message = json.loads(line)
+        method = message.get("method")
+        request_id = message.get("id")
+        if request_id is None:
+            if method == "notifications/cancelled":
+                calls.append(f"cancelled:{message['params']['requestId']}")
+            continue
+        if method == "initialize":
+            _reply({"jsonrpc": "2.0", "id": request_id, "result": {"capabilities": {}}})
+        elif method == "ping":
+            _reply({"jsonrpc": "2.0", "id": request_id, "result": {}})
+        elif method == "tools/call":
+            name = message["params"]["name"]
+            arguments = message["params"].get("arguments") or {}
+            calls.append(name)
+            if name == "crash":
+                sys.exit(3)
+            if name == "sleep":
+                time.sleep(float(arguments.get("seconds", 1)))
+            if name == "fail":
+                _reply({
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": {"isError": True, "content": [{"type": "text", "text": "boom"}]},
+                })
+                continue
+            if name == "open_query_cursor":
+                cursor_id = str(len(calls))
+                total = int(arguments["sql"].split()[1])
+                cursors[cursor_id] = [{"id": i, "payload": "x" * 10} for i in range(total)]
+                structured = _page(cursors, cursor_id, arguments["chunk_size"])
+            elif name == "fetch_query_cursor":
+                structured = _page(cursors, arguments["cursor_id"], arguments["chunk_size"])
+            elif name == "close_query_cursor":
+                structured = {"closed": cursors.pop(arguments["cursor_id"], None) is not None}
+            elif name == "stream_state":
+                structured = {"open_cursors": len(cursors), "calls": calls}
+            elif name == "execute_query" and arguments.get("result_format") == "columnar":
+                structured = {"result": {
+                    "format": "columnar",
+                    "columns": ["tool", "amount", "created_at"],
+                    "types": ["str", "decimal", "datetime"],
+                    "data": [[name, name], ["1.50", None], ["2024-01-02T03:04:05", None]],
+                    "row_count": 2,
+                }}
+            else:
+                structured = None
+            if structured is not None:
+                _reply({
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": {"content": [], "structuredContent": structured, "isError": False},
+                })
+                continue
+            rows = [{
+                "pid": os.getpid(),
+                "tool": name,
+                "arguments": arguments,
+                "host": os.getenv("MYSQL_HOST"),
+            }]
+            _reply({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {"content": [], "structuredContent": {"result": rows}, "isError": False},
+            })
+        else:
+            _reply({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": method}})
+
+
+if __name__ == "__main__":
+    main()
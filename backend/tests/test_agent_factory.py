@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import agent_service
+from app.services.agent_service import AgentFactory, ChatAgent, CodeReviewAgent
+
+MODEL_CONFIG = {"api_key": "k", "base_url": "http://llm.local/v1", "model": "glm-4"}
+
+
+@pytest.fixture(autouse=True)
+def clear_agent_cache():
+    AgentFactory.clear_cache()
+    yield
+    AgentFactory.clear_cache()
+
+
+@pytest.fixture
+def compiled(monkeypatch):
+    calls = []
+
+    def fake_create_agent(**kwargs):
+        calls.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(agent_service, "create_agent", fake_create_agent)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_same_mode_and_config_reuses_compiled_agent(compiled):
+    first = await AgentFactory.create_agent("normal", MODEL_CONFIG)
+    second = await AgentFactory.create_agent("normal", dict(MODEL_CONFIG))
+
+    assert first is second
+    assert isinstance(first, ChatAgent)
+    assert len(compiled) == 1
+    assert compiled[0]["debug"] is False
+    assert [tool.__name__ for tool in compiled[0]["tools"]] == list(ChatAgent.TOOL_NAMES)
+
+
+@pytest.mark.asyncio
+async def test_config_and_prompt_changes_build_new_agent(compiled):
+    base = await AgentFactory.create_agent("code_review", MODEL_CONFIG)
+    other_model = await AgentFactory.create_agent("code_review", {**MODEL_CONFIG, "model": "glm-4-plus"})
+    custom_prompt = await AgentFactory.create_agent("code_review", MODEL_CONFIG, system_prompt="custom")
+    again = await AgentFactory.create_agent("code_review", MODEL_CONFIG)
+
+    assert isinstance(base, CodeReviewAgent)
+    assert len({id(base), id(other_model), id(custom_prompt)}) == 3
+    assert again is base
+    assert len(compiled) == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(compiled, monkeypatch):
+    monkeypatch.setattr(agent_service.settings, "AGENT_CACHE_SIZE", 2)
+
+    a = await AgentFactory.create_agent("normal", {**MODEL_CONFIG, "model": "a"})
+    await AgentFactory.create_agent("normal", {**MODEL_CONFIG, "model": "b"})
+    assert await AgentFactory.create_agent("normal", {**MODEL_CONFIG, "model": "a"}) is a
+    await AgentFactory.create_agent("normal", {**MODEL_CONFIG, "model": "c"})
+    await AgentFactory.create_agent("normal", {**MODEL_CONFIG, "model": "b"})
+
+    assert len(compiled) == 4
+    assert len(AgentFactory._cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="不支持的Agent模式"):
+        await AgentFactory.create_agent("unknown", MODEL_CONFIG)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import chat as chat_api
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services.agent_scheduler import AgentRunScheduler, SchedulerBusy
+from app.services.message_writer import MessageWriter
+
+
+@pytest.mark.asyncio
+async def test_global_and_per_user_caps():
+    scheduler = AgentRunScheduler(max_concurrent=3, max_per_user=2, max_queue=10)
+
+    a1, a2, a3 = (scheduler.submit("a") for _ in range(3))
+    b1 = scheduler.submit("b")
+    c1 = scheduler.submit("c")
+
+    assert [a1.granted, a2.granted, a3.granted, b1.granted, c1.granted] == [True, True, False, True, False]
+    assert scheduler.stats()["running"] == 3
+    assert scheduler.stats()["queue_depth"] == 2
+
+    scheduler.release(a1)
+    # a3 先入队，但 a 仍有 1 个运行中；全局名额按轮转先给 a，之后轮到 c
+    assert a3.granted and not c1.granted
+    scheduler.release(b1)
+    assert c1.granted
+
+
+@pytest.mark.asyncio
+async def test_round_robin_across_users():
+    scheduler = AgentRunScheduler(max_concurrent=1, max_per_user=1, max_queue=10)
+    running = scheduler.submit("busy")
+    heavy = [scheduler.submit("heavy") for _ in range(3)]
+    light = scheduler.submit("light")
+
+    assert scheduler.position(heavy[0]) == 1
+    assert scheduler.position(light) == 2
+    assert scheduler.position(heavy[2]) == 4
+
+    order = []
+    current = running
+    for _ in range(4):
+        scheduler.release(current)
+        current = next(ticket for ticket in heavy + [light] if ticket.granted and not ticket.released)
+        order.append("light" if current is light else f"heavy{heavy.index(current)}")
+
+    assert order == ["heavy0", "light", "heavy1", "heavy2"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_position():
+    scheduler = AgentRunScheduler(max_concurrent=1, max_per_user=1, max_queue=1)
+    scheduler.submit("a")
+    scheduler.submit("b")
+
+    with pytest.raises(SchedulerBusy) as exc_info:
+        scheduler.submit("c")
+
+    assert exc_info.value.queue_depth == 1
+    assert exc_info.value.position == 2
+    assert scheduler.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out_and_leaves_queue():
+    scheduler = AgentRunScheduler(max_concurrent=1, max_per_user=1, max_queue=5)
+    running = scheduler.submit("a")
+    waiting = scheduler.submit("b")
+
+    with pytest.raises(SchedulerBusy, match="超时"):
+        await scheduler.wait(waiting, timeout=0.05)
+
+    scheduler.release(running)
+    stats = scheduler.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["running"] == 0
+    assert stats["timed_out"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_is_woken_on_release_and_wait_time_recorded():
+    scheduler = AgentRunScheduler(max_concurrent=1, max_per_user=1, max_queue=5)
+    running = scheduler.submit("a")
+    waiting = scheduler.submit("b")
+    asyncio.get_running_loop().call_later(0.05, scheduler.release, running)
+
+    await scheduler.wait(waiting, timeout=1)
+
+    assert waiting.granted
+    assert scheduler.stats()["wait"]["max_ms"] >= 40
+
+
+@pytest.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(chat_api, "message_writer", MessageWriter(session_factory=factory))
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_queues_then_rejects_with_429(session_factory, monkeypatch):
+    scheduler = AgentRunScheduler(max_concurrent=1, max_per_user=1, max_queue=1)
+    monkeypatch.setattr(chat_api, "agent_scheduler", scheduler)
+    release_first = asyncio.Event()
+
+    class SlowAgent:
+        async def stream(self, message, history=None):
+            if message == "first":
+                await release_first.wait()
+            yield {"type": "chunk", "content": f"re:{message}"}
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return SlowAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async def start(message):
+        async with session_factory() as db:
+            user = await db.get(User, 1)
+            return await chat_api.chat_stream(
+                chat_api.ChatRequest(message=message, mode="normal"), current_user=user, db=db
+            )
+
+    async def read(response):
+        return [json.loads(raw.removeprefix("data: ")) async for raw in response.body_iterator]
+
+    first = asyncio.create_task(read(await start("first")))
+    second = asyncio.create_task(read(await start("second")))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await start("third")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.detail["position"] == 2
+    assert exc_info.value.headers["Retry-After"]
+    async with session_factory() as db:
+        titles = (await db.execute(select(Conversation.title))).scalars().all()
+    # 被拒绝的请求不留下空对话
+    assert sorted(titles) == ["first", "second"]
+
+    release_first.set()
+    first_events, second_events = await asyncio.gather(first, second)
+
+    assert first_events[-1]["type"] == "done"
+    assert second_events[1] == {"type": "queued", "position": 1}
+    assert second_events[2] == {"type": "chunk", "content": "re:second"}
+    assert scheduler.stats()["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_disconnect_while_queued_saves_cancelled_reply(session_factory, monkeypatch):
+    scheduler = AgentRunScheduler(max_concurrent=1, max_per_user=1, max_queue=1)
+    monkeypatch.setattr(chat_api, "agent_scheduler", scheduler)
+
+    class FakeAgent:
+        async def stream(self, message, history=None):
+            yield {"type": "chunk", "content": "re"}
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return FakeAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+    running = scheduler.submit(1)
+    queued = asyncio.Event()
+
+    async def read():
+        async with session_factory() as db:
+            user = await db.get(User, 1)
+            response = await chat_api.chat_stream(
+                chat_api.ChatRequest(message="排队中", mode="normal"), current_user=user, db=db
+            )
+        async for raw in response.body_iterator:
+            if json.loads(raw.removeprefix("data: "))["type"] == "queued":
+                queued.set()
+
+    task = asyncio.create_task(read())
+    await asyncio.wait_for(queued.wait(), 1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    scheduler.release(running)
+    await chat_api.message_writer.flush()
+
+    async with session_factory() as db:
+        rows = (await db.execute(select(Message.role, Message.content).order_by(Message.id))).all()
+    assert [tuple(row) for row in rows] == [("user", "排队中"), ("assistant", "（已取消）")]
+    assert scheduler.stats()["running"] == 0
@@ -0,0 +1,146 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import chat as chat_api
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services import chat_stats
+from app.services.chat_stats import ChatStatsCache, compute_chat_stats
+from app.services.message_writer import MessageWriter
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session_factory(engine):
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        db.add(User(id=2, username="u2", password_hash="x", role="user"))
+        for conv_id, (user_id, mode, messages) in enumerate(
+            [(1, "normal", 3), (1, "normal", 1), (1, "data_analysis", 2), (2, "code_review", 5)], start=1
+        ):
+            db.add(Conversation(id=conv_id, user_id=user_id, title="t", mode=mode))
+            for _ in range(messages):
+                db.add(Message(conversation_id=conv_id, role="user", content="q"))
+        await db.commit()
+    return factory
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_aggregates_match_row_counts(session_factory):
+    async with session_factory() as db:
+        stats = await compute_chat_stats(db, 1)
+
+    assert stats == {
+        "total_conversations": 3,
+        "total_messages": 6,
+        "conversations_by_mode": {"normal": 2, "data_analysis": 1, "code_review": 0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_queries_until_invalidated(engine, session_factory):
+    cache = ChatStatsCache(ttl=60)
+    statements = count_statements(engine)
+
+    async with session_factory() as db:
+        first = await cache.get(db, 1)
+        queries = len(statements)
+        first["total_messages"] = -1
+        second = await cache.get(db, 1)
+        assert len(statements) == queries
+
+        db.add(Message(conversation_id=1, role="assistant", content="a"))
+        await db.commit()
+        cache.invalidate(1)
+        third = await cache.get(db, 1)
+
+    assert queries == 2
+    assert second["total_messages"] == 6
+    assert third["total_messages"] == 7
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_zero_ttl_disables_cache(engine, session_factory):
+    cache = ChatStatsCache(ttl=0)
+    statements = count_statements(engine)
+
+    async with session_factory() as db:
+        await cache.get(db, 1)
+        await cache.get(db, 1)
+
+    assert len(statements) == 4
+    assert cache.stats() == {"users": 0, "hits": 0, "misses": 2, "hit_ratio": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_compute_is_not_overwritten(session_factory, monkeypatch):
+    cache = ChatStatsCache(ttl=60)
+    original = chat_stats.compute_chat_stats
+
+    async def racing_compute(db, user_id):
+        result = await original(db, user_id)
+        # 计算期间写入了新消息
+        cache.invalidate(user_id)
+        return result
+
+    monkeypatch.setattr(chat_stats, "compute_chat_stats", racing_compute)
+    async with session_factory() as db:
+        await cache.get(db, 1)
+
+    assert cache.stats()["users"] == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_invalidates_stats(session_factory, monkeypatch):
+    monkeypatch.setattr(chat_api, "message_writer", MessageWriter(session_factory=session_factory))
+
+    class FakeAgent:
+        async def stream(self, message, history=None):
+            yield {"type": "chunk", "content": "re"}
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return FakeAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        before = await chat_api.get_chat_stats(current_user=user, db=db)
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        response = await chat_api.chat_stream(
+            chat_api.ChatRequest(message="hi", mode="code_review"), current_user=user, db=db
+        )
+        async for _ in response.body_iterator:
+            pass
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        after = await chat_api.get_chat_stats(current_user=user, db=db)
+
+    assert before["total_messages"] == 6
+    assert after["total_messages"] == 8
+    assert after["conversations_by_mode"]["code_review"] == 1
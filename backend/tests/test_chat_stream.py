@@ -0,0 +1,236 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import chat as chat_api
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services.agent_scheduler import AgentRunScheduler
+from app.services.agent_service import AgentService
+from app.services.message_writer import MessageWriter
+
+
+@pytest.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(chat_api, "message_writer", MessageWriter(session_factory=factory))
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+class FakeGraph:
+    def __init__(self, events):
+        self.events = events
+
+    async def astream_events(self, inputs, version):
+        assert version == "v2"
+        for event in self.events:
+            yield event
+
+
+def make_agent(events):
+    agent = AgentService.__new__(AgentService)
+    agent.agent_graph = FakeGraph(events)
+    return agent
+
+
+async def read_events(response):
+    events = []
+    async for raw in response.body_iterator:
+        events.append(json.loads(raw.removeprefix("data: ").strip()))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_agent_stream_maps_graph_events():
+    agent = make_agent([
+        {"event": "on_chat_model_stream", "run_id": "m1", "data": {"chunk": SimpleNamespace(content="")}},
+        {"event": "on_tool_start", "name": "list_tables", "run_id": "t1", "data": {"input": {"database": "app"}}},
+        {"event": "on_tool_end", "name": "list_tables", "run_id": "t1", "data": {"output": SimpleNamespace(content="x" * 600)}},
+        {"event": "on_chat_model_stream", "run_id": "m2", "data": {"chunk": SimpleNamespace(content="共")}},
+        {"event": "on_chat_model_stream", "run_id": "m2", "data": {"chunk": SimpleNamespace(content=[{"type": "text", "text": "3张表"}])}},
+        {"event": "on_chat_model_end", "run_id": "m2", "data": {"output": SimpleNamespace(content="共3张表")}},
+        {"event": "on_chat_model_end", "run_id": "m3", "data": {"output": SimpleNamespace(content="补发")}},
+    ])
+
+    events = [event async for event in agent.stream("有几张表")]
+
+    assert [event["type"] for event in events] == ["tool_start", "tool_end", "chunk", "chunk", "chunk"]
+    assert events[0]["input"] == '{"database": "app"}'
+    assert events[1]["output"].endswith("…") and len(events[1]["output"]) == 501
+    assert [event["content"] for event in events[2:]] == ["共", "3张表", "补发"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_sends_tokens_and_persists_reply(session_factory, monkeypatch):
+    agent = make_agent([
+        {"event": "on_tool_start", "name": "browse_web", "run_id": "t1", "data": {"input": {"query_or_url": "q"}}},
+        {"event": "on_tool_end", "name": "browse_web", "run_id": "t1", "data": {"output": "page"}},
+        {"event": "on_chat_model_stream", "run_id": "m1", "data": {"chunk": SimpleNamespace(content="你")}},
+        {"event": "on_chat_model_stream", "run_id": "m1", "data": {"chunk": SimpleNamespace(content="好")}},
+    ])
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return agent, message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        response = await chat_api.chat_stream(
+            chat_api.ChatRequest(message="hi", mode="normal"), current_user=user, db=db
+        )
+        events = await read_events(response)
+
+    assert [event["type"] for event in events] == [
+        "conversation_id", "tool_start", "tool_end", "chunk", "chunk", "done",
+    ]
+    async with session_factory() as db:
+        rows = (await db.execute(select(Message).order_by(Message.id))).scalars().all()
+    assert [(row.role, row.content) for row in rows] == [("user", "hi"), ("assistant", "你好")]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_reports_agent_error(session_factory, monkeypatch):
+    class BrokenAgent:
+        async def stream(self, message, history=None):
+            yield {"type": "chunk", "content": "部分"}
+            raise RuntimeError("llm down")
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return BrokenAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        response = await chat_api.chat_stream(
+            chat_api.ChatRequest(message="hi", mode="normal"), current_user=user, db=db
+        )
+        events = await read_events(response)
+
+    assert [event["type"] for event in events] == ["conversation_id", "chunk", "error", "done"]
+    async with session_factory() as db:
+        reply = (await db.execute(select(Message).where(Message.role == "assistant"))).scalar_one()
+    assert reply.content == "部分\n\n处理失败: llm down"
+
+@pytest.mark.asyncio
+async def test_parallel_chats_do_not_hold_db_during_agent_run(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}", connect_args={"timeout": 1})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    writer = MessageWriter(session_factory=factory)
+    monkeypatch.setattr(chat_api, "message_writer", writer)
+    monkeypatch.setattr(chat_api, "agent_scheduler", AgentRunScheduler(max_concurrent=10, max_per_user=10))
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        await db.commit()
+
+    checked_out = []
+    all_running = asyncio.Barrier(10)
+
+    class SlowAgent:
+        async def stream(self, message, history=None):
+            # 10 个 Agent 同时运行时，数据库连接应全部归还
+            await asyncio.wait_for(all_running.wait(), 5)
+            # 用户消息由写入队列在短事务中批量提交，提交后不再占用连接
+            await writer.flush()
+            checked_out.append(engine.pool.checkedout())
+            await asyncio.sleep(0.3)
+            yield {"type": "chunk", "content": f"re:{message}"}
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        # 与真实的 @ 提及解析一样在请求会话上读库
+        await db.execute(select(User.id))
+        return SlowAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async def one_chat(index):
+        # 模拟 get_db：每个请求一个会话，认证依赖已在其上查询过用户
+        async with factory() as db:
+            user = await db.get(User, 1)
+            response = await chat_api.chat_stream(
+                chat_api.ChatRequest(message=f"m{index}", mode="normal"), current_user=user, db=db
+            )
+            return await read_events(response)
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(one_chat(index) for index in range(10)))
+    elapsed = time.monotonic() - started
+
+    assert all(events[-1]["type"] == "done" for events in results)
+    assert elapsed < 1.5
+    assert max(checked_out) == 0
+    async with factory() as db:
+        replies = (await db.execute(select(Message.content).where(Message.role == "assistant"))).scalars().all()
+    assert sorted(replies) == sorted(f"re:m{index}" for index in range(10))
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_agent_run(session_factory, monkeypatch):
+    monkeypatch.setattr(chat_api.settings, "CHAT_DISCONNECT_POLL_INTERVAL", 0.05)
+    cancelled = asyncio.Event()
+
+    class LongAgent:
+        async def stream(self, message, history=None):
+            yield {"type": "chunk", "content": "部分"}
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            yield {"type": "chunk", "content": "不应发送"}
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return LongAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    class FakeRequest:
+        def __init__(self):
+            self.disconnected = False
+
+        async def is_disconnected(self):
+            return self.disconnected
+
+    request = FakeRequest()
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        response = await chat_api.chat_stream(
+            chat_api.ChatRequest(message="hi", mode="normal"), current_user=user, db=db, request=request
+        )
+
+    events = []
+    started = time.monotonic()
+    async for raw in response.body_iterator:
+        events.append(json.loads(raw.removeprefix("data: ").strip()))
+        if events[-1]["type"] == "chunk":
+            request.disconnected = True
+
+    assert time.monotonic() - started < 2
+    assert cancelled.is_set()
+    assert [event["type"] for event in events] == ["conversation_id", "chunk"]
+    assert chat_api.agent_scheduler.stats()["running"] == 0
+    async with session_factory() as db:
+        reply = (await db.execute(select(Message).where(Message.role == "assistant"))).scalar_one()
+    assert reply.content == "部分\n\n（已取消）"
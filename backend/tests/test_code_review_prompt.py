@@ -1,11 +1,23 @@
-from app.utils.code_review_prompt import render_code_review_prompt
+from app.utils.code_review_prompt import render_code_review_message, render_code_review_prompt
 
 
-def test_render_code_review_prompt_includes_diff_and_notice():
+def test_render_code_review_prompt_excludes_diff():
+    prompt = render_code_review_prompt()
+
+    assert "get_commit_diff" in prompt
+    assert "{{DIFF}}" not in prompt
+
+
+def test_render_code_review_message_includes_diff_and_notice():
     diff = "diff --git a/a.py b/a.py\n+print('hi')"
     notice = "diff过长，已截断"
 
-    prompt = render_code_review_prompt(diff, notice)
+    message = render_code_review_message("请审查", diff, notice)
+
+    assert message.startswith("请审查")
+    assert diff in message
+    assert notice in message
+
 
-    assert diff in prompt
-    assert notice in prompt
+def test_render_code_review_message_without_diff():
+    assert "(未提供diff内容)" in render_code_review_message("请审查", None)
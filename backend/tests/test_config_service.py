@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import chat as chat_api
+from app.models.config import Config
+from app.models.database import Base
+from app.services.config_service import ConfigService
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[Config.__table__])
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        db.add(Config(key="model_config", value=json.dumps({"model": "glm-4"})))
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_values_are_cached_after_first_read(session_factory):
+    service = ConfigService(ttl=0, session_factory=session_factory)
+
+    first = await service.get("model_config")
+    first["model"] = "mutated"
+    second = await service.get("model_config")
+    missing = await service.get("mysql_config")
+    await service.get("mysql_config")
+
+    assert second == {"model": "glm-4"}
+    assert missing is None
+    assert service.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_update_bumps_version_without_query(session_factory):
+    service = ConfigService(ttl=0, session_factory=session_factory)
+    await service.get("model_config")
+
+    version = service.update("model_config", {"model": "glm-4-plus"})
+
+    assert version == service.version == 1
+    assert await service.get("model_config") == {"model": "glm-4-plus"}
+    assert service.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_and_ttl_force_reload(session_factory, monkeypatch):
+    service = ConfigService(ttl=10, session_factory=session_factory)
+    await service.get("model_config")
+
+    service.invalidate("model_config")
+    await service.get("model_config")
+    clock = [0.0]
+    monkeypatch.setattr("app.services.config_service.time.monotonic", lambda: clock[0])
+    service._entries["model_config"] = (0.0, {"model": "stale"})
+    clock[0] = 11.0
+    value = await service.get("model_config")
+
+    assert value == {"model": "glm-4"}
+    assert service.loads == 3
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_is_not_cached(session_factory):
+    async with session_factory() as db:
+        db.add(Config(key="gitlab_config", value="{bad"))
+        await db.commit()
+    service = ConfigService(ttl=0, session_factory=session_factory)
+
+    for _ in range(2):
+        with pytest.raises(json.JSONDecodeError):
+            await service.get("gitlab_config")
+
+    assert service.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_process_message_reads_model_config_from_cache(session_factory, monkeypatch):
+    service = ConfigService(ttl=0, session_factory=session_factory)
+    monkeypatch.setattr(chat_api, "config_service", service)
+    seen = []
+
+    class FakeAgent:
+        async def query(self, message):
+            return "ok"
+
+    async def fake_create_agent(mode, model_config, system_prompt=None):
+        seen.append(model_config)
+        return FakeAgent()
+
+    monkeypatch.setattr(chat_api.AgentFactory, "create_agent", fake_create_agent)
+
+    async with session_factory() as db:
+        for _ in range(3):
+            assert await chat_api.process_message("hi", "chat", db) == "ok"
+
+    assert seen == [{"model": "glm-4"}] * 3
+    assert service.loads == 1
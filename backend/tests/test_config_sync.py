@@ -41,13 +41,14 @@ class StubMySQLClient:
             {"database": "app_db"},
         ]
 
-    async def list_tables(self, database, _config):
-        if database == "app_db":
-            return [
-                {"table_name": "users", "table_type": "BASE TABLE", "table_comment": ""},
-                {"table_name": "orders", "table_type": "BASE TABLE", "table_comment": ""},
+    async def get_catalog(self, databases, _config):
+        tables = []
+        if "app_db" in databases:
+            tables = [
+                {"table_schema": "app_db", "table_name": "users", "table_type": "BASE TABLE", "table_comment": ""},
+                {"table_schema": "app_db", "table_name": "orders", "table_type": "BASE TABLE", "table_comment": ""},
             ]
-        return []
+        return {"tables": tables, "columns": [], "indexes": []}
 
 
 class StubSession:
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import conversations as conversations_api
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session_factory(engine):
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    base = datetime(2024, 1, 1)
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        db.add(User(id=2, username="u2", password_hash="x", role="user"))
+        for index in range(25):
+            # 每 5 个对话共用同一个 updated_at，验证游标按 id 区分
+            db.add(
+                Conversation(
+                    id=index + 1,
+                    user_id=1,
+                    title=f"c{index}",
+                    mode="normal",
+                    updated_at=base + timedelta(minutes=index // 5),
+                )
+            )
+            for _ in range(index % 3):
+                db.add(Message(conversation_id=index + 1, role="user", content="q"))
+        db.add(Conversation(id=100, user_id=2, title="other", mode="normal", updated_at=base))
+        await db.commit()
+    return factory
+
+
+async def list_page(session_factory, **kwargs):
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        kwargs.setdefault("skip", 0)
+        kwargs.setdefault("limit", 10)
+        kwargs.setdefault("cursor", None)
+        return await conversations_api.list_conversations(current_user=user, db=db, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_message_counts_come_from_one_grouped_query(engine, session_factory):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        page = await list_page(session_factory, limit=20)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert page["total"] == 25
+    counts = {item["id"]: item["message_count"] for item in page["items"]}
+    assert counts == {conv_id: (conv_id - 1) % 3 for conv_id in counts}
+    # 用户、总数、列表、消息数各一条，与页大小无关
+    assert len([sql for sql in statements if "messages" in sql]) == 1
+    assert len(statements) == 4
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_walk_all_conversations_in_order(session_factory):
+    first = await list_page(session_factory)
+    seen = [item["id"] for item in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = await list_page(session_factory, cursor=cursor, skip=999)
+        assert page["total"] is None
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+
+    assert seen == list(range(25, 0, -1))
+
+
+@pytest.mark.asyncio
+async def test_offset_mode_still_supported(session_factory):
+    page = await list_page(session_factory, skip=20, limit=10)
+
+    assert [item["id"] for item in page["items"]] == [5, 4, 3, 2, 1]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(session_factory):
+    with pytest.raises(HTTPException) as exc:
+        await list_page(session_factory, cursor="not-a-cursor")
+
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_listing_queries_use_composite_indexes(engine, session_factory):
+    async with engine.connect() as conn:
+        conversations_plan = (
+            await conn.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT * FROM conversations WHERE user_id = 1 "
+                    "ORDER BY updated_at DESC, id DESC LIMIT 10"
+                )
+            )
+        ).all()
+        messages_plan = (
+            await conn.execute(
+                text("EXPLAIN QUERY PLAN SELECT * FROM messages WHERE conversation_id = 1 ORDER BY created_at")
+            )
+        ).all()
+
+    assert "ix_conversations_user_updated" in str(conversations_plan)
+    assert "TEMP B-TREE" not in str(conversations_plan)
+    assert "ix_messages_conversation_created" in str(messages_plan)
@@ -0,0 +1,191 @@
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import chat as chat_api
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services.conversation_memory import ConversationMemory, estimate_tokens
+from app.services.message_writer import MessageWriter
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session_factory(engine):
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        db.add(Conversation(id=1, user_id=1, title="t", mode="normal"))
+        await db.commit()
+    return factory
+
+
+def count_selects(engine, statements):
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+
+
+async def add_messages(factory, contents):
+    async with factory() as db:
+        for index, content in enumerate(contents):
+            db.add(Message(conversation_id=1, role="user" if index % 2 == 0 else "assistant", content=content))
+        await db.commit()
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("你好世界") == 4
+
+
+@pytest.mark.asyncio
+async def test_history_keeps_recent_turns_within_budget(session_factory):
+    await add_messages(session_factory, ["a" * 40, "b" * 40, "c" * 40, "d" * 40])
+    memory = ConversationMemory(max_tokens=25, max_messages=10, session_factory=session_factory)
+
+    history = await memory.history(1)
+
+    assert history == [
+        {"role": "user", "content": "c" * 40},
+        {"role": "assistant", "content": "d" * 40},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_history_served_from_cache_after_first_load(engine, session_factory):
+    await add_messages(session_factory, ["q1", "a1"])
+    memory = ConversationMemory(max_tokens=100, max_messages=10, session_factory=session_factory)
+    await memory.history(1)
+
+    statements = []
+    count_selects(engine, statements)
+    memory.append(1, 3, "user", "q2")
+    history = await memory.history(1)
+
+    assert [item["content"] for item in history] == ["q1", "a1", "q2"]
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_compact_folds_old_turns_into_persisted_summary(session_factory):
+    await add_messages(session_factory, ["a" * 40, "b" * 40, "c" * 40, "d" * 40])
+    memory = ConversationMemory(max_tokens=25, max_messages=10, session_factory=session_factory)
+    await memory.history(1)
+    calls = []
+
+    async def summarizer(previous, messages):
+        calls.append((previous, [item["content"][0] for item in messages]))
+        return "摘要1"
+
+    assert await memory.compact(1, summarizer) is True
+    assert await memory.compact(1, summarizer) is False
+    assert calls == [(None, ["a", "b", "c"])]
+
+    restarted = ConversationMemory(max_tokens=25, max_messages=10, session_factory=session_factory)
+    history = await restarted.history(1)
+    assert history == [
+        {"role": "system", "content": "此前对话摘要：\n摘要1"},
+        {"role": "assistant", "content": "d" * 40},
+    ]
+    async with session_factory() as db:
+        conversation = await db.get(Conversation, 1)
+    assert conversation.summary_message_id == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_keeps_turns(session_factory):
+    await add_messages(session_factory, ["a" * 40, "b" * 40])
+    memory = ConversationMemory(max_tokens=15, max_messages=10, session_factory=session_factory)
+    await memory.history(1)
+
+    async def broken(previous, messages):
+        raise RuntimeError("llm down")
+
+    assert await memory.compact(1, broken) is False
+    assert len(memory._states[1].turns) == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_sends_history_and_appends_reply(engine, session_factory, monkeypatch):
+    await add_messages(session_factory, ["之前的问题", "之前的回答"])
+    memory = ConversationMemory(max_tokens=100, max_messages=10, session_factory=session_factory)
+    monkeypatch.setattr(chat_api, "conversation_memory", memory)
+    monkeypatch.setattr(chat_api, "message_writer", MessageWriter(session_factory=session_factory))
+    received = []
+
+    class FakeAgent:
+        async def stream(self, message, history=None):
+            received.append(list(history))
+            yield {"type": "chunk", "content": f"re:{message}"}
+
+        async def summarize(self, previous, messages):
+            return "摘要"
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return FakeAgent(), message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async def send(message):
+        async with session_factory() as db:
+            user = await db.get(User, 1)
+            response = await chat_api.chat_stream(
+                chat_api.ChatRequest(message=message, mode="normal", conversation_id=1), current_user=user, db=db
+            )
+            return [raw async for raw in response.body_iterator]
+
+    await send("q1")
+    statements = []
+    count_selects(engine, statements)
+    await send("q2")
+
+    assert [item["content"] for item in received[0]] == ["之前的问题", "之前的回答"]
+    assert [item["content"] for item in received[1]] == ["之前的问题", "之前的回答", "q1", "re:q1"]
+    assert not any("FROM messages" in statement for statement in statements)
+
+
+
+@pytest.mark.asyncio
+async def test_save_turn_failure_retrieves_both_results(session_factory, monkeypatch):
+    memory = ConversationMemory(max_tokens=100, max_messages=10, session_factory=session_factory)
+    await memory.history(1)
+    monkeypatch.setattr(chat_api, "conversation_memory", memory)
+
+    def broken_factory():
+        raise RuntimeError("db down")
+
+    writer = MessageWriter(session_factory=broken_factory)
+    monkeypatch.setattr(chat_api, "message_writer", writer)
+    futures = []
+    add_message = writer.add_message
+
+    def recording_add(*args):
+        futures.append(add_message(*args))
+        return futures[-1]
+
+    monkeypatch.setattr(writer, "add_message", recording_add)
+
+    await chat_api._save_turn(1, writer.add_message(1, "user", "问题"), "问题", "回答")
+
+    assert 1 not in memory._states
+    assert len(futures) == 2
+    # 两条写入的异常都已被获取，不会出现 "Future exception was never retrieved"
+    assert all(future.done() and not future._log_traceback for future in futures)
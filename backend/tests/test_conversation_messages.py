@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import conversations as conversations_api
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    base = datetime(2024, 1, 1)
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        db.add(User(id=2, username="u2", password_hash="x", role="user"))
+        db.add(Conversation(id=1, user_id=1, title="t", mode="data_analysis"))
+        for index in range(12):
+            db.add(
+                Message(
+                    id=index + 1,
+                    conversation_id=1,
+                    role="user" if index % 2 == 0 else "assistant",
+                    # 两条消息共用同一时间，验证游标按 id 区分
+                    content=f"m{index}" + ("|" * 1000 if index == 11 else ""),
+                    created_at=base + timedelta(seconds=index // 2),
+                )
+            )
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+async def call(session_factory, func, user_id=1, **kwargs):
+    async with session_factory() as db:
+        user = await db.get(User, user_id)
+        return await func(current_user=user, db=db, **kwargs)
+
+
+async def messages_page(session_factory, **kwargs):
+    kwargs.setdefault("limit", 5)
+    kwargs.setdefault("cursor", None)
+    kwargs.setdefault("preview_chars", None)
+    return await call(session_factory, conversations_api.get_conversation_messages, conversation_id=1, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_latest_page_first_then_older_pages(session_factory):
+    pages = []
+    cursor = None
+    while True:
+        page = await messages_page(session_factory, cursor=cursor)
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert pages == [[8, 9, 10, 11, 12], [3, 4, 5, 6, 7], [1, 2]]
+
+
+@pytest.mark.asyncio
+async def test_preview_truncates_and_full_message_is_fetched_on_demand(session_factory):
+    page = await messages_page(session_factory, limit=2, preview_chars=10)
+    last = page["items"][-1]
+
+    assert last["content"] == "m11" + "|" * 7
+    assert last["truncated"] is True
+    assert last["content_length"] == 1003
+    assert page["items"][0]["truncated"] is False
+
+    full = await call(
+        session_factory, conversations_api.get_conversation_message, conversation_id=1, message_id=last["id"]
+    )
+    assert full["content"] == "m11" + "|" * 1000
+    assert full["truncated"] is False
+
+
+@pytest.mark.asyncio
+async def test_other_users_cannot_read_messages(session_factory):
+    with pytest.raises(HTTPException) as listing:
+        await call(
+            session_factory,
+            conversations_api.get_conversation_messages,
+            user_id=2,
+            conversation_id=1,
+            limit=5,
+            cursor=None,
+            preview_chars=None,
+        )
+    with pytest.raises(HTTPException) as single:
+        await call(session_factory, conversations_api.get_conversation_message, user_id=2, conversation_id=1, message_id=1)
+
+    assert listing.value.status_code == single.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_invalid_message_cursor_is_rejected(session_factory):
+    with pytest.raises(HTTPException) as exc:
+        await messages_page(session_factory, cursor="bad")
+
+    assert exc.value.status_code == 400
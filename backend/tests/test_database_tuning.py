@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.models.database import create_engine
+from app.services.db_maintenance import run_maintenance
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'app.db'}"
+    write_engine = create_engine(url)
+    read_engine = create_engine(url, read_only=True)
+    yield write_engine, read_engine
+    await write_engine.dispose()
+    await read_engine.dispose()
+
+
+async def pragma(engine, name):
+    async with engine.connect() as conn:
+        return (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_connections_apply_tuning_pragmas(engines):
+    write_engine, _ = engines
+
+    assert await pragma(write_engine, "journal_mode") == "wal"
+    assert await pragma(write_engine, "synchronous") == 1
+    assert await pragma(write_engine, "busy_timeout") == 30000
+    assert await pragma(write_engine, "cache_size") == -65536
+    assert await pragma(write_engine, "auto_vacuum") == 2
+
+
+@pytest.mark.asyncio
+async def test_read_engine_rejects_writes(engines):
+    write_engine, read_engine = engines
+    async with write_engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        await conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    async with read_engine.connect() as conn:
+        assert (await conn.execute(text("SELECT count(*) FROM t"))).scalar() == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            await conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+@pytest.mark.asyncio
+async def test_maintenance_analyzes_then_optimizes_and_vacuums(engines):
+    write_engine, _ = engines
+    async with write_engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, body TEXT)"))
+        await conn.execute(text("CREATE INDEX ix_t_body ON t (body)"))
+        for index in range(200):
+            await conn.execute(text("INSERT INTO t (body) VALUES (:body)"), {"body": "x" * 2000 + str(index)})
+    async with write_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM t"))
+
+    first = await run_maintenance(write_engine)
+    second = await run_maintenance(write_engine)
+
+    assert first["analyzed"] is True
+    assert first["vacuumed_pages"] > 0
+    assert first["checkpoint"]["busy"] == 0
+    assert second["optimized"] is True
+    assert await pragma(write_engine, "freelist_count") == 0
+
+
+@pytest.mark.asyncio
+async def test_maintenance_respects_vacuum_batch_size(engines):
+    write_engine, _ = engines
+    async with write_engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, body TEXT)"))
+        for index in range(100):
+            await conn.execute(text("INSERT INTO t (body) VALUES (:body)"), {"body": "x" * 4000})
+    async with write_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM t"))
+
+    report = await run_maintenance(write_engine, vacuum_pages=10)
+
+    assert report["vacuumed_pages"] == 10
+    assert await pragma(write_engine, "freelist_count") > 0
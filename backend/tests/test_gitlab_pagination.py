@@ -7,6 +7,7 @@ from app.models.gitlab_user import GitLabUser
 from app.models.gitlab_project import GitLabProject
 from app.models.gitlab_branch import GitLabBranch
 from app.models.gitlab_commit import GitLabCommit
+from app.api import gitlab_manage
 from app.api.gitlab_manage import (
     list_gitlab_users,
     list_gitlab_projects,
@@ -94,6 +95,7 @@ async def test_list_gitlab_users_paginates(async_session):
         include_disabled=True,
         page=2,
         page_size=10,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -114,6 +116,7 @@ async def test_list_gitlab_projects_paginates(async_session):
         include_disabled=True,
         page=2,
         page_size=5,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -135,6 +138,7 @@ async def test_list_gitlab_users_filters_by_name(async_session):
         page=1,
         page_size=10,
         name="User 03",
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -152,6 +156,7 @@ async def test_list_gitlab_projects_filters_by_name(async_session):
         page=1,
         page_size=10,
         name="group/project-04",
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -169,6 +174,7 @@ async def test_list_gitlab_branches_paginates(async_session):
         refresh=False,
         page=3,
         page_size=10,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -192,6 +198,7 @@ async def test_list_gitlab_commits_paginates(async_session):
         limit=50,
         page=1,
         page_size=10,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -201,3 +208,36 @@ async def test_list_gitlab_commits_paginates(async_session):
     assert result["page_size"] == 10
     # created_at desc: latest is 25
     assert result["items"][0]["commit_sha"] == "commit-25"
+
+
+@pytest.mark.asyncio
+async def test_list_gitlab_commits_cursor_pages(async_session, monkeypatch):
+    await seed_gitlab_commits(async_session, count=25)
+
+    async def fake_config(db):
+        return {"url": "https://gitlab.example.com", "token": "t"}
+
+    monkeypatch.setattr(gitlab_manage, "_load_gitlab_config", fake_config)
+
+    titles, cursor, pages = [], None, 0
+    while True:
+        result = await list_gitlab_commits(
+            project_id=1,
+            branch="main",
+            refresh=False,
+            limit=50,
+            page=1,
+            page_size=10,
+            cursor=cursor,
+            db=async_session,
+            current_user=None,
+        )
+        assert result["total"] == 25
+        titles.extend(item["title"] for item in result["items"])
+        pages += 1
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert titles == [f"Commit {idx:02d}" for idx in range(25, 0, -1)]
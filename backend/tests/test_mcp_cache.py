@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.models.database import Base
+from app.models.mcp_cache import MCPCacheEntry
+from app.services.mcp_cache import MCPResultCache
+from app.services.mcp_mysql import MCPMySQLClient
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cache.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[MCPCacheEntry.__table__])
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def make_loader(calls, value):
+    async def loader():
+        calls.append(1)
+        return value
+
+    return loader
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_after_first_call(session_factory):
+    cache = MCPResultCache(ttls={"list_tables": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+
+    first = await cache.get_or_call("mysql", "list_tables", {"database": "db1"}, "fp", make_loader(calls, [1]))
+    second = await cache.get_or_call("mysql", "list_tables", {"database": "db1"}, "fp", make_loader(calls, [2]))
+
+    assert first == second == [1]
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_persistent_tier_survives_memory_loss(session_factory):
+    cache = MCPResultCache(ttls={"describe_table": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+    await cache.get_or_call("mysql", "describe_table", {"table_name": "t"}, "fp", make_loader(calls, [{"Field": "id"}]))
+
+    restarted = MCPResultCache(ttls={"describe_table": 60}, enabled=True, session_factory=session_factory)
+    value = await restarted.get_or_call(
+        "mysql", "describe_table", {"table_name": "t"}, "fp", make_loader(calls, [])
+    )
+
+    assert value == [{"Field": "id"}]
+    assert len(calls) == 1
+    assert restarted.stats()["persistent_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_key_includes_arguments_and_config(session_factory):
+    cache = MCPResultCache(ttls={"list_tables": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+
+    await cache.get_or_call("mysql", "list_tables", {"database": "a"}, "fp1", make_loader(calls, ["a"]))
+    other_db = await cache.get_or_call("mysql", "list_tables", {"database": "b"}, "fp1", make_loader(calls, ["b"]))
+    other_config = await cache.get_or_call("mysql", "list_tables", {"database": "a"}, "fp2", make_loader(calls, ["c"]))
+
+    assert other_db == ["b"]
+    assert other_config == ["c"]
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_uncached_tool_always_calls_loader(session_factory):
+    cache = MCPResultCache(ttls={"list_tables": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+
+    await cache.get_or_call("mysql", "execute_query", {"sql": "SELECT 1"}, "fp", make_loader(calls, []))
+    await cache.get_or_call("mysql", "execute_query", {"sql": "SELECT 1"}, "fp", make_loader(calls, []))
+
+    assert len(calls) == 2
+    assert cache.stats()["tools"] == {}
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_reloaded_and_purged(session_factory):
+    cache = MCPResultCache(ttls={"list_tables": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+    await cache.get_or_call("mysql", "list_tables", {}, "fp", make_loader(calls, ["old"]))
+    cache.clear_memory()
+    async with session_factory() as db:
+        await db.execute(update(MCPCacheEntry).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+
+    assert await cache.purge_expired() == 1
+    value = await cache.get_or_call("mysql", "list_tables", {}, "fp", make_loader(calls, ["new"]))
+
+    assert value == ["new"]
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_by_namespace_and_tool(session_factory):
+    cache = MCPResultCache(
+        ttls={"list_tables": 60, "list_projects": 60},
+        enabled=True,
+        session_factory=session_factory,
+    )
+    calls = []
+    await cache.get_or_call("mysql", "list_tables", {}, "fp", make_loader(calls, ["t"]))
+    await cache.get_or_call("gitlab", "list_projects", {}, "fp", make_loader(calls, ["p"]))
+
+    await cache.invalidate("mysql", ["list_tables"])
+    cache_after_restart = MCPResultCache(
+        ttls={"list_tables": 60, "list_projects": 60},
+        enabled=True,
+        session_factory=session_factory,
+    )
+
+    assert await cache.get_or_call("mysql", "list_tables", {}, "fp", make_loader(calls, ["t2"])) == ["t2"]
+    assert await cache.get_or_call("gitlab", "list_projects", {}, "fp", make_loader(calls, [])) == ["p"]
+    assert await cache_after_restart.get_or_call(
+        "gitlab", "list_projects", {}, "fp", make_loader(calls, [])
+    ) == ["p"]
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_caller_mutation_does_not_corrupt_memory_tier(session_factory):
+    cache = MCPResultCache(ttls={"describe_table": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+
+    first = await cache.get_or_call("mysql", "describe_table", {}, "fp", make_loader(calls, [{"Field": "id"}]))
+    first.append({"Field": "extra"})
+    second = await cache.get_or_call("mysql", "describe_table", {}, "fp", make_loader(calls, []))
+    second[0]["Field"] = "changed"
+    third = await cache.get_or_call("mysql", "describe_table", {}, "fp", make_loader(calls, []))
+
+    assert third == [{"Field": "id"}]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_discards_stale_result(session_factory):
+    cache = MCPResultCache(ttls={"list_tables": 60}, enabled=True, session_factory=session_factory)
+    calls = []
+
+    async def racing_loader():
+        calls.append(1)
+        # 加载期间元数据同步触发了失效
+        await cache.invalidate("mysql", ["list_tables"])
+        return ["old"]
+
+    assert await cache.get_or_call("mysql", "list_tables", {}, "fp", racing_loader) == ["old"]
+    value = await cache.get_or_call("mysql", "list_tables", {}, "fp", make_loader(calls, ["new"]))
+
+    assert value == ["new"]
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_client_routes_metadata_tools_through_cache(session_factory, monkeypatch):
+    cache = MCPResultCache(ttls={"describe_table": 60}, enabled=True, session_factory=session_factory)
+    client = MCPMySQLClient(cache=cache)
+    calls = []
+
+    async def fake_uncached(name, arguments, env):
+        calls.append(name)
+        return [{"Field": "id"}]
+
+    monkeypatch.setattr(client, "_call_tool_uncached", fake_uncached)
+
+    await client.describe_table("orders", "db1", mysql_config={"host": "h1"})
+    await client.describe_table("orders", "db1", mysql_config={"host": "h1"})
+    await client.describe_table("orders", "db1", mysql_config={"host": "h2"})
+
+    assert calls == ["describe_table", "describe_table"]
@@ -0,0 +1,69 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.services.mcp_columnar import ColumnarRows, is_columnar
+from app.services.mcp_mysql import MCPMySQLClient
+
+PAYLOAD = {
+    "format": "columnar",
+    "columns": ["id", "amount", "created_at", "day", "name"],
+    "types": ["int", "decimal", "datetime", "date", "str"],
+    "data": [
+        [1, 2, 3],
+        ["12.50", None, "bad"],
+        ["2024-01-02T03:04:05", None, None],
+        ["2024-01-02", None, None],
+        ["a", "b", "c"],
+    ],
+    "row_count": 3,
+}
+
+
+def test_rows_are_decoded_on_access():
+    rows = ColumnarRows(PAYLOAD)
+
+    assert len(rows) == 3
+    assert rows[0] == {
+        "id": 1,
+        "amount": Decimal("12.50"),
+        "created_at": datetime(2024, 1, 2, 3, 4, 5),
+        "day": date(2024, 1, 2),
+        "name": "a",
+    }
+    assert rows[-1]["amount"] == "bad"
+    assert [row["id"] for row in rows[1:]] == [2, 3]
+    with pytest.raises(IndexError):
+        rows[3]
+
+
+def test_column_access_and_list_equality():
+    rows = ColumnarRows(PAYLOAD)
+
+    assert rows.column("name") == ["a", "b", "c"]
+    assert rows.column("amount")[0] == Decimal("12.50")
+    assert ColumnarRows({"format": "columnar", "columns": ["x"], "data": [[1]]}) == [{"x": 1}]
+
+
+def test_empty_result_is_falsy():
+    rows = ColumnarRows({"format": "columnar", "columns": ["id"], "types": ["int"], "data": [[]], "row_count": 0})
+
+    assert not rows
+    assert list(rows) == []
+
+
+@pytest.mark.parametrize(
+    "structured",
+    [{"result": PAYLOAD}, PAYLOAD],
+)
+def test_parse_tool_result_decodes_columnar(structured):
+    result = MCPMySQLClient()._parse_tool_result({"result": {"structuredContent": structured}})
+
+    assert isinstance(result, ColumnarRows)
+    assert result[1]["name"] == "b"
+
+
+def test_is_columnar():
+    assert is_columnar(PAYLOAD)
+    assert not is_columnar([{"format": "columnar"}])
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import mcp_gitlab
+from app.services.mcp_cache import MCPResultCache
+from app.services.mcp_gitlab import MCPGitLabClient
+
+
+class FakeGitlab:
+    auth_calls = []
+    threads = set()
+
+    def __init__(self, url, private_token, api_version, timeout):
+        self.url = url
+        self.token = private_token
+        self.projects = SimpleNamespace(get=self._get_project)
+
+    def auth(self):
+        FakeGitlab.auth_calls.append((self.url, self.token))
+
+    def _get_project(self, project_id):
+        FakeGitlab.threads.add(threading.current_thread().name)
+        branch = SimpleNamespace(
+            name=f"main-{project_id}",
+            commit={"id": f"sha-{project_id}", "committed_date": "2024-01-01"},
+        )
+        branches = SimpleNamespace(list=lambda **kwargs: [branch] if kwargs.get("page") == 1 else [])
+        return SimpleNamespace(branches=branches)
+
+
+@pytest.fixture
+def fake_gitlab(monkeypatch):
+    server = mcp_gitlab._load_inprocess_server()
+    FakeGitlab.auth_calls = []
+    FakeGitlab.threads = set()
+    monkeypatch.setattr(server.gitlab, "Gitlab", FakeGitlab)
+    monkeypatch.setattr(server, "_gl_cache", {})
+    return server
+
+
+def test_inprocess_list_branches_reuses_authenticated_client(fake_gitlab):
+    client = MCPGitLabClient(mode="inprocess", cache=MCPResultCache(enabled=False))
+    config = {"url": "https://gitlab.example.com", "token": "t1"}
+
+    async def scenario():
+        return await asyncio.gather(*(client.list_branches(config, project_id) for project_id in (1, 2, 3)))
+
+    results = asyncio.run(scenario())
+
+    assert [items[0]["name"] for items in results] == ["main-1", "main-2", "main-3"]
+    assert results[0][0]["commit_sha"] == "sha-1"
+    assert FakeGitlab.auth_calls == [("https://gitlab.example.com", "t1")]
+    assert all(name.startswith("gitlab-mcp") for name in FakeGitlab.threads)
+
+
+def test_inprocess_authenticates_once_per_url_and_token(fake_gitlab):
+    client = MCPGitLabClient(mode="inprocess", cache=MCPResultCache(enabled=False))
+
+    async def scenario():
+        await client.list_branches({"url": "https://a.example.com", "token": "t1"}, 1)
+        await client.list_branches({"url": "https://a.example.com", "token": "t2"}, 1)
+        await client.list_branches({"url": "https://a.example.com", "token": "t1"}, 2)
+
+    asyncio.run(scenario())
+
+    assert FakeGitlab.auth_calls == [
+        ("https://a.example.com", "t1"),
+        ("https://a.example.com", "t2"),
+    ]
+
+
+def test_inprocess_rejects_unknown_tool():
+    client = MCPGitLabClient(mode="inprocess", cache=MCPResultCache(enabled=False))
+
+    with pytest.raises(Exception, match="Unknown GitLab tool"):
+        asyncio.run(client._call_tool("use_config", {}))
+
+
+def test_inprocess_tool_stops_paging_after_deadline(fake_gitlab):
+    pages = []
+
+    def list_page(page, per_page):
+        pages.append(page)
+        return [SimpleNamespace(name=f"b{page}-{i}", commit={}) for i in range(per_page)]
+
+    project = SimpleNamespace(branches=SimpleNamespace(list=list_page))
+    gl = SimpleNamespace(projects=SimpleNamespace(get=lambda project_id: project))
+    fake_gitlab._gl_cache[("https://gitlab.example.com", "t1")] = gl
+    config = {
+        "GITLAB_URL": "https://gitlab.example.com",
+        "GITLAB_TOKEN": "t1",
+        fake_gitlab.DEADLINE_KEY: "0",
+    }
+
+    with pytest.raises(fake_gitlab.DeadlineExceeded):
+        mcp_gitlab._run_inprocess_tool("list_branches", {"project_id": 1}, config)
+    assert pages == []
+
+
+def test_timed_out_workers_are_counted_until_they_finish(fake_gitlab, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(mcp_gitlab.settings, "GITLAB_MCP_TIMEOUT", 0.05)
+    monkeypatch.setattr(mcp_gitlab.settings, "GITLAB_MCP_INPROCESS_WORKERS", 1)
+    monkeypatch.setattr(mcp_gitlab, "_inprocess_executor", None)
+    monkeypatch.setattr(mcp_gitlab, "_run_inprocess_tool", lambda name, arguments, env: release.wait(5))
+    client = MCPGitLabClient(mode="inprocess", cache=MCPResultCache(enabled=False))
+    config = {"url": "https://gitlab.example.com", "token": "t1"}
+
+    with pytest.raises(Exception, match="timeout"):
+        asyncio.run(client.list_branches(config, 1))
+    assert mcp_gitlab.inprocess_stats() == {"workers": 1, "timed_out_running": 1}
+
+    with pytest.raises(Exception, match="timed-out calls"):
+        asyncio.run(client.list_branches(config, 2))
+
+    release.set()
+    mcp_gitlab._inprocess_executor.shutdown(wait=True)
+    assert mcp_gitlab.inprocess_stats()["timed_out_running"] == 0
@@ -1,166 +1,335 @@
 """
 MCP MySQL服务单元测试
 """
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
 import pytest
-import subprocess
-from unittest.mock import patch, MagicMock
+from pathlib import Path
+from unittest.mock import patch
+from app.services.mcp_cache import MCPResultCache
+from app.services.mcp_columnar import ColumnarRows
 from app.services.mcp_mysql import MCPMySQLClient
+from app.services.mcp_session import MCPSessionPool, MCPSessionError
+
+
+FAKE_SERVER_PATH = str(Path(__file__).resolve().parent / "fake_mcp_server.py")
+
+
+@pytest.fixture
+def pool():
+    """基于假 MCP Server 的会话池"""
+    return MCPSessionPool(FAKE_SERVER_PATH, name="fake", max_size=2, call_timeout=10, supports_cancel=True)
 
 
 @pytest.fixture
-def mcp_client():
-    """创建MCP MySQL客户端实例"""
-    return MCPMySQLClient()
+def mcp_client(pool):
+    """创建MCP MySQL客户端实例（关闭结果缓存，每次调用都经过子进程）"""
+    return MCPMySQLClient(pool=pool, cache=MCPResultCache(enabled=False))
 
 
 class TestMCPMySQLClient:
-    """MCP MySQL客户端测试类"""
-    
-    @patch('subprocess.Popen')
-    def test_execute_query_success(self, mock_popen, mcp_client):
+    """MCP MySQL客户端测试类（会话与事件循环绑定，每个用例在单个事件循环内完成）"""
+
+    def test_execute_query_success(self, mcp_client, pool):
         """测试成功执行查询"""
-        # 模拟subprocess.Popen返回值
-        mock_process = MagicMock()
-        mock_process.returncode = 0
-        mock_process.communicate.return_value = (
-            '{"result": [{"id": 1, "name": "test"}]}',
-            ""
-        )
-        
-        mock_popen.return_value = mock_process
-        
-        # 同步方式测试
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(
-                mcp_client.execute_query("SELECT * FROM test_table")
-            )
-            
-            # 验证结果
-            assert result == [{"id": 1, "name": "test"}]
-            mock_process.stdin.write.assert_called_once()
-        finally:
-            loop.close()
-    
-    @patch('subprocess.Popen')
-    def test_execute_query_error(self, mock_popen, mcp_client):
-        """测试查询失败"""
-        # 模拟subprocess.Popen返回值（错误情况）
-        mock_process = MagicMock()
-        mock_process.returncode = 1
-        mock_process.communicate.return_value = (
-            "",
-            "SQL syntax error"
-        )
-        
-        mock_popen.return_value = mock_process
-        
-        # 同步方式测试
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            with pytest.raises(Exception) as exc_info:
-                loop.run_until_complete(
-                    mcp_client.execute_query("INVALID SQL")
-                )
-            
-            assert "MCP Server Error" in str(exc_info.value)
-        finally:
-            loop.close()
-    
-    @patch('subprocess.Popen')
-    def test_execute_query_timeout(self, mock_popen, mcp_client):
-        """测试查询超时"""
-        # 模拟超时情况
-        mock_process = MagicMock()
-        mock_process.communicate.side_effect = subprocess.TimeoutExpired("test", 60)
-        mock_process.kill = MagicMock()
-        
-        mock_popen.return_value = mock_process
-        
-        # 同步方式测试
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            with pytest.raises(Exception) as exc_info:
-                loop.run_until_complete(
-                    mcp_client.execute_query("SELECT * FROM test_table")
-                )
-            
-            assert "Query timeout" in str(exc_info.value)
-            mock_process.kill.assert_called_once()
-        finally:
-            loop.close()
-    
-    @patch('subprocess.Popen')
-    def test_execute_query_json_error(self, mock_popen, mcp_client):
-        """测试JSON解析错误"""
-        # 模拟无效的JSON响应
-        mock_process = MagicMock()
-        mock_process.returncode = 0
-        mock_process.communicate.return_value = ("invalid json", "")
-        
-        mock_popen.return_value = mock_process
-        
-        # 同步方式测试
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            with pytest.raises(Exception) as exc_info:
-                loop.run_until_complete(
-                    mcp_client.execute_query("SELECT * FROM test_table")
+        async def scenario():
+            try:
+                return await mcp_client.execute_query("SELECT 1", mysql_config={"host": "h1"})
+            finally:
+                await pool.close_all()
+
+        result = asyncio.run(scenario())
+
+        assert result[0]["tool"] == "execute_query"
+        assert result[0]["arguments"] == {"sql": "SELECT 1"}
+        assert result[0]["host"] == "h1"
+
+    def test_execute_query_columnar(self, mcp_client, pool):
+        """测试列式编码结果按行懒解码为字典"""
+        async def scenario():
+            try:
+                return await mcp_client.execute_query("SELECT 1", columnar=True)
+            finally:
+                await pool.close_all()
+
+        result = asyncio.run(scenario())
+
+        assert isinstance(result, ColumnarRows)
+        assert len(result) == 2
+        assert result[0] == {
+            "tool": "execute_query",
+            "amount": Decimal("1.50"),
+            "created_at": datetime(2024, 1, 2, 3, 4, 5),
+        }
+        assert result[1]["amount"] is None
+
+    def test_execute_query_tool_error(self, mcp_client, pool):
+        """测试工具返回错误时会话仍可复用"""
+        async def scenario():
+            try:
+                with pytest.raises(Exception) as exc_info:
+                    await mcp_client._call_tool("fail", {}, mysql_config={"host": "h1"})
+                assert "boom" in str(exc_info.value)
+                assert pool.stats()["idle"] == 1
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_calls_reuse_same_process(self, mcp_client, pool):
+        """测试相同配置的多次调用复用同一个子进程"""
+        async def scenario():
+            try:
+                first = await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h1"})
+                second = await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h1"})
+                assert first[0]["pid"] == second[0]["pid"]
+                assert pool.stats() == {"max_size": 2, "busy": 0, "idle": 1, "configs": 1}
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_different_config_uses_separate_process(self, mcp_client, pool):
+        """测试不同配置使用不同的子进程"""
+        async def scenario():
+            try:
+                first = await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h1"})
+                second = await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h2"})
+                assert first[0]["pid"] != second[0]["pid"]
+                assert second[0]["host"] == "h2"
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_pool_evicts_lru_when_full(self, mcp_client, pool):
+        """测试超过上限时回收最久未使用的会话"""
+        async def scenario():
+            try:
+                for host in ("h1", "h2", "h3"):
+                    await mcp_client._call_tool("list_tables", {}, mysql_config={"host": host})
+                assert pool.stats()["idle"] == 2
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_crashed_session_is_replaced(self, mcp_client, pool):
+        """测试进程退出后会话被丢弃并在下次调用时重建"""
+        async def scenario():
+            try:
+                first = await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h1"})
+                with pytest.raises(MCPSessionError):
+                    await mcp_client._call_tool("crash", {}, mysql_config={"host": "h1"})
+                assert pool.stats()["idle"] == 0
+
+                second = await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h1"})
+                assert first[0]["pid"] != second[0]["pid"]
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_idle_sessions_are_evicted(self, mcp_client, pool):
+        """测试空闲超时的会话被回收"""
+        async def scenario():
+            try:
+                await mcp_client._call_tool("list_tables", {}, mysql_config={"host": "h1"})
+                pool.idle_timeout = 0
+                assert await pool.evict_idle() == 1
+                assert pool.stats()["idle"] == 0
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_slow_call_does_not_block_event_loop(self, mcp_client, pool):
+        """测试等待慢查询期间事件循环仍可调度其他协程"""
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.05)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            try:
+                await mcp_client._call_tool("sleep", {"seconds": 0.6}, mysql_config={"host": "h1"})
+            finally:
+                task.cancel()
+                await pool.close_all()
+            return ticks
+
+        assert asyncio.run(scenario()) >= 5
+
+    def test_call_deadline_discards_session(self, pool):
+        """测试超过截止时间时抛出会话错误并丢弃会话"""
+        async def scenario():
+            try:
+                started = time.monotonic()
+                with pytest.raises(MCPSessionError):
+                    await pool.call_tool({"MYSQL_HOST": "h1"}, "sleep", {"seconds": 5}, timeout=0.3)
+                assert time.monotonic() - started < 3
+                assert pool.stats()["idle"] == 0
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_cancelled_call_notifies_server_and_keeps_session(self, pool):
+        """测试取消调用时通知服务端中止请求，会话继续复用"""
+        async def scenario():
+            try:
+                async with pool.session({"MYSQL_HOST": "h1"}) as session:
+                    process = session.process
+                task = asyncio.create_task(
+                    pool.call_tool({"MYSQL_HOST": "h1"}, "sleep", {"seconds": 0.5})
                 )
-            
-            assert "Failed to parse response" in str(exc_info.value)
-        finally:
-            loop.close()
-    
-    @patch('subprocess.Popen')
-    def test_execute_query_query_error(self, mock_popen, mcp_client):
-        """测试SQL查询错误"""
-        # 模拟MCP返回查询错误
-        mock_process = MagicMock()
-        mock_process.returncode = 0
-        mock_process.communicate.return_value = (
-            '{"error": "Table does not exist"}',
-            ""
-        )
-        
-        mock_popen.return_value = mock_process
-        
-        # 同步方式测试
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            with pytest.raises(Exception) as exc_info:
-                loop.run_until_complete(
-                    mcp_client.execute_query("SELECT * FROM nonexistent_table")
+                await asyncio.sleep(0.2)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                assert pool.stats() == {"max_size": 2, "busy": 0, "idle": 1, "configs": 1}
+
+                async with pool.session({"MYSQL_HOST": "h1"}) as session:
+                    assert session.process is process
+                    response = await session.call_tool("stream_state", {}, timeout=5)
+                calls = response["result"]["structuredContent"]["calls"]
+                assert any(call.startswith("cancelled:") for call in calls)
+                assert process.returncode is None
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_cancelled_call_discards_session_without_cancel_support(self):
+        """测试服务端不处理取消通知时，被取消的会话不归还复用"""
+        pool = MCPSessionPool(FAKE_SERVER_PATH, name="fake", max_size=2, call_timeout=10)
+
+        async def scenario():
+            try:
+                task = asyncio.create_task(
+                    pool.call_tool({"MYSQL_HOST": "h1"}, "sleep", {"seconds": 0.5})
                 )
-            
-            assert "Query Error" in str(exc_info.value)
-        finally:
-            loop.close()
-    
-    def test_client_initialization(self, mcp_client):
+                await asyncio.sleep(0.2)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                assert pool.stats() == {"max_size": 2, "busy": 0, "idle": 0, "configs": 0}
+            finally:
+                await pool.close_all()
+
+        asyncio.run(scenario())
+
+    def test_client_initialization(self):
         """测试客户端初始化"""
-        # 验证初始化
-        assert mcp_client.server_path == "/home/yuanwu/mysql-mcp-server/server.py"
-        assert "MYSQL_HOST" in mcp_client.env
-        assert "MYSQL_PORT" in mcp_client.env
-        assert "MYSQL_USER" in mcp_client.env
-        assert "MYSQL_PASSWORD" in mcp_client.env
-        assert "MYSQL_DATABASE" in mcp_client.env
+        client = MCPMySQLClient()
+        assert client.server_path.endswith("mysql-mcp-server/server.py")
+        env = client._build_env({"host": "h", "port": 3307})
+        assert env["MYSQL_HOST"] == "h"
+        assert env["MYSQL_PORT"] == "3307"
+
+
+class TestMCPMySQLStreamQuery:
+    """流式查询测试"""
+
+    def _run(self, pool, scenario):
+        async def wrapper():
+            try:
+                return await scenario()
+            finally:
+                await pool.close_all()
+
+        return asyncio.run(wrapper())
+
+    def test_stream_reads_all_pages(self, mcp_client, pool):
+        async def scenario():
+            async with mcp_client.stream_query("ROWS 7", chunk_size=3, max_rows=100) as stream:
+                rows = [row async for row in stream]
+            state = await mcp_client._call_tool("stream_state", {})
+            return rows, stream, state
+
+        rows, stream, state = self._run(pool, scenario)
+
+        assert [row["id"] for row in rows] == list(range(7))
+        assert stream.truncated is False
+        assert stream.row_count == 7
+        assert state["open_cursors"] == 0
+        assert state["calls"].count("fetch_query_cursor") == 2
+
+    def test_stream_stops_at_row_ceiling_and_closes_cursor(self, mcp_client, pool):
+        async def scenario():
+            async with mcp_client.stream_query("ROWS 1000", chunk_size=50, max_rows=5) as stream:
+                rows = [row async for row in stream]
+            state = await mcp_client._call_tool("stream_state", {})
+            return rows, stream, state
+
+        rows, stream, state = self._run(pool, scenario)
+
+        assert len(rows) == 5
+        assert stream.truncated is True
+        assert state["open_cursors"] == 0
+        # 只多取一行用于判断截断，不会按 chunk_size 拉取
+        assert "fetch_query_cursor" not in state["calls"]
+
+    def test_stream_stops_at_byte_ceiling(self, mcp_client, pool):
+        async def scenario():
+            async with mcp_client.stream_query("ROWS 100", chunk_size=10, max_rows=0, max_bytes=100) as stream:
+                rows = [row async for row in stream]
+            return rows, stream
+
+        rows, stream = self._run(pool, scenario)
+
+        assert 0 < len(rows) < 100
+        assert stream.byte_count <= 100
+        assert stream.truncated is True
+
+    def test_stream_closes_cursor_when_consumer_breaks(self, mcp_client, pool):
+        async def scenario():
+            async with mcp_client.stream_query("ROWS 100", chunk_size=10, max_rows=0) as stream:
+                async for row in stream:
+                    if row["id"] == 2:
+                        break
+            return await mcp_client._call_tool("stream_state", {})
+
+        state = self._run(pool, scenario)
+
+        assert state["open_cursors"] == 0
+        assert state["calls"][-2] == "close_query_cursor"
+
+    def test_stream_closes_cursor_when_cancelled(self, mcp_client, pool):
+        async def scenario():
+            reading = asyncio.Event()
+
+            async def consume():
+                async with mcp_client.stream_query("ROWS 100", chunk_size=10, max_rows=0) as stream:
+                    async for _ in stream:
+                        reading.set()
+                        await asyncio.sleep(10)
+
+            task = asyncio.create_task(consume())
+            await reading.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await mcp_client._call_tool("stream_state", {})
+
+        state = self._run(pool, scenario)
+
+        assert state["open_cursors"] == 0
+        assert "close_query_cursor" in state["calls"]
+
+    def test_stream_requires_context_manager(self, mcp_client, pool):
+        async def scenario():
+            async for _ in mcp_client.stream_query("ROWS 1"):
+                pass
+
+        with pytest.raises(RuntimeError):
+            self._run(pool, scenario)
 
 
 class TestMCPMySQLClientWithMockExecute:
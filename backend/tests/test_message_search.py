@@ -0,0 +1,138 @@
+import pytest
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api import conversations as conversations_api
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services.message_search import (
+    build_match_query,
+    ensure_message_search,
+    rebuild_message_search,
+    search_messages,
+)
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session_factory(engine):
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        db.add(User(id=2, username="u2", password_hash="x", role="user"))
+        db.add(Conversation(id=1, user_id=1, title="订单分析", mode="data_analysis"))
+        db.add(Conversation(id=2, user_id=1, title="代码审查", mode="code_review"))
+        db.add(Conversation(id=3, user_id=2, title="别人的", mode="data_analysis"))
+        await db.commit()
+    async with engine.begin() as conn:
+        await ensure_message_search(conn)
+    return factory
+
+
+async def add(session_factory, conversation_id, content, role="assistant"):
+    async with session_factory() as db:
+        message = Message(conversation_id=conversation_id, role=role, content=content)
+        db.add(message)
+        await db.commit()
+        return message.id
+
+
+@pytest.mark.asyncio
+async def test_inserted_messages_are_searchable_and_ranked(session_factory):
+    await add(session_factory, 1, "上个月的订单金额汇总：退款订单占比 3%，退款订单集中在华东")
+    await add(session_factory, 2, "这次提交修改了订单服务的日志格式")
+    await add(session_factory, 3, "别人的退款订单统计")
+
+    async with session_factory() as db:
+        hits = await search_messages(db, 1, "退款订单")
+        both = await search_messages(db, 1, "订单 日志格式")
+        by_mode = await search_messages(db, 1, "订单服务", mode="data_analysis")
+
+    assert [hit.conversation_id for hit in hits] == [1]
+    assert "**退款订单**" in hits[0].snippet
+    assert hits[0].conversation_title == "订单分析"
+    assert [hit.conversation_id for hit in both] == [2]
+    assert by_mode == []
+
+
+@pytest.mark.asyncio
+async def test_deleted_messages_leave_the_index(session_factory):
+    message_id = await add(session_factory, 1, "需要删除的慢查询分析")
+    async with session_factory() as db:
+        await db.execute(delete(Message).where(Message.id == message_id))
+        await db.commit()
+        assert await search_messages(db, 1, "慢查询") == []
+
+
+@pytest.mark.asyncio
+async def test_short_terms_fall_back_to_user_scoped_scan(session_factory):
+    await add(session_factory, 1, "按地区统计销量，华东最高")
+    await add(session_factory, 3, "华东")
+
+    async with session_factory() as db:
+        hits = await search_messages(db, 1, "华东")
+
+    assert [hit.conversation_id for hit in hits] == [1]
+    assert "**华东**" in hits[0].snippet
+
+
+@pytest.mark.asyncio
+async def test_user_input_is_not_parsed_as_fts_syntax(session_factory):
+    await add(session_factory, 1, 'SELECT * FROM orders WHERE note="AND(x)"')
+
+    async with session_factory() as db:
+        hits = await search_messages(db, 1, 'orders note="AND(x)"')
+
+    assert build_match_query(['"x"']) == 'content : ("""x""")'
+    assert len(hits) == 1
+
+
+@pytest.mark.asyncio
+async def test_existing_messages_are_indexed_on_first_setup_and_rebuild(engine, session_factory):
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE messages_fts"))
+        await conn.execute(text("DROP TRIGGER messages_fts_insert"))
+    await add(session_factory, 1, "升级前写入的消息")
+
+    async with engine.begin() as conn:
+        assert await ensure_message_search(conn) is True
+        assert await ensure_message_search(conn) is False
+    async with session_factory() as db:
+        assert len(await search_messages(db, 1, "升级前")) == 1
+
+    async with engine.begin() as conn:
+        await rebuild_message_search(conn)
+        indexed = (await conn.execute(text("SELECT count(*) FROM messages_fts"))).scalar()
+    async with session_factory() as db:
+        total = (await db.execute(select(func.count(Message.id)))).scalar()
+    assert indexed == total
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_returns_snippets(session_factory):
+    await add(session_factory, 2, "建议给 user_id 字段加索引")
+
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        results = await conversations_api.search_conversations(
+            q="字段加索引", mode=None, limit=20, current_user=user, db=db
+        )
+
+    assert results[0]["conversation_id"] == 2
+    assert results[0]["snippet"] == "建议给 user_id **字段加索引**"
+    assert results[0]["created_at"]
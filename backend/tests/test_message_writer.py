@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.models.conversation import Conversation
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services.message_writer import MessageWriter
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        for conversation_id in (1, 2):
+            db.add(
+                Conversation(
+                    id=conversation_id,
+                    user_id=1,
+                    title="t",
+                    mode="normal",
+                    updated_at=datetime(2024, 1, 1),
+                )
+            )
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+async def count_messages(session_factory, conversation_id):
+    async with session_factory() as db:
+        return (
+            await db.execute(select(func.count(Message.id)).where(Message.conversation_id == conversation_id))
+        ).scalar()
+
+
+@pytest.mark.asyncio
+async def test_queued_messages_commit_in_one_batch(session_factory):
+    writer = MessageWriter(session_factory=session_factory)
+
+    futures = [writer.add_message(1 + index % 2, "user", f"m{index}") for index in range(20)]
+    ids = await asyncio.gather(*futures)
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 20
+    stats = writer.stats()
+    assert stats["batches"] == 1
+    assert stats["messages"] == 20
+    assert await count_messages(session_factory, 1) == 10
+
+
+@pytest.mark.asyncio
+async def test_batch_size_is_capped(session_factory):
+    writer = MessageWriter(session_factory=session_factory, max_batch=3)
+
+    await asyncio.gather(*(writer.add_message(1, "user", f"m{index}") for index in range(7)))
+
+    assert writer.stats()["batches"] == 3
+    assert writer.stats()["max_batch_seen"] == 3
+
+
+@pytest.mark.asyncio
+async def test_write_touches_conversation_updated_at(session_factory):
+    writer = MessageWriter(session_factory=session_factory)
+
+    await writer.add_message(2, "assistant", "回答")
+
+    async with session_factory() as db:
+        touched = await db.get(Conversation, 2)
+        untouched = await db.get(Conversation, 1)
+    assert touched.updated_at > datetime(2024, 1, 1)
+    assert untouched.updated_at == datetime(2024, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_gives_read_your_writes(session_factory):
+    writer = MessageWriter(session_factory=session_factory)
+    writer.add_message(1, "user", "问题")
+    writer.add_message(1, "assistant", "回答")
+
+    await writer.wait_for(1)
+
+    assert await count_messages(session_factory, 1) == 2
+    # 没有排队写入的对话立即返回
+    await asyncio.wait_for(writer.wait_for(2), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_close_drains_queue(session_factory):
+    writer = MessageWriter(session_factory=session_factory)
+    future = writer.add_message(1, "user", "问题")
+
+    await writer.close()
+
+    assert future.done()
+    assert await count_messages(session_factory, 1) == 1
+    # 关闭后再写入会重新启动写入任务
+    assert await writer.add_message(1, "user", "再问") > future.result()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_once(session_factory):
+    calls = []
+
+    def flaky_factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+        return session_factory()
+
+    writer = MessageWriter(session_factory=flaky_factory)
+
+    assert await writer.add_message(1, "user", "问题") > 0
+    assert writer.stats()["retries"] == 1
+    assert writer.stats()["failures"] == 0
+    assert await count_messages(session_factory, 1) == 1
+
+
+@pytest.mark.asyncio
+async def test_bad_message_fails_alone_and_writer_keeps_running(session_factory):
+    writer = MessageWriter(session_factory=session_factory)
+
+    good = writer.add_message(1, "user", "问题")
+    # role 非空约束使这条消息写入失败
+    bad = writer.add_message(2, None, "坏消息")
+    other = writer.add_message(2, "user", "另一个对话")
+    results = await asyncio.gather(good, bad, other, return_exceptions=True)
+
+    assert isinstance(results[1], Exception)
+    assert results[0] > 0 and results[2] > 0
+    assert writer.stats()["retries"] == 1
+    assert writer.stats()["failures"] == 1
+    assert await count_messages(session_factory, 1) == 1
+    assert await count_messages(session_factory, 2) == 1
+    assert await writer.add_message(1, "user", "再问") > 0
@@ -0,0 +1,163 @@
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.config import MySQLConfigRequest, test_mysql_config as run_mysql_config_test
+from app.api.mysql_metadata import get_mysql_table_detail
+from app.models.config import Config
+from app.models.database import Base
+from app.models.mysql_column import MySQLColumn
+from app.models.mysql_database import MySQLDatabase
+from app.models.mysql_index import MySQLIndex
+from app.models.mysql_table import MySQLTable
+from app.services.mysql_sync import sync_mysql_metadata
+
+
+@pytest.fixture
+async def async_session():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as session:
+        yield session
+
+    await engine.dispose()
+
+
+class StubCatalogClient:
+    def __init__(self):
+        self.catalog_calls = []
+
+    async def list_databases(self, _config):
+        return [{"database": "app_db"}, {"database": "archive_db"}, {"database": "mysql"}]
+
+    async def get_catalog(self, databases, _config):
+        self.catalog_calls.append(list(databases))
+        return {
+            "tables": [
+                {
+                    "table_schema": "app_db",
+                    "table_name": "orders",
+                    "table_type": "BASE TABLE",
+                    "table_comment": "订单",
+                    "engine": "InnoDB",
+                    "table_rows": 1200,
+                    "data_length": 16384,
+                    "index_length": 8192,
+                }
+            ],
+            "columns": [
+                {
+                    "table_schema": "app_db",
+                    "table_name": "orders",
+                    "column_name": "id",
+                    "ordinal_position": 1,
+                    "column_type": "bigint",
+                    "is_nullable": "NO",
+                    "column_key": "PRI",
+                    "column_default": None,
+                    "extra": "auto_increment",
+                    "column_comment": "",
+                },
+                {
+                    "table_schema": "app_db",
+                    "table_name": "orders",
+                    "column_name": "status",
+                    "ordinal_position": 2,
+                    "column_type": "int",
+                    "is_nullable": "YES",
+                    "column_key": "MUL",
+                    "column_default": "0",
+                    "extra": "",
+                    "column_comment": "状态",
+                },
+            ],
+            "indexes": [
+                {
+                    "table_schema": "app_db",
+                    "table_name": "orders",
+                    "index_name": "PRIMARY",
+                    "seq_in_index": 1,
+                    "column_name": "id",
+                    "non_unique": 0,
+                    "index_type": "BTREE",
+                    "cardinality": 1200,
+                }
+            ],
+        }
+
+
+@pytest.mark.asyncio
+async def test_sync_metadata_stores_catalog_for_enabled_databases(async_session):
+    async_session.add(MySQLDatabase(name="archive_db", enabled=False))
+    async_session.add(MySQLTable(database_name="app_db", table_name="orders", remark="核心表", enabled=False))
+    await async_session.commit()
+    client = StubCatalogClient()
+
+    result = await sync_mysql_metadata(async_session, {"host": "h"}, client=client)
+
+    assert client.catalog_calls == [["app_db"]]
+    assert result["database_count"] == 2
+    assert result["table_count"] == 1
+    assert result["column_count"] == 2
+    assert result["index_count"] == 1
+
+    table = (await async_session.execute(select(MySQLTable))).scalar_one()
+    assert table.remark == "核心表"
+    assert table.enabled is False
+    assert table.table_rows == 1200
+    assert table.catalog_synced_at is not None
+    columns = (await async_session.execute(select(MySQLColumn))).scalars().all()
+    assert [item.column_name for item in columns] == ["id", "status"]
+    index = (await async_session.execute(select(MySQLIndex))).scalar_one()
+    assert index.non_unique is False
+
+
+@pytest.mark.asyncio
+async def test_table_detail_reads_from_catalog(async_session):
+    await sync_mysql_metadata(async_session, {"host": "h"}, client=StubCatalogClient())
+
+    detail = await get_mysql_table_detail(database="app_db", table="orders", db=async_session, current_user=None)
+
+    assert detail["source"] == "catalog"
+    assert detail["columns"][0] == {
+        "Field": "id",
+        "Type": "bigint",
+        "Null": "NO",
+        "Key": "PRI",
+        "Default": None,
+        "Extra": "auto_increment",
+        "Comment": "",
+    }
+    assert detail["indexes"][0]["Key_name"] == "PRIMARY"
+    assert detail["stats"]["data_length"] == 16384
+
+
+@pytest.mark.asyncio
+async def test_mysql_config_test_uses_single_summary_query(async_session, monkeypatch):
+    calls = []
+
+    async def fake_summary(self, mysql_config=None):
+        calls.append(mysql_config["host"])
+        return [{"database": "app_db", "table_count": 3}, {"database": "crm", "table_count": 4}]
+
+    monkeypatch.setattr("app.services.mcp_mysql.MCPMySQLClient.get_schema_summary", fake_summary)
+    config = MySQLConfigRequest(host="db.local", port=3306, user="u", password="p", database="")
+
+    result = await run_mysql_config_test(
+        config,
+        current_user=type("U", (), {"role": "admin"})(),
+        db=async_session,
+    )
+
+    assert calls == ["db.local"]
+    assert result["data"] == {"database_count": 2, "table_count": 7}
@@ -78,6 +78,7 @@ async def test_list_mysql_databases_paginates(async_session):
         include_disabled=True,
         page=2,
         page_size=10,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -101,6 +102,7 @@ async def test_list_mysql_databases_filters_by_name(async_session):
         page=1,
         page_size=10,
         name="db_03",
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -120,6 +122,7 @@ async def test_list_mysql_tables_paginates(async_session):
         include_disabled=True,
         page=3,
         page_size=10,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -144,6 +147,7 @@ async def test_list_mysql_tables_filters_by_name(async_session):
         page=1,
         page_size=10,
         name="table_02",
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -163,6 +167,7 @@ async def test_list_mysql_databases_manage_paginates(async_session):
         include_disabled=True,
         page=1,
         page_size=5,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -184,6 +189,7 @@ async def test_list_mysql_databases_manage_filters_by_name(async_session):
         page=1,
         page_size=10,
         name="db_04",
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -203,6 +209,7 @@ async def test_list_mysql_tables_manage_paginates(async_session):
         include_disabled=True,
         page=2,
         page_size=10,
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -227,6 +234,7 @@ async def test_list_mysql_tables_manage_filters_by_name(async_session):
         page=1,
         page_size=10,
         name="table_01",
+        cursor=None,
         db=async_session,
         current_user=None,
     )
@@ -1,10 +1,19 @@
+from datetime import datetime
+
 import pytest
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from sqlalchemy import Column, Integer, String, select
 from sqlalchemy.orm import DeclarativeBase
 
-from app.utils.pagination import paginate_query
+from app.utils.pagination import (
+    CountCache,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+    paginate,
+    paginate_query,
+)
 
 
 class Base(DeclarativeBase):
@@ -15,6 +24,7 @@ class Item(Base):
     __tablename__ = "items"
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(100))
+    group = Column(String(20), nullable=True)
 
 
 @pytest.mark.asyncio
@@ -68,3 +78,114 @@ async def test_paginate_query_out_of_range_returns_empty_items():
         assert items == []
 
     await engine.dispose()
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = encode_cursor(datetime(2024, 1, 2, 3, 4, 5, 6), 42)
+
+    assert decode_cursor(cursor, 2) == ["2024-01-02T03:04:05.000006", 42]
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 3)
+    with pytest.raises(ValueError):
+        decode_cursor("%%%", 2)
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def collect_pages(session, query, page_size):
+    names, cursor = [], None
+    while True:
+        items, cursor = await keyset_paginate(session, query, page_size, cursor)
+        names.extend(item.name for item in items)
+        if cursor is None:
+            return names
+
+
+@pytest.mark.asyncio
+async def test_keyset_paginate_walks_all_rows_in_order(session_factory):
+    async with session_factory() as session:
+        session.add_all([Item(name=f"item-{idx % 7:02d}") for idx in range(1, 31)])
+        await session.commit()
+
+        query = select(Item).order_by(Item.name.desc(), Item.id.asc())
+        expected = (await session.execute(query)).scalars().all()
+
+        assert await collect_pages(session, query, 4) == [item.name for item in expected]
+
+
+@pytest.mark.asyncio
+async def test_keyset_paginate_handles_null_sort_values(session_factory):
+    async with session_factory() as session:
+        session.add_all(
+            [Item(name=f"item-{idx:02d}", group=None if idx % 3 == 0 else f"g{idx % 2}") for idx in range(1, 21)]
+        )
+        await session.commit()
+
+        for order in (Item.group.asc(), Item.group.desc()):
+            query = select(Item).order_by(order, Item.id.asc())
+            expected = (await session.execute(query)).scalars().all()
+            assert await collect_pages(session, query, 3) == [item.name for item in expected]
+
+
+@pytest.mark.asyncio
+async def test_keyset_paginate_rejects_invalid_cursor(session_factory):
+    async with session_factory() as session:
+        query = select(Item).order_by(Item.id.asc())
+        with pytest.raises(ValueError):
+            await keyset_paginate(session, query, 10, encode_cursor("x", 1))
+        with pytest.raises(ValueError):
+            await keyset_paginate(session, query, 10, encode_cursor("not-a-number"))
+        with pytest.raises(ValueError):
+            await keyset_paginate(session, select(Item), 10)
+
+
+@pytest.mark.asyncio
+async def test_paginate_page_mode_returns_cursor_for_next_page(session_factory):
+    async with session_factory() as session:
+        session.add_all([Item(name=f"item-{idx:02d}") for idx in range(1, 26)])
+        await session.commit()
+
+        query = select(Item).order_by(Item.id.asc())
+        counter = CountCache(ttl=60)
+        total, items, next_cursor = await paginate(session, query, 1, 10, counter=counter)
+        total_2, items_2, next_cursor_2 = await paginate(session, query, 1, 10, next_cursor, counter=counter)
+        _, last_items, last_cursor = await paginate(session, query, 3, 10, counter=counter)
+
+        assert total == total_2 == 25
+        assert [item.name for item in items_2] == [f"item-{idx:02d}" for idx in range(11, 21)]
+        assert next_cursor_2 is not None
+        assert len(last_items) == 5 and last_cursor is None
+        assert counter.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_count_cache_keys_by_filter_and_invalidates_by_table(session_factory):
+    async with session_factory() as session:
+        session.add_all([Item(name=f"item-{idx:02d}", group=f"g{idx % 2}") for idx in range(1, 11)])
+        await session.commit()
+
+        cache = CountCache(ttl=60)
+        assert await cache.count(session, select(Item).where(Item.group == "g0")) == 5
+        assert await cache.count(session, select(Item).where(Item.group == "g0").order_by(Item.id)) == 5
+        assert await cache.count(session, select(Item).where(Item.group == "g1")) == 5
+        assert cache.stats()["hits"] == 1
+
+        session.add(Item(name="item-11", group="g0"))
+        await session.commit()
+        assert await cache.count(session, select(Item).where(Item.group == "g0")) == 5
+
+        cache.invalidate("other_table")
+        assert await cache.count(session, select(Item).where(Item.group == "g0")) == 5
+        cache.invalidate(Item.__tablename__)
+        assert await cache.count(session, select(Item).where(Item.group == "g0")) == 6
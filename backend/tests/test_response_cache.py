@@ -0,0 +1,137 @@
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.agents.prompts import CHAT_TEMPLATES, DATA_ANALYSIS_TEMPLATES
+from app.api import chat as chat_api
+from app.models.database import Base
+from app.models.message import Message
+from app.models.user import User
+from app.services import response_cache as response_cache_module
+from app.services.message_writer import MessageWriter
+from app.services.response_cache import ResponseCache, is_template_message
+
+TEMPLATE = CHAT_TEMPLATES[0]["content"]
+DA_TEMPLATE = DATA_ANALYSIS_TEMPLATES[0]["content"]
+
+
+class FakeAgent:
+    TOOL_NAMES = ("browse_web",)
+
+    def __init__(self, model_fingerprint="m1", prompt_version="p1"):
+        self.model_fingerprint = model_fingerprint
+        self.prompt_version = prompt_version
+        self.calls = 0
+
+    async def stream(self, message, history=None):
+        self.calls += 1
+        yield {"type": "chunk", "content": f"re:{message}"}
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("ttls", {"normal": 60, "data_analysis": 60, "code_review": 0})
+    kwargs.setdefault("enabled", True)
+    return ResponseCache(**kwargs)
+
+
+def test_only_template_messages_are_cacheable():
+    cache = make_cache()
+    agent = FakeAgent()
+
+    assert is_template_message("normal", f"  {TEMPLATE}  文本 ")
+    assert cache.build_key("normal", "随便问问", "随便问问", agent) is None
+    assert cache.build_key("code_review", TEMPLATE, TEMPLATE, agent) is None
+    assert make_cache(enabled=False).build_key("normal", TEMPLATE, TEMPLATE, agent) is None
+
+
+def test_key_covers_message_context_model_and_prompt():
+    cache = make_cache()
+    base = cache.build_key("normal", TEMPLATE + "甲", TEMPLATE + "甲", FakeAgent())
+
+    assert cache.build_key("normal", f" {TEMPLATE}甲  ", TEMPLATE + "甲", FakeAgent()) == base
+    assert cache.build_key("normal", TEMPLATE + "乙", TEMPLATE + "乙", FakeAgent()) != base
+    assert cache.build_key("normal", TEMPLATE + "甲", "[DB_TABLE_CONTEXT]甲", FakeAgent()) != base
+    assert cache.build_key("normal", TEMPLATE + "甲", TEMPLATE + "甲", FakeAgent(model_fingerprint="m2")) != base
+    assert cache.build_key("normal", TEMPLATE + "甲", TEMPLATE + "甲", FakeAgent(prompt_version="p2")) != base
+
+
+def test_data_analysis_key_changes_with_freshness_window(monkeypatch):
+    cache = make_cache(freshness_window=600)
+    now = [1200.0]
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: now[0])
+
+    first = cache.build_key("data_analysis", DA_TEMPLATE, DA_TEMPLATE, FakeAgent())
+    now[0] = 1799.0
+    same_window = cache.build_key("data_analysis", DA_TEMPLATE, DA_TEMPLATE, FakeAgent())
+    now[0] = 1800.0
+    next_window = cache.build_key("data_analysis", DA_TEMPLATE, DA_TEMPLATE, FakeAgent())
+
+    assert first == same_window != next_window
+
+
+def test_entries_expire_and_hit_ratio_is_reported(monkeypatch):
+    cache = make_cache()
+    now = [100.0]
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: now[0])
+
+    assert cache.get("k", "normal") is None
+    cache.set("k", "normal", "答案")
+    assert cache.get("k", "normal") == "答案"
+    now[0] = 161.0
+    assert cache.get("k", "normal") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_ratio"] == 0.3333
+    assert stats["modes"] == {"normal": {"hits": 1, "misses": 2}}
+
+
+@pytest.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(chat_api, "message_writer", MessageWriter(session_factory=factory))
+    async with factory() as db:
+        db.add(User(id=1, username="u1", password_hash="x", role="user"))
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_replays_cached_template_answer(session_factory, monkeypatch):
+    agent = FakeAgent()
+    monkeypatch.setattr(chat_api, "response_cache", make_cache())
+
+    async def fake_prepare(message, mode, db, review_diff=None, review_notice=None):
+        return agent, message
+
+    monkeypatch.setattr(chat_api, "prepare_agent", fake_prepare)
+
+    async def send(message):
+        async with session_factory() as db:
+            user = await db.get(User, 1)
+            response = await chat_api.chat_stream(
+                chat_api.ChatRequest(message=message, mode="normal"), current_user=user, db=db
+            )
+            return [json.loads(raw.removeprefix("data: ")) async for raw in response.body_iterator]
+
+    first = await send(TEMPLATE + "文本")
+    second = await send(f"  {TEMPLATE}文本 ")
+
+    assert agent.calls == 1
+    assert first[-1] == {"type": "done", "cached": False}
+    assert second[-1] == {"type": "done", "cached": True}
+    assert second[1] == {"type": "chunk", "content": f"re:{TEMPLATE}文本"}
+    async with session_factory() as db:
+        replies = (await db.execute(select(Message.content).where(Message.role == "assistant"))).scalars().all()
+    assert replies == [f"re:{TEMPLATE}文本"] * 2
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from app.utils.result_formatter import MAX_DISTINCT_TRACKED, ResultTableFormatter, format_query_results
+
+
+def test_small_result_renders_full_table():
+    text = format_query_results([{"id": 1, "name": "a"}, {"id": 2, "name": None}], max_chars=1000)
+
+    assert text == (
+        "查询结果：\n\n"
+        "| id | name |\n"
+        "| --- | --- |\n"
+        "| 1 | a |\n"
+        "| 2 | NULL |\n"
+        "\n\n共 2 条记录"
+    )
+
+
+def test_empty_result():
+    assert format_query_results([]) == "查询结果为空"
+
+
+def test_long_cells_are_truncated_and_escaped():
+    text = format_query_results([{"note": "a|b\n" + "x" * 50}], max_cell_chars=10)
+
+    assert "| a\\|b xxxx… |" in text
+
+
+def test_budget_stops_table_and_summarizes_omitted_rows():
+    rows = [{"id": i, "amount": Decimal(i) / 10, "status": "paid" if i % 2 else None} for i in range(10000)]
+
+    formatter = ResultTableFormatter(max_chars=300, max_cell_chars=20).extend(rows)
+    text = formatter.render()
+
+    assert len(text) < 1000
+    assert formatter.row_count == 10000
+    assert 0 < formatter.shown_rows < 20
+    omitted = 10000 - formatter.shown_rows
+    assert f"共 10000 条记录，超出长度预算仅展示前 {formatter.shown_rows} 条" in text
+    assert f"未展示的 {omitted} 条记录概要" in text
+    assert f"| id | {formatter.shown_rows} | 9999 | >{MAX_DISTINCT_TRACKED} | 0 |" in text
+    assert "| status | paid | paid | 1 |" in text
+
+
+def test_first_row_is_always_shown():
+    formatter = ResultTableFormatter(max_chars=5).extend([{"id": 1}, {"id": 2}])
+
+    assert formatter.shown_rows == 1
+    assert "| id | 2 | 2 | 1 | 0 |" in formatter.render()
+
+
+def test_mixed_types_skip_min_max():
+    text = format_query_results([{"v": 1}, {"v": 2}, {"v": "x"}, {"v": {"k": 1}}], max_chars=15)
+
+    assert "| v | - | - | 3 | 0 |" in text
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.models.database import Base
+from app.models.sql_plan import SQLPlan
+from app.services import agent_service
+from app.services.agent_service import DataAnalysisAgent
+from app.services.sql_plan_memory import (
+    SQLPlanMemory,
+    record_failure,
+    record_query,
+    split_question,
+    start_recording,
+    stop_recording,
+)
+
+MYSQL_CONFIG = {"host": "h1", "database": "app", "enabled": True}
+CONTEXT_MESSAGE = '[DB_TABLE_CONTEXT]\n{"tables": ["orders"], "databases": ["app"]}\n[/DB_TABLE_CONTEXT]\n\n用户问题：{}'
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[SQLPlan.__table__])
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+def test_split_question_normalizes_text_and_context():
+    question, context = split_question(CONTEXT_MESSAGE.replace("{}", "  统计 近30天 订单量。 "))
+    same_question, same_context = split_question(
+        '[DB_TABLE_CONTEXT]\n{"databases": ["app"], "tables": ["orders"]}\n[/DB_TABLE_CONTEXT]\n\n用户问题：统计 近30天 订单量'
+    )
+
+    assert question == same_question == "统计 近30天 订单量"
+    assert context == same_context
+    assert split_question("Top10 医院？") == ("top10 医院", None)
+
+
+def test_record_query_keeps_successful_data_queries_only():
+    queries = start_recording()
+    try:
+        record_query("SELECT * FROM information_schema.TABLES")
+        record_query("SHOW TABLES")
+        record_query("select count(*) from orders;")
+        record_query("select count(*) from orders")
+        record_query("WITH t AS (SELECT 1) SELECT * FROM t")
+    finally:
+        stop_recording()
+    record_query("SELECT 2")
+
+    assert queries == ["select count(*) from orders", "WITH t AS (SELECT 1) SELECT * FROM t"]
+
+
+def test_record_query_skips_probes_and_attempts_before_last_failure():
+    queries = start_recording()
+    try:
+        record_query("SELECT * FROM orders LIMIT 5")
+        record_query("select id, status from app.orders limit 10;")
+        record_query("SELECT statu FROM orders GROUP BY statu")
+        record_failure()
+        record_query("SELECT status, COUNT(*) FROM orders GROUP BY status")
+        record_query("SELECT COUNT(*) FROM orders")
+        record_query("SELECT status, COUNT(*) FROM orders GROUP BY status")
+    finally:
+        stop_recording()
+
+    assert queries == ["SELECT COUNT(*) FROM orders", "SELECT status, COUNT(*) FROM orders GROUP BY status"]
+
+
+@pytest.mark.asyncio
+async def test_plan_roundtrip_is_scoped_by_context_and_config(session_factory):
+    memory = SQLPlanMemory(enabled=True, ttl_days=30, session_factory=session_factory)
+    message = CONTEXT_MESSAGE.replace("{}", "统计订单量")
+
+    assert await memory.remember(message, MYSQL_CONFIG, ["SELECT COUNT(*) FROM orders"])
+
+    assert await memory.lookup(message + "。", MYSQL_CONFIG) == ["SELECT COUNT(*) FROM orders"]
+    assert await memory.lookup("统计订单量", MYSQL_CONFIG) is None
+    assert await memory.lookup(message, {**MYSQL_CONFIG, "host": "h2"}) is None
+    async with session_factory() as db:
+        assert (await db.get(SQLPlan, memory.plan_key(message, MYSQL_CONFIG)[0])).hit_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_and_exploratory_plans_are_not_used(session_factory):
+    memory = SQLPlanMemory(enabled=True, ttl_days=30, session_factory=session_factory)
+
+    assert not await memory.remember("q", MYSQL_CONFIG, [f"SELECT {i}" for i in range(memory.max_queries + 1)])
+    await memory.remember("q", MYSQL_CONFIG, ["SELECT 1"])
+    async with session_factory() as db:
+        await db.execute(update(SQLPlan).values(updated_at=datetime.utcnow() - timedelta(days=31)))
+        await db.commit()
+
+    assert await memory.lookup("q", MYSQL_CONFIG) is None
+
+
+class FakeGraph:
+    def __init__(self):
+        self.runs = 0
+
+    async def astream_events(self, inputs, version):
+        # 模拟 Agent 运行中 execute_mysql_query 工具执行成功
+        self.runs += 1
+        record_query("SELECT hospital, COUNT(*) FROM orders GROUP BY hospital")
+        yield {"event": "on_chat_model_stream", "run_id": "m1", "data": {"chunk": SimpleNamespace(content="完整分析")}}
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def astream(self, messages):
+        self.prompts.append(messages[-1]["content"])
+        yield SimpleNamespace(content="解读")
+
+
+@pytest.fixture
+def analysis_agent(session_factory, monkeypatch):
+    executed = []
+
+    async def fake_load():
+        return MYSQL_CONFIG, None
+
+    async def fake_run(query, mysql_config):
+        executed.append(query)
+        if query == "broken":
+            raise RuntimeError("Unknown column")
+        return "| hospital | count |"
+
+    monkeypatch.setattr(agent_service, "_load_mysql_config", fake_load)
+    monkeypatch.setattr(agent_service, "_run_mysql_query", fake_run)
+    monkeypatch.setattr(
+        agent_service, "sql_plan_memory", SQLPlanMemory(enabled=True, ttl_days=30, session_factory=session_factory)
+    )
+    agent = DataAnalysisAgent.__new__(DataAnalysisAgent)
+    agent.agent_graph = FakeGraph()
+    agent.llm = FakeLLM()
+    agent.executed = executed
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_recurring_question_reruns_stored_sql_and_only_narrates(analysis_agent):
+    first = [event async for event in analysis_agent.stream("各医院订单量")]
+    second = [event async for event in analysis_agent.stream("各医院订单量？")]
+
+    assert [event["content"] for event in first] == ["完整分析"]
+    assert analysis_agent.agent_graph.runs == 1
+    assert [event["type"] for event in second] == ["tool_start", "tool_end", "chunk"]
+    assert analysis_agent.executed == ["SELECT hospital, COUNT(*) FROM orders GROUP BY hospital"]
+    assert "| hospital | count |" in analysis_agent.llm.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_failed_plan_is_dropped_and_agent_runs(analysis_agent):
+    await agent_service.sql_plan_memory.remember("各医院订单量", MYSQL_CONFIG, ["broken"])
+
+    events = [event async for event in analysis_agent.stream("各医院订单量")]
+
+    assert events[-1] == {"type": "chunk", "content": "完整分析"}
+    assert analysis_agent.agent_graph.runs == 1
+    assert await agent_service.sql_plan_memory.lookup("各医院订单量", MYSQL_CONFIG) == [
+        "SELECT hospital, COUNT(*) FROM orders GROUP BY hospital"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_follow_up_questions_with_history_skip_plan_memory(analysis_agent):
+    history = [{"role": "user", "content": "上一个问题"}]
+
+    await agent_service.sql_plan_memory.remember("各医院订单量", MYSQL_CONFIG, ["SELECT 1"])
+
+    events = [event async for event in analysis_agent.stream("各医院订单量", history)]
+
+    assert events == [{"type": "chunk", "content": "完整分析"}]
+    assert analysis_agent.executed == []
+    assert await agent_service.sql_plan_memory.lookup("各医院订单量", MYSQL_CONFIG) == ["SELECT 1"]
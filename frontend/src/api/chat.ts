@@ -13,10 +13,15 @@ export interface ChatRequest {
 }
 
 export interface ChatResponse {
-  type: 'chunk' | 'done' | 'error' | 'conversation_id'
+  type: 'chunk' | 'done' | 'error' | 'conversation_id' | 'tool_start' | 'tool_end'
   content?: string
   id?: number
   error?: string
+  // 工具事件：工具名、调用ID、输入/输出预览
+  name?: string
+  run_id?: string
+  input?: string
+  output?: string
 }
 
 export interface ChatStats {
@@ -74,6 +79,13 @@ export async function chatStream(
     })
 
     if (!response.ok) {
+      // 429：并发已满，后端返回排队信息
+      if (response.status === 429) {
+        const body = await response.json().catch(() => null)
+        const detail = body?.detail
+        const position = detail?.position ? `（排队第 ${detail.position} 位）` : ''
+        throw new Error(`${detail?.message || '当前请求较多，请稍后重试'}${position}`)
+      }
       throw new Error(`HTTP error! status: ${response.status}`)
     }
 
@@ -84,13 +96,16 @@ export async function chatStream(
       throw new Error('无法读取响应流')
     }
 
+    // 逐 token 推送时一个事件可能被拆到多次读取中，未完整的行留到下次拼接
+    let buffer = ''
     while (true) {
       const { done, value } = await reader.read()
       
       if (done) break
       
-      const chunk = decoder.decode(value)
-      const lines = chunk.split('\n')
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() || ''
       
       for (const line of lines) {
         if (line.startsWith('data: ')) {
@@ -116,19 +131,71 @@ export async function chatStream(
   }
 }
 
+export interface ConversationPage {
+  // 游标翻页时不统计总数
+  total: number | null
+  items: Conversation[]
+  next_cursor: string | null
+}
+
 /**
- * 获取对话列表
+ * 获取对话列表（传入上一页的 next_cursor 继续加载）
  */
-export async function getConversations(): Promise<Conversation[]> {
-  const response = await request.get<{ total: number; items: Conversation[] }>('/conversations')
-  return response.items || []
+export async function getConversations(cursor?: string | null): Promise<ConversationPage> {
+  const response = await request.get<ConversationPage>('/conversations', {
+    params: cursor ? { cursor } : undefined
+  })
+  return { total: response.total ?? null, items: response.items || [], next_cursor: response.next_cursor ?? null }
+}
+
+export interface MessagePage {
+  // 按时间正序
+  items: Message[]
+  // 更早一页的游标，没有更多时为 null
+  next_cursor: string | null
+}
+
+/**
+ * 分页获取对话中的消息：不传 cursor 时返回最近的一页，传入 next_cursor 继续加载更早的消息；
+ * previewChars 只返回每条消息的前 N 个字符，完整内容用 getMessage 按需获取
+ */
+export async function getMessages(
+  conversationId: number,
+  options: { cursor?: string | null; limit?: number; previewChars?: number } = {}
+): Promise<MessagePage> {
+  const response = await request.get<MessagePage>(`/conversations/${conversationId}/messages`, {
+    params: {
+      cursor: options.cursor || undefined,
+      limit: options.limit,
+      preview_chars: options.previewChars
+    }
+  })
+  return { items: response.items || [], next_cursor: response.next_cursor ?? null }
+}
+
+/**
+ * 获取单条消息的完整内容
+ */
+export async function getMessage(conversationId: number, messageId: number): Promise<Message> {
+  return request.get<Message>(`/conversations/${conversationId}/messages/${messageId}`)
+}
+
+export interface MessageSearchHit {
+  message_id: number
+  conversation_id: number
+  conversation_title: string
+  mode: 'normal' | 'data_analysis' | 'code_review'
+  role: 'user' | 'assistant'
+  // 命中片段，检索词以 **…** 高亮
+  snippet: string
+  created_at: string
 }
 
 /**
- * 获取对话中的消息列表
+ * 全文检索历史消息（按相关度排序）
  */
-export async function getMessages(conversationId: number): Promise<Message[]> {
-  return request.get<Message[]>(`/conversations/${conversationId}/messages`)
+export async function searchMessages(q: string, limit = 20): Promise<MessageSearchHit[]> {
+  return request.get<MessageSearchHit[]>('/conversations/search', { params: { q, limit } })
 }
 
 /**
@@ -115,7 +115,12 @@ export async function updateMysqlTableManage(id: number, payload: { enabled?: bo
 }
 
 export async function getMysqlTableDetail(database: string, table: string) {
-  return request.get<{ columns: any[] }>('/mysql/manage/table-detail', {
+  return request.get<{
+    columns: any[]
+    indexes?: any[]
+    stats?: { engine: string | null; table_rows: number | null; data_length: number | null; index_length: number | null; synced_at: string } | null
+    source: 'catalog' | 'live'
+  }>('/mysql/manage/table-detail', {
     params: { database, table }
   })
 }
@@ -31,6 +31,9 @@ export interface Message {
   role: 'user' | 'assistant'
   content: string
   created_at: string
+  // 完整内容长度；预览加载时 truncated 表示 content 只是前若干字符
+  content_length?: number
+  truncated?: boolean
 }
 
 /**
@@ -125,8 +128,15 @@ export interface ChatRequest {
 
 // 流式响应类型
 export interface StreamResponse {
-  type: 'chunk' | 'done' | 'conversation_id' | 'error'
+  type: 'chunk' | 'done' | 'conversation_id' | 'error' | 'tool_start' | 'tool_end' | 'queued'
   content?: string
   id?: number
   error?: string
+  // 排队事件：预计放行位次
+  position?: number
+  // 工具事件：工具名、调用ID、输入/输出预览
+  name?: string
+  run_id?: string
+  input?: string
+  output?: string
 }